@@ -7,6 +7,7 @@ import sys
 import logging
 
 from jackit2.config import JackitConfig
+from jackit2.util import get_startup_profiler
 
 
 class SiteDeploymentSingleton:
@@ -28,8 +29,6 @@ class SiteDeploymentSingleton:
         return cls._instance
 
     def __init__(self):
-        from jackit2.util import get_level_loader
-
         self.base_path = os.path.dirname(os.path.abspath(__file__))
         self.resource_path = os.path.join(self.base_path, "jackit2", "resources")
         self.texture_path = os.path.join(self.resource_path, 'textures')
@@ -37,12 +36,17 @@ class SiteDeploymentSingleton:
         self.config_path = os.path.join(self.base_path, "site.cfg.json")
         self.builtin_levels = os.path.join(self.base_path, "jackit2", "levels")
         self.contrib_levels = os.path.join(self.base_path, "contrib")
-        self.loader = get_level_loader()
+        self.manifest_path = os.path.join(self.base_path, "levels.manifest.json")
+        self.pack_path = os.path.join(self.base_path, "assets.pack")
         self._config = None
-        self._setup_config()
-        self._setup_logging()
-        self.loader.add_search_path(self.builtin_levels)
-        self.loader.add_search_path(self.contrib_levels)
+        self._levels = None
+        self._assets = None
+
+        profiler = get_startup_profiler()
+        with profiler.phase("config"):
+            self._setup_config()
+        with profiler.phase("logging"):
+            self._setup_logging()
 
     @property
     def config(self):
@@ -51,6 +55,40 @@ class SiteDeploymentSingleton:
         '''
         return self._config
 
+    @property
+    def assets(self):
+        '''
+        The AssetStore. Assets come from the asset pack if there is one,
+        except in development mode where the loose files are always used
+        '''
+        if self._assets is None:
+            from jackit2.core.assets import AssetStore
+
+            with get_startup_profiler().phase("asset pack"):
+                use_pack = os.path.exists(self.pack_path) and not self.config.is_development_mode()
+                self._assets = AssetStore(self.resource_path, self.pack_path if use_pack else None)
+        return self._assets
+
+    @property
+    def levels(self):
+        '''
+        The level loader. The level search paths are searched the first time
+        it's used so commands that don't need levels don't pay for the search
+        '''
+        if self._levels is None:
+            from jackit2.core.loader import LevelLoader
+
+            with get_startup_profiler().phase("level search"):
+                loader = LevelLoader.get()
+                loader.manifest_path = self.manifest_path
+                if self.assets.pack is not None:
+                    loader.add_pack(self.assets.pack)
+                else:
+                    loader.add_search_path(self.builtin_levels)
+                loader.add_search_path(self.contrib_levels)
+            self._levels = loader
+        return self._levels
+
     def _setup_logging(self):
         '''
         Setup the root logger
@@ -65,12 +103,11 @@ class SiteDeploymentSingleton:
 
     def _setup_config(self):
         '''
-        Setup the config file
+        Load the config file. It's only written if it doesn't exist yet (with
+        the defaults) or is missing settings
         '''
         self._config = JackitConfig(self.config_path)
         if os.path.exists(self.config_path):
             self._config.load()
-        self._config.save()
-
-
-SITE_DEPLOYMENT = SiteDeploymentSingleton.instance()
+        if self._config.needs_save:
+            self._config.save()
@@ -0,0 +1,33 @@
+'''
+Pack the textures, audio and built in levels into assets.pack. The game uses
+the pack when it exists and isn't in development mode
+
+Usage: python dev/build_pack.py [output]
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jackit2.core.assets import build_pack  # noqa: E402 pylint: disable=C0413
+from jackit2.util import get_site_deployment  # noqa: E402 pylint: disable=C0413
+
+
+def main():
+    '''
+    Entry point
+    '''
+    site_deploy = get_site_deployment()
+    output = sys.argv[1] if len(sys.argv) > 1 else site_deploy.pack_path
+
+    start = time.perf_counter()
+    count = build_pack(output, site_deploy.resource_path, site_deploy.builtin_levels)
+    print("Packed {} assets into {} ({} bytes) in {:.1f} ms".format(
+        count, output, os.path.getsize(output), (time.perf_counter() - start) * 1000
+    ))
+
+
+if __name__ == "__main__":
+    main()
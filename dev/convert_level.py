@@ -0,0 +1,42 @@
+'''
+Convert levels between Python level modules and binary level files (.jkl).
+A .py file is converted to a .jkl next to it and a .jkl to a .py
+
+Usage: python dev/convert_level.py [--chunked] LEVEL_FILE [OUTPUT]
+'''
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jackit2.core.levelfile import LEVEL_FILE_EXT, file_to_source, level_to_file  # noqa: E402 pylint: disable=C0413
+from jackit2.core.loader import import_level_module  # noqa: E402 pylint: disable=C0413
+
+
+def main():
+    '''
+    Entry point
+    '''
+    parser = argparse.ArgumentParser(description="Convert levels to and from the binary level format")
+    parser.add_argument("path", help="Level module (.py) or binary level ({})".format(LEVEL_FILE_EXT))
+    parser.add_argument("output", nargs="?", help="Output file. Defaults to path with the other extension")
+    parser.add_argument("--chunked", action="store_true", help="Store the grid as chunks, leaving out empty ones")
+    args = parser.parse_args()
+
+    base, ext = os.path.splitext(args.path)
+    if ext == LEVEL_FILE_EXT:
+        output = args.output or base + ".py"
+        with open(output, 'w') as source_file:
+            source_file.write(file_to_source(args.path))
+    else:
+        output = args.output or base + LEVEL_FILE_EXT
+        mod = import_level_module("jackit2_convert_level", args.path)
+        level_to_file(mod.__Level__(), output, args.chunked)
+
+    print("{} -> {} ({} bytes)".format(args.path, output, os.path.getsize(output)))
+
+
+if __name__ == "__main__":
+    main()
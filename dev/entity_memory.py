@@ -0,0 +1,54 @@
+'''
+Measure the memory used by the entities of a large level
+
+Usage: python dev/entity_memory.py [num_tiles]
+'''
+
+import os
+import sys
+import gc
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jackit2.core import BLOCK_HEIGHT, BLOCK_WIDTH  # noqa: E402 pylint: disable=C0413
+from jackit2.entities import Crate, Floor  # noqa: E402 pylint: disable=C0413
+
+
+def measure(num_tiles, row_len=1000):
+    '''
+    Create num_tiles entities (half static floor, half dynamic crates) and
+    return the total traced bytes and the size of a single entity object
+    '''
+    gc.collect()
+    tracemalloc.start()
+
+    entities = []
+    for idx in range(num_tiles):
+        ent_cls = Floor if idx % 2 else Crate
+        entities.append(ent_cls((idx % row_len) * BLOCK_WIDTH, (idx // row_len) * BLOCK_HEIGHT))
+
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    entity = entities[0]
+    entity_size = sys.getsizeof(entity)
+    if hasattr(entity, '__dict__'):
+        entity_size += sys.getsizeof(entity.__dict__)
+    return total, entity_size
+
+
+def main():
+    '''
+    Entry point
+    '''
+    num_tiles = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    total, entity_size = measure(num_tiles)
+    print("tiles:            {}".format(num_tiles))
+    print("total traced:     {:.1f} MiB".format(total / (1024 * 1024)))
+    print("bytes per tile:   {:.0f}".format(total / num_tiles))
+    print("entity object:    {} bytes".format(entity_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+'''
+Measure how many environment steps per second the bot environments run
+with random actions, in process and across worker processes
+
+Usage: python dev/env_throughput.py [num_envs] [num_steps]
+'''
+
+import os
+import sys
+import time
+import multiprocessing
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jackit2.core.env import ProcessVectorEnv, VectorEnv  # noqa: E402 pylint: disable=C0413
+from jackit2.levels.level01 import Level01  # noqa: E402 pylint: disable=C0413
+
+
+def measure(vec, num_steps, seed=0):
+    '''
+    Step vec num_steps times with random actions. Returns env steps per second
+    '''
+    rng = np.random.RandomState(seed)
+    vec.reset()
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        vec.step(rng.randint(0, 8, size=len(vec)).astype(np.uint8))
+    elapsed = time.perf_counter() - start
+    vec.close()
+    return len(vec) * num_steps / elapsed
+
+
+def main():
+    '''
+    Entry point
+    '''
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    num_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    base = measure(VectorEnv(Level01, num_envs), num_steps)
+    print("in process:        {:8.0f} steps/sec".format(base))
+
+    workers = 1
+    while workers <= multiprocessing.cpu_count():
+        rate = measure(ProcessVectorEnv(Level01, num_envs, workers), num_steps)
+        print("{:2d} worker(s):      {:8.0f} steps/sec ({:.1f}x)".format(workers, rate, rate / base))
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
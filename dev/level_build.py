@@ -0,0 +1,75 @@
+'''
+Measure how long it takes to build and load levels from maps of 1k to 1M tiles
+
+Usage: python dev/level_build.py [max_tiles]
+'''
+
+import os
+import sys
+import math
+import time
+
+import pymunk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jackit2.core.level import Level  # noqa: E402 pylint: disable=C0413
+from jackit2.core.entity import EntityManager  # noqa: E402 pylint: disable=C0413
+
+
+def make_map(num_tiles):
+    '''
+    Make a square map of about num_tiles tiles. Walls around the edge, a
+    floor every 8 rows with a crate on every third tile above it
+    '''
+    size = max(8, int(math.sqrt(num_tiles)))
+    rows = []
+    for row in range(size):
+        if row in (0, size - 1):
+            rows.append("W" * size)
+        elif row % 8 == 0:
+            rows.append("W" + "F" * (size - 2) + "W")
+        elif row % 8 == 7:
+            rows.append("W" + "".join("C" if col % 3 == 0 else " " for col in range(size - 2)) + "W")
+        else:
+            rows.append("W" + " " * (size - 2) + "W")
+    rows[-2] = "WS" + rows[-2][2:]
+    return rows
+
+
+def measure(num_tiles):
+    '''
+    Returns (tiles, ms to build the chunks, ms to load the level)
+    '''
+    level_map = make_map(num_tiles)
+    level = Level(0, level_map)
+    entity_mgr = EntityManager(pymunk.Space(), None, None, None)
+
+    start = time.perf_counter()
+    level._build_level(entity_mgr)  # pylint: disable=W0212
+    build = time.perf_counter() - start
+
+    level = Level(0, level_map)
+    entity_mgr = EntityManager(pymunk.Space(), None, None, None)
+    start = time.perf_counter()
+    level.load(entity_mgr)
+    load = time.perf_counter() - start
+
+    return len(level_map) ** 2, build * 1000, load * 1000
+
+
+def main():
+    '''
+    Entry point
+    '''
+    max_tiles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    measure(1000)  # Warm up
+    print("{:>10} {:>10} {:>10}".format("tiles", "build ms", "load ms"))
+    num_tiles = 1000
+    while num_tiles <= max_tiles:
+        print("{:10d} {:10.1f} {:10.1f}".format(*measure(num_tiles)))
+        num_tiles *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+'''
+Measure how build, step and draw time grow with the number of entities
+using generated stress levels. The whole level is kept active. Prints CSV
+that can be plotted directly. Draw time is the CPU side of drawing (building
+the per instance data), no OpenGL context is needed
+
+Usage: python dev/stress_scaling.py [max_tiles] [steps] > scaling.csv
+'''
+
+import os
+import sys
+import math
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jackit2.core.simulation import Simulation  # noqa: E402 pylint: disable=C0413
+from jackit2.core.stress import StressLevel  # noqa: E402 pylint: disable=C0413
+
+
+def measure(width, height, num_steps, **params):
+    '''
+    Returns (entities, dynamic bodies, build ms, mean step ms, mean draw ms)
+    '''
+    start = time.perf_counter()
+    sim = Simulation(StressLevel(width, height, **params))
+    sim.view_rect = (0, 0, sim.width, sim.height)
+    sim.step()  # Streams in the whole level
+    build = time.perf_counter() - start
+
+    steps = np.zeros(num_steps)
+    draws = np.zeros(num_steps)
+    for idx in range(num_steps):
+        start = time.perf_counter()
+        sim.step()
+        steps[idx] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for arch in sim.entity_mgr.archetypes():
+            arch.instance_data()
+        draws[idx] = time.perf_counter() - start
+
+    return (
+        len(sim.entity_mgr), len(sim.entity_mgr.dynamic_bodies()),
+        build * 1000, steps.mean() * 1000, draws.mean() * 1000
+    )
+
+
+def main():
+    '''
+    Entry point
+    '''
+    max_tiles = int(sys.argv[1]) if len(sys.argv) > 1 else 256 * 1024
+    num_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    print("tiles,entities,dynamic,build_ms,step_ms,draw_ms,step_us_per_entity")
+    num_tiles = 1024
+    while num_tiles <= max_tiles:
+        # Twice as wide as high
+        height = int(math.sqrt(num_tiles / 2))
+        width = height * 2
+        entities, dynamic, build, step, draw = measure(width, height, num_steps)
+        print("{},{},{},{:.1f},{:.2f},{:.2f},{:.2f}".format(
+            width * height, entities, dynamic, build, step, draw, step * 1000 / max(1, entities)
+        ))
+        sys.stdout.flush()
+        num_tiles *= 4
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,12 @@ Sets up site deployment and starts game
 import os
 import sys
 import signal
+import json
 import traceback
 import argparse
 
-from PyQt5.QtWidgets import QApplication
-
-from jackit2 import run, MAIN_WINDOW
-from jackit2.util import get_site_deployment
+from jackit2 import run, quit_game
+from jackit2.util import get_site_deployment, get_level_loader, get_game_engine, get_startup_profiler
 from jackit2.config import ConfigError
 
 
@@ -20,17 +19,178 @@ def sigint_handler(_signum, _frame):
     Handle SIGINT (cntrl-c)
     '''
     print("Caught cntrl-c. Exiting...")
-    MAIN_WINDOW.close()
-    QApplication.quit()
+    quit_game()
+
+
+def simulate(num_steps, level_index, framerate, stress=None):
+    '''
+    Run a level headless (no window, rendering or audio) as fast as possible
+    and report how many steps per second were simulated. stress is an optional
+    (width, height) of a generated stress level to run instead
+    '''
+    profiler = get_startup_profiler()
+    with profiler.phase("import physics"):
+        from jackit2.core.simulation import Simulation
+
+    with profiler.phase("first level"):
+        if stress:
+            from jackit2.core.stress import StressLevel
+            level = StressLevel(*stress)
+        else:
+            level = get_level_loader()[level_index]
+
+        sim = Simulation(level, framerate)
+    profiler.finish("simulation ready")
+
+    elapsed = sim.run(num_steps) or 1e-9  # Cannot be 0
+    steps_per_sec = num_steps / elapsed
+    print("Simulated {} steps of level {} in {:.2f}s: {:.0f} steps/sec ({:.1f}x real time)".format(
+        num_steps, sim.level.level_num, elapsed, steps_per_sec, steps_per_sec / framerate
+    ))
+
+
+def replay(path):
+    '''
+    Replay a recorded session headless and check it still matches the recording
+    '''
+    from jackit2.core.simulation import Simulation
+    from jackit2.core.replay import Recording, InputReplayer
+
+    recording = Recording.load(path)
+    level = get_level_loader().get_by_num(recording.level_num)
+    if level is None:
+        print("Unable to replay {}. There's no level {}".format(path, recording.level_num))
+        sys.exit(1)
+
+    sim = Simulation(level, recording.framerate)
+    diverged = InputReplayer(recording).run(sim, strict=False)
+
+    if diverged:
+        print("Replay diverged from the recording at step {}".format(diverged[0]))
+        sys.exit(3)
+    print("Replayed {} steps of level {}. State matched the recording".format(
+        recording.steps, recording.level_num
+    ))
+
+
+def verify_levels(num_steps, framerate, workers, output=None):
+    '''
+    Simulate every level headless and write a JSON report of its stability
+    and step cost to output (stdout if not set). Exits non-zero if any level
+    is unstable or failed to load
+    '''
+    from jackit2.core.verify import verify_levels as run_verify
+
+    reports = run_verify(num_steps, framerate, workers)
+    report = json.dumps({"framerate": framerate, "levels": reports}, indent=2)
+    if output:
+        with open(output, 'w') as report_file:
+            report_file.write(report)
+    else:
+        print(report)
+    if not all(level["ok"] for level in reports):
+        sys.exit(4)
+
+
+def calibrate(config, report=False, settings=None):
+    '''
+    Benchmark this machine and save the performance profile chosen for it to
+    the config. Only the given settings are changed if set. Prints the profile
+    if report is set
+    '''
+    from jackit2.core.calibrate import calibrate as run_calibrate
+
+    print("Calibrating performance settings for this machine...")
+    sys.stdout.flush()
+    profile = run_calibrate(config, settings=settings)
+    try:
+        config.save()
+    except ConfigError as exc:
+        print("Unable to save the performance profile: {}".format(str(exc)))
+
+    if report:
+        print(json.dumps({config.profile: profile}, indent=2))
+
+
+def parse_size(value):
+    '''
+    Parse WIDTHxHEIGHT for argparse
+    '''
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected WIDTHxHEIGHT, got '{}'".format(value))
+    return width, height
 
 
 def main():
     '''
     Entry Point. Exceptions are written to bugreport.txt
     '''
-    argparse.ArgumentParser(description='JackIT 2.0! (New and improved)')
+    profiler = get_startup_profiler()
+
+    parser = argparse.ArgumentParser(description='JackIT 2.0! (New and improved)')
+    parser.add_argument(
+        "--simulate", metavar="STEPS", type=int,
+        help="Run the game headless for STEPS physics steps and report steps per second"
+    )
+    parser.add_argument("--level", type=int, default=0, help="Index of the level to simulate")
+    parser.add_argument(
+        "--stress", metavar="WIDTHxHEIGHT", type=parse_size,
+        help="Simulate a generated stress level of WIDTHxHEIGHT tiles instead of --level"
+    )
+    parser.add_argument("--record", metavar="PATH", help="Record the session's input to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="Replay a recorded session headless and verify it")
+    parser.add_argument(
+        "--verify-levels", metavar="STEPS", type=int,
+        help="Simulate every level headless for STEPS steps and print a JSON stability report"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Number of processes used by --verify-levels (default: one per CPU)"
+    )
+    parser.add_argument("--output", metavar="PATH", help="Write the --verify-levels report to PATH")
+    parser.add_argument(
+        "--calibrate", action="store_true",
+        help="Benchmark this machine, save the performance settings chosen to the config and exit. "
+             "Done automatically the first time the game is started"
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="Print how long each startup phase took once the first frame is drawn"
+    )
+    args = parser.parse_args()
+    profiler.enabled = args.profile_startup
+
+    with profiler.phase("site deployment"):
+        site_deploy = get_site_deployment()
+
+    if args.simulate is not None:
+        simulate(args.simulate, args.level, site_deploy.config.framerate, args.stress)
+        sys.exit(0)
+
+    if args.verify_levels is not None:
+        verify_levels(args.verify_levels, site_deploy.config.framerate, args.workers, args.output)
+        sys.exit(0)
+
+    if args.replay:
+        replay(args.replay)
+        sys.exit(0)
+
+    if args.calibrate:
+        calibrate(site_deploy.config, report=True)
+        sys.exit(0)
+
+    # Calibrate the first time the game is started. A config written before
+    # there were performance settings only gets those, the rest were chosen by the player
+    if site_deploy.config.profile is None and site_deploy.config.unset_settings:
+        with profiler.phase("calibration"):
+            calibrate(site_deploy.config, settings=site_deploy.config.unset_settings)
+
+    if args.record:
+        get_game_engine().record_path = args.record
+
     signal.signal(signal.SIGINT, sigint_handler)  # Register our signal handler for cntrl-c
-    site_deploy = get_site_deployment()
 
     try:
         run()  # Start the application
@@ -2,10 +2,16 @@
 User controllable player
 '''
 
-from jackit2.core import BLOCK_HEIGHT, BLOCK_WIDTH
-from jackit2.util import get_texture_loader
-from jackit2.core.input import InputEventType, register_event_handler
-from jackit2.core.entity import Entity, create_circle
+from jackit2.core.input import InputEventType, Key, register_event_handler, register_step_handler
+from jackit2.core.entity import Entity, EntityType, create_circle
+
+#: Keys that jump and the impulse of a jump. An impulse so the jump is the
+#: same however many physics substeps a step has (forces only last one).
+#: Same as the force 900000 applied for one step at 60 fps
+JUMP_KEYS = (Key.SPACE, Key.W)
+JUMP_IMPULSE = 15000
+#: Force applied on every step a movement key is held
+MOVE_FORCE = 400000
 
 
 class Player(Entity):
@@ -13,28 +19,30 @@ class Player(Entity):
     User controlled player
     '''
 
+    __slots__ = ()
+
+    entity_type = EntityType("ball")
+
     def __init__(self, x_pos, y_pos):
-        txs = get_texture_loader()
         super().__init__(
-            x_pos, y_pos, BLOCK_WIDTH, BLOCK_HEIGHT,
-            create_circle(x_pos, y_pos, (BLOCK_WIDTH / 2), 100, 0.3),
-            txs.get_texture_by_name("ball")
+            create_circle(x_pos, y_pos, (self.entity_type.width / 2), 100, 0.3)
         )
 
-        register_event_handler(self.key_press, InputEventType.KEY_PRESS)
+        for key in JUMP_KEYS:
+            register_event_handler(self.jump, InputEventType.KEY_PRESS, key)
+        register_step_handler(self.move)
+
+    def jump(self, _event):
+        '''
+        Jump once per press of a jump key
+        '''
+        self.apply_world_impulse(0, JUMP_IMPULSE)
+        return False
 
-    def key_press(self, event):
+    def move(self, keys):
         '''
-        Handle key press event
+        Push the player left or right on every step a movement key is held
         '''
-        if event.text() in (" ", "w"):
-            self.apply_world_force(0, 900000)
-            return False
-        if event.text() == "d":
-            self.apply_world_force(800000, 0)
-            return False
-        if event.text() == "a":
-            self.apply_world_force(-800000, 0)
-            return False
-
-        return True
+        direction = keys.is_down(Key.D) - keys.is_down(Key.A)
+        if direction:
+            self.apply_world_force(direction * MOVE_FORCE, 0)
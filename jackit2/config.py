@@ -7,6 +7,9 @@ import logging
 
 LOGGER = logging.getLogger(__name__)
 
+#: Effects levels: no sound effects, fewer sound effect channels, everything
+EFFECTS_LEVELS = (0, 1, 2)
+
 
 class ConfigError(Exception):
     '''
@@ -101,6 +104,45 @@ def validate_color(value):
     raise ConfigError("Colors must be a list or tuple of 3 unsigned byte values")
 
 
+def validate_substeps(value):
+    '''
+    Validate a number of physics substeps
+    '''
+    value = validate_int(value)
+    if value < 1:
+        raise ConfigError("Physics substeps must be at least 1")
+    return value
+
+
+def validate_render_scale(value):
+    '''
+    Validate a render scale (fraction of the resolution drawn)
+    '''
+    value = validate_float(value)
+    if value <= 0.0 or value > 1.0:
+        raise ConfigError("Render scale must be greater than 0 and at most 1")
+    return value
+
+
+def validate_effects(value):
+    '''
+    Validate an effects level
+    '''
+    value = validate_int(value)
+    if value not in EFFECTS_LEVELS:
+        raise ConfigError("Effects level must be one of: {}".format(", ".join(str(lvl) for lvl in EFFECTS_LEVELS)))
+    return value
+
+
+#: Settings a performance profile sets and the validator of each
+PROFILE_SETTINGS = {
+    "framerate": validate_uint,
+    "physics_substeps": validate_substeps,
+    "render_scale": validate_render_scale,
+    "effects": validate_effects,
+}
+
+
 class JackitConfig:
     '''
     Jackit2 config class
@@ -114,10 +156,28 @@ class JackitConfig:
         self.framerate = 60
         self.music_enabled = True
         self.high_dpi_scaling = 100.0
+        #: Physics steps per frame. Each is 1/framerate/physics_substeps seconds
+        self.physics_substeps = 1
+        #: Fraction of the resolution drawn
+        self.render_scale = 1.0
+        #: One of EFFECTS_LEVELS
+        self.effects = 2
+        #: Name of the performance profile the settings came from. None until the game is calibrated
+        self.profile = None
+        #: Performance profiles by name. Each has the PROFILE_SETTINGS it chose
+        #: and the benchmark results it was chosen from
+        self.profiles = {}
+        #: PROFILE_SETTINGS the config file didn't have (all of them until it's
+        #: loaded). A file written by an older version has the settings the player chose
+        self.unset_settings = tuple(PROFILE_SETTINGS)
 
         self._mode = None
         self.mode = "production"
 
+        #: True if the file doesn't match the settings (it hasn't been written
+        #: yet, is missing settings or has values in another format)
+        self.needs_save = True
+
     @property
     def mode(self):
         '''
@@ -139,6 +199,55 @@ class JackitConfig:
 
         self._mode = value
 
+    @property
+    def render_width(self):
+        '''
+        Width drawn at after the render scale
+        '''
+        return max(1, int(round(self.width * self.render_scale)))
+
+    @property
+    def render_height(self):
+        '''
+        Height drawn at after the render scale
+        '''
+        return max(1, int(round(self.height * self.render_scale)))
+
+    def apply_profile(self, name, profile=None, settings=None):
+        '''
+        Use the settings of a performance profile. profile is stored as name
+        first if given. Only the given settings are used if set, the others keep
+        their values. Call save() to keep them
+        '''
+        if profile is not None:
+            self.profiles[name] = self._validate_profile(name, profile)
+        if name not in self.profiles:
+            raise ConfigError("No performance profile named {}".format(name))
+
+        settings = PROFILE_SETTINGS if settings is None else settings
+        for setting in settings:
+            setattr(self, setting, self.profiles[name][setting])
+        self.unset_settings = tuple(setting for setting in self.unset_settings if setting not in settings)
+        self.profile = name
+        self.needs_save = True
+
+    @staticmethod
+    def _validate_profile(name, profile):
+        '''
+        Validate a performance profile. Anything besides the settings (such as
+        the benchmark results) is kept as is
+        '''
+        if not isinstance(profile, dict):
+            raise ConfigError("Performance profile {} must be an object".format(name))
+        missing = [setting for setting in PROFILE_SETTINGS if setting not in profile]
+        if missing:
+            raise ConfigError("Performance profile {} is missing: {}".format(name, ", ".join(missing)))
+
+        profile = dict(profile)
+        for setting, validate in PROFILE_SETTINGS.items():
+            profile[setting] = validate(profile[setting])
+        return profile
+
     def to_json(self):
         '''
         JSON representation of config options
@@ -151,7 +260,12 @@ class JackitConfig:
             "mode": self.mode,
             "framerate": self.framerate,
             "music_enabled": self.music_enabled,
-            "high_dpi_scaling": self.high_dpi_scaling
+            "high_dpi_scaling": self.high_dpi_scaling,
+            "physics_substeps": self.physics_substeps,
+            "render_scale": self.render_scale,
+            "effects": self.effects,
+            "profile": self.profile,
+            "profiles": self.profiles
         }
 
     def from_json(self, raw):
@@ -162,12 +276,26 @@ class JackitConfig:
         self.framerate = validate_uint(raw.get("framerate", 60))
         self.music_enabled = validate_bool(raw.get("music_enabled", True))
         self.high_dpi_scaling = validate_float(raw.get("high_dpi_scaling", 100.0))
+        self.physics_substeps = validate_substeps(raw.get("physics_substeps", 1))
+        self.render_scale = validate_render_scale(raw.get("render_scale", 1.0))
+        self.effects = validate_effects(raw.get("effects", 2))
+        self.unset_settings = tuple(setting for setting in PROFILE_SETTINGS if setting not in raw)
+
+        profiles = raw.get("profiles", {})
+        if not isinstance(profiles, dict):
+            raise ConfigError("profiles must be an object")
+        self.profiles = {name: self._validate_profile(name, profile) for name, profile in profiles.items()}
+        self.profile = raw.get("profile")
+        if self.profile is not None and self.profile not in self.profiles:
+            raise ConfigError("No performance profile named {}".format(self.profile))
 
         # Get resolution
         res = raw.get("resolution", {"width": 800, "height": 600})
         self.width = validate_uint(res.get("width", 800))
         self.height = validate_uint(res.get("height", 600))
 
+        self.needs_save = raw != self.to_json()
+
     def load(self):
         '''
         Load the config file
@@ -189,6 +317,7 @@ class JackitConfig:
         try:
             with open(self.path, 'w') as config_file:
                 config_file.write(json.dumps(self.to_json(), sort_keys=True, separators=(',', ': '), indent=4))
+            self.needs_save = False
         except IOError as exc:
             raise ConfigError("Could not access file {}. {}".format(self.path, str(exc)))
         except BaseException as exc:  # pragma: no cover
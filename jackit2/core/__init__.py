@@ -50,7 +50,40 @@ void main() {
 }
 '''
 
+# Draws the frame rendered at a lower resolution (the render scale) over the
+# whole window. Drawn with the same quad as the entities
+BLIT_VERTEX_SHADER = '''
+#version 330
+
+in vec2 in_vert;
+in vec2 in_texture;
+
+out vec2 v_texture;
+
+void main() {
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+    v_texture = in_texture;
+}
+'''
+
+BLIT_FRAGMENT_SHADER = '''
+#version 330
+
+uniform sampler2D Scene;
+
+in vec2 v_texture;
+
+out vec4 f_color;
+
+void main() {
+    f_color = texture(Scene, v_texture);
+}
+'''
+
 # Global values for block size
 BLOCK_WIDTH = 64
 BLOCK_HEIGHT = 64
 BLOCK_RADIUS = 32
+
+#: File extension of binary levels (see jackit2.core.levelfile)
+LEVEL_FILE_EXT = ".jkl"
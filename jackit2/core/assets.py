@@ -0,0 +1,236 @@
+'''
+Single file asset pack. Textures, audio and the built in levels are packed
+into one indexed file that's memory mapped at runtime, so a cold start reads
+one file instead of walking directories and opening many small files.
+Assets are served as memoryview slices of the mapped file (no copies).
+
+Layout (little endian):
+
+    header      HEADER (magic, version, number of entries)
+    index       per entry: ENTRY (offset, size, name length) then the UTF-8 name
+    data        each asset starts on a multiple of ALIGN bytes
+
+Asset names are '/' separated paths relative to the directory they were
+packed from, prefixed with the directory's name in the pack (for example
+textures/crate.png).
+'''
+
+import io
+import os
+import json
+import mmap
+import struct
+import logging
+import tempfile
+
+LOGGER = logging.getLogger(__name__)
+
+#: Identifies an asset pack
+PACK_MAGIC = b'JKAP'
+#: Asset pack format version
+PACK_VERSION = 1
+#: Alignment of the assets in the pack
+ALIGN = 16
+
+#: magic, version, number of entries
+HEADER = struct.Struct('<4sB3xI')
+#: offset, size, name length
+ENTRY = struct.Struct('<QQH')
+
+#: Name of the index of the packed levels (written by build_pack)
+LEVEL_INDEX = "levels/index.json"
+
+
+class AssetPackError(Exception):
+    '''
+    Error reading or writing an asset pack
+    '''
+    pass
+
+
+class AssetPack:
+    '''
+    A memory mapped asset pack
+    '''
+
+    def __init__(self, path):
+        #: Path of the pack
+        self.path = path
+        with open(path, 'rb') as pack_file:
+            self._mmap = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if len(self._mmap) < HEADER.size:
+            raise AssetPackError("Truncated asset pack: {}".format(path))
+        magic, version, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != PACK_MAGIC:
+            raise AssetPackError("Not an asset pack: {}".format(path))
+        if version != PACK_VERSION:
+            raise AssetPackError("Unsupported asset pack version {}: {}".format(version, path))
+
+        # name -> (offset, size)
+        self._index = {}
+        pos = HEADER.size
+        for _ in range(count):
+            offset, size, name_len = ENTRY.unpack_from(self._mmap, pos)
+            pos += ENTRY.size
+            name = bytes(self._mmap[pos:pos + name_len]).decode('utf-8')
+            pos += name_len
+            if offset + size > len(self._mmap):
+                raise AssetPackError("Truncated asset pack: {}".format(path))
+            self._index[name] = (offset, size)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def names(self, prefix=""):
+        '''
+        Get the names of the assets starting with prefix, sorted
+        '''
+        return sorted(name for name in self._index if name.startswith(prefix))
+
+    def get(self, name):
+        '''
+        Get an asset as a read only memoryview of the mapped pack
+        '''
+        try:
+            offset, size = self._index[name]
+        except KeyError:
+            raise KeyError("No asset named '{}' in {}".format(name, self.path))
+        return self._view[offset:offset + size]
+
+
+def write_pack(path, assets):
+    '''
+    Write an asset pack. assets is a list of (name, data). The file is
+    replaced atomically so a running game that maps the old pack isn't affected
+    '''
+    names = [name.encode('utf-8') for name, _ in assets]
+    index_size = HEADER.size + sum(ENTRY.size + len(name) for name in names)
+
+    index = bytearray(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(assets)))
+    data = bytearray()
+    offset = index_size
+    for name, (_, asset) in zip(names, assets):
+        pad = -offset % ALIGN
+        data += bytes(pad)
+        offset += pad
+        index += ENTRY.pack(offset, len(asset), len(name)) + name
+        data += asset
+        offset += len(asset)
+
+    handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(handle, 'wb') as pack_file:
+            pack_file.write(index)
+            pack_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def collect_files(prefix, root, extensions=None):
+    '''
+    Get (asset name, file path) of every file under root, sorted. Only files
+    ending with one of extensions if given
+    '''
+    found = []
+    for (dirpath, dirnames, filenames) in os.walk(root):
+        if '__pycache__' in dirnames:
+            dirnames.remove('__pycache__')
+        for filename in filenames:
+            if extensions is not None and not filename.endswith(tuple(extensions)):
+                continue
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            found.append((prefix + '/' + rel if prefix else rel, path))
+    return sorted(found)
+
+
+def build_pack(path, resource_path, level_path):
+    '''
+    Pack every file under resource_path and the levels in level_path into
+    one asset pack. The levels are searched like the LevelLoader does and an
+    index of them is added so the game doesn't have to import them to find
+    out which levels there are. Returns the number of assets packed
+    '''
+    from jackit2.core.loader import LevelLoader
+
+    files = collect_files("", resource_path)
+
+    # Only the files that define levels are packed, in level order
+    loader = LevelLoader()
+    loader.add_search_path(level_path)
+    levels = []
+    for stub in loader:
+        name = "levels/" + os.path.relpath(stub.path, level_path).replace(os.sep, '/')
+        files.append((name, stub.path))
+        levels.append({
+            "path": name, "module": stub.module_name, "level_num": stub.level_num, "name": stub.name
+        })
+
+    assets = []
+    for name, file_path in files:
+        with open(file_path, 'rb') as asset_file:
+            assets.append((name, asset_file.read()))
+    assets.append((LEVEL_INDEX, json.dumps({"levels": levels}, indent=1).encode('utf-8')))
+
+    write_pack(path, assets)
+    return len(assets)
+
+
+class AssetStore:
+    '''
+    Finds assets in the asset pack, or as loose files under the resource
+    directory if there's no pack or it isn't used (dev mode, so edited files
+    are picked up without rebuilding the pack)
+    '''
+
+    def __init__(self, resource_path, pack_path=None):
+        #: Directory loose assets are read from
+        self.resource_path = resource_path
+        #: The asset pack. None if assets are read from loose files
+        self.pack = None
+        if pack_path is not None:
+            try:
+                self.pack = AssetPack(pack_path)
+                LOGGER.debug("using asset pack: %s", pack_path)
+            except (OSError, ValueError, AssetPackError) as exc:
+                LOGGER.warning("not using asset pack %s: %s", pack_path, str(exc))
+
+    def names(self, prefix, extensions=None):
+        '''
+        Get the names of the assets in the directory prefix (e.g. 'textures'),
+        sorted. Only names ending with one of extensions if given
+        '''
+        if self.pack is not None:
+            names = self.pack.names(prefix + '/')
+            if extensions is not None:
+                names = [name for name in names if name.endswith(tuple(extensions))]
+            return names
+
+        root = os.path.join(self.resource_path, *prefix.split('/'))
+        return [name for name, _ in collect_files(prefix, root, extensions)]
+
+    def get(self, name):
+        '''
+        Get an asset's contents. A memoryview of the pack or bytes read from
+        the loose file
+        '''
+        if self.pack is not None:
+            return self.pack.get(name)
+
+        with open(os.path.join(self.resource_path, *name.split('/')), 'rb') as asset_file:
+            return asset_file.read()
+
+    def open(self, name):
+        '''
+        Get a binary file object for an asset, for libraries that read files
+        '''
+        if self.pack is not None:
+            return io.BytesIO(self.pack.get(name))
+        return open(os.path.join(self.resource_path, *name.split('/')), 'rb')
@@ -2,34 +2,110 @@
 Does the sound for the game
 '''
 
-import os
 import logging
+import threading
 
-import pygame
-
-from deploy import SITE_DEPLOYMENT
+from jackit2.util import get_site_deployment
+from jackit2.core.sound import SoundBank, NUM_CHANNELS, SOUND_EFFECTS
 
 LOGGER = logging.getLogger(__name__)
 
+#: Asset name of the background music
+GAME_MUSIC = "audio/music/music.mp3"
+
 
 class GameAudio:
     '''
-    Handles all the sound for the game
+    Handles all the sound for the game. pygame is imported, the mixer opened
+    and the music loaded on a background thread so a slow or missing audio
+    device never holds up the first frame. Until then playing and pausing
+    only record what should happen once the audio is ready
     '''
+    # pylint: disable=R0902
 
-    def __init__(self):
-        pygame.init()
-        game_music_path = os.path.join(SITE_DEPLOYMENT.audio_path, "music", "music.mp3")
+    def __init__(self, on_ready=None, assets=None, num_channels=NUM_CHANNELS):
+        #: Called with this GameAudio from the loading thread once loading is done (even if it failed)
+        self.on_ready = on_ready
+        #: True if the music was loaded
         self.music_loaded = False
-
+        #: Whether the music is playing (or will be once it's loaded)
+        self.playing = False
+        #: Set once loading is done
+        self.ready = threading.Event()
+        #: The SoundBank of sound effects. Created once loading is done (None if
+        #: it failed or num_channels is 0). Effects are added by load_effects()
+        self.sounds = None
+
+        self._num_channels = num_channels
+        # Effects asked for by load_effects() before the mixer was open
+        self._effects = set()
+        self._assets = assets
+        self._mixer = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._load, name="audio-loader", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        '''
+        Runs on the loading thread
+        '''
         try:
-            pygame.mixer.music.load(game_music_path)
+            import pygame
+
+            # Only the mixer is used. It fails if there's no audio device
+            pygame.mixer.init()
+            self._mixer = pygame.mixer
+            self._assets = self._assets or get_site_deployment().assets
+
+            if self._num_channels:
+                self.sounds = SoundBank(pygame.mixer, self._num_channels)
+
+            pygame.mixer.music.load(self._assets.open(GAME_MUSIC))
             self.music_loaded = True
-        except BaseException as exc:
+        except BaseException as exc:  # pylint: disable=W0703
             LOGGER.exception("Unable to load music: %s", str(exc))
             self.music_loaded = False
 
-        self.playing = False
+        with self._lock:
+            # Effects of a level that started while the mixer was opening
+            if self.sounds is not None and self._effects:
+                self._load_effects(self._effects)
+            self.ready.set()
+            if self.playing and self.music_loaded:
+                self._mixer.music.play(loops=-1)
+
+        if self.on_ready is not None:
+            try:
+                self.on_ready(self)
+            except Exception:  # pylint: disable=W0703
+                LOGGER.exception("audio ready callback failed")
+
+    def load_effects(self, names):
+        '''
+        Decode the sound effects (names in SOUND_EFFECTS) a level plays. Called
+        when the level starts. Effects already decoded are skipped. Before the
+        mixer is open they're decoded on the loading thread once it is
+        '''
+        with self._lock:
+            if not self.ready.is_set():
+                self._effects.update(names)
+                return
+        if self.sounds is not None:
+            self._load_effects(names)
+
+    def _load_effects(self, names):
+        '''
+        Decode the effects that aren't loaded yet
+        '''
+        effects = {name: SOUND_EFFECTS[name] for name in names if name not in self.sounds}
+        if effects:
+            self.sounds.load(self._assets, effects)
+
+    def wait(self, timeout=None):
+        '''
+        Wait up to timeout seconds for loading to finish. Returns True if it has
+        '''
+        return self.ready.wait(timeout)
 
     def is_playing(self):
         '''
@@ -41,29 +117,28 @@ class GameAudio:
         '''
         Play the game music
         '''
-        if not self.music_loaded:
-            return
-
-        pygame.mixer.music.play(loops=-1)
-        self.playing = True
+        with self._lock:
+            if self.ready.is_set():
+                if not self.music_loaded:
+                    return
+                self._mixer.music.play(loops=-1)
+            self.playing = True
 
     def pause_game_music(self):
         '''
         Pause the game music
         '''
-        if not self.music_loaded:
-            return
-
-        pygame.mixer.music.pause()
-        self.playing = False
+        with self._lock:
+            if self.ready.is_set():
+                if not self.music_loaded:
+                    return
+                self._mixer.music.pause()
+            self.playing = False
 
     def toggle_game_music(self):
         '''
         Toggle the game music on and off
         '''
-        if not self.music_loaded:
-            return
-
         if self.is_playing():
             self.pause_game_music()
         else:
@@ -0,0 +1,145 @@
+'''
+Picks performance settings for the machine the game runs on. A generated
+level is stepped and drawn (CPU side) for a moment and the highest framerate,
+render scale, effects level and physics substeps that fit in the frame time
+are saved to the config as a named performance profile.
+'''
+
+import time
+import logging
+import platform
+
+LOGGER = logging.getLogger(__name__)
+
+#: Framerates tried, highest first. The window is synced to the display so
+#: going above the most common refresh rate would slow the game down
+FRAMERATES = (60, 50, 40, 30)
+#: Render scales tried, largest first
+RENDER_SCALES = (1.0, 0.75, 0.5)
+#: Most physics substeps chosen
+MAX_SUBSTEPS = 4
+#: Fraction of a frame the game may use. The rest is left for the window
+#: system, the driver and the odd slow frame
+FRAME_BUDGET = 0.5
+#: ms per megapixel to draw a frame assumed if the fill rate can't be measured
+#: (no standalone OpenGL context). About what a laptop's integrated GPU takes
+DEFAULT_FILL_MS = 1.0
+
+#: Size (tiles) of the generated level timed. About as busy as a big level
+BENCH_LEVEL = (128, 64)
+#: Steps run before timing so the crates have settled, and steps timed
+WARMUP_STEPS = 30
+BENCH_STEPS = 90
+#: Frames drawn to time the fill rate
+FILL_FRAMES = 20
+
+#: Name of the profile calibrate() saves
+AUTO_PROFILE = "auto"
+
+
+def measure_physics(level_size=BENCH_LEVEL, warmup=WARMUP_STEPS, num_steps=BENCH_STEPS):
+    '''
+    Step a generated level. Returns (ms per physics step, ms per frame to
+    build the instance data that's uploaded to draw the entities)
+    '''
+    from jackit2.core.simulation import Simulation
+    from jackit2.core.stress import StressLevel
+
+    sim = Simulation(StressLevel(*level_size))
+    sim.run(warmup)
+
+    step_time = 0.0
+    draw_time = 0.0
+    for _ in range(num_steps):
+        start = time.perf_counter()
+        sim.step()
+        stepped = time.perf_counter()
+        for arch in sim.entity_mgr.archetypes():
+            if arch.count:
+                arch.instance_data()
+        step_time += stepped - start
+        draw_time += time.perf_counter() - stepped
+
+    sim.close()
+    return step_time * 1000 / num_steps, draw_time * 1000 / num_steps
+
+
+def measure_fill(resolution, num_frames=FILL_FRAMES):
+    '''
+    Clear an offscreen frame of resolution num_frames times. Returns ms per
+    megapixel, or None if there's no standalone OpenGL context (no display)
+    '''
+    try:
+        import moderngl
+        ctx = moderngl.create_standalone_context()
+    except Exception as exc:  # pylint: disable=W0703
+        LOGGER.debug("not measuring the fill rate: %s", str(exc))
+        return None
+
+    try:
+        frame = ctx.simple_framebuffer(resolution)
+        frame.use()
+        ctx.finish()
+        start = time.perf_counter()
+        for idx in range(num_frames):
+            frame.clear(idx / num_frames, 0.0, 0.0)
+        ctx.finish()
+        elapsed = time.perf_counter() - start
+    finally:
+        ctx.release()
+
+    return elapsed * 1000 / num_frames / (resolution[0] * resolution[1] / 1e6)
+
+
+def choose_profile(physics_ms, draw_ms, fill_ms, resolution):
+    '''
+    Choose the settings for the measured costs. The framerate matters most,
+    then the render scale and effects, then the physics substeps. Returns the
+    profile's PROFILE_SETTINGS
+    '''
+    megapixels = resolution[0] * resolution[1] / 1e6
+    for framerate in FRAMERATES:
+        budget = 1000.0 / framerate * FRAME_BUDGET
+        for scale in RENDER_SCALES:
+            frame_ms = physics_ms + draw_ms + fill_ms * megapixels * scale * scale
+            if frame_ms > budget:
+                continue
+
+            # Sound effects are cheap but call back into Python on every new
+            # contact. Only the reduced set when there's little to spare
+            effects = 2 if frame_ms * 2 <= budget else 1
+
+            substeps = 1
+            while substeps < MAX_SUBSTEPS and frame_ms + physics_ms * substeps <= budget:
+                substeps += 1
+            return {"framerate": framerate, "physics_substeps": substeps, "render_scale": scale, "effects": effects}
+
+    return {"framerate": FRAMERATES[-1], "physics_substeps": 1, "render_scale": RENDER_SCALES[-1], "effects": 0}
+
+
+def calibrate(config, name=AUTO_PROFILE, settings=None):
+    '''
+    Benchmark this machine and apply the chosen settings (only those in
+    settings if set) to config as the profile name. The config isn't saved.
+    Returns the profile
+    '''
+    resolution = (config.width, config.height)
+    physics_ms, draw_ms = measure_physics()
+    fill_ms = measure_fill(resolution)
+    LOGGER.info(
+        "calibration: physics step %.2f ms, instance data %.2f ms, fill %s ms/megapixel",
+        physics_ms, draw_ms, "{:.2f}".format(fill_ms) if fill_ms is not None else "not measured"
+    )
+
+    profile = choose_profile(physics_ms, draw_ms, DEFAULT_FILL_MS if fill_ms is None else fill_ms, resolution)
+    profile["benchmark"] = {
+        "physics_step_ms": round(physics_ms, 3),
+        "instance_data_ms": round(draw_ms, 3),
+        "fill_ms_per_megapixel": None if fill_ms is None else round(fill_ms, 3),
+        "resolution": list(resolution),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    config.apply_profile(name, profile, settings)
+    return profile
@@ -79,6 +79,13 @@ class Camera:
         '''
         self.pos = [0, 0, self.screen_size[0], self.screen_size[1]]
 
+    def view_rect(self):
+        '''
+        Get the (left, bottom, right, top) of the area of the level in view
+        '''
+        cam_x, cam_y, width, height = self.pos
+        return (cam_x - width, cam_y - height, cam_x + width, cam_y + height)
+
     def update(self, target):
         '''
         Update camera position based on target position
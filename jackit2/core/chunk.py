@@ -0,0 +1,345 @@
+'''
+Splits a level into fixed size chunks of tiles. Only the chunks near the
+camera and player have their entities in the EntityManager and their bodies
+in the physics space so memory and solver cost depend on the view, not on
+the size of the map.
+'''
+
+import math
+
+import numpy as np
+
+from jackit2.core import BLOCK_HEIGHT, BLOCK_WIDTH
+
+#: Width and height of a chunk in tiles
+CHUNK_TILES = 16
+#: Width of a chunk in pixels
+CHUNK_WIDTH = CHUNK_TILES * BLOCK_WIDTH
+#: Height of a chunk in pixels
+CHUNK_HEIGHT = CHUNK_TILES * BLOCK_HEIGHT
+
+
+class LevelChunk:
+    '''
+    A CHUNK_TILES x CHUNK_TILES block of a level's tiles
+    '''
+
+    def __init__(self, chunk_x, chunk_y):
+        #: (x, y) of the chunk in chunk coordinates
+        self.key = (chunk_x, chunk_y)
+        #: (ent_cls, (n, 2) array of x, y) for each group of tiles of the map in the chunk
+        self.tiles = []
+        #: True while the chunk's entities are in the level
+        self.active = False
+
+        # Live static entities while active
+        self._static = []
+        # (ent_cls, state) of dynamic entities frozen while inactive. None until the
+        # chunk is activated the first time (the dynamic tiles from the map are used)
+        self._saved = None
+
+    def add_tiles(self, ent_cls, positions):
+        '''
+        Add tiles of type ent_cls from the map at the (x, y) positions
+        '''
+        self.tiles.append((ent_cls, positions))
+
+    def freeze(self, entity):
+        '''
+        Save the state of a dynamic entity that is in this chunk while it's inactive
+        '''
+        if self._saved is None:
+            # Never activated. The chunk's own dynamic tiles haven't been spawned yet
+            self._saved = [
+                (ent_cls, (x_pos, y_pos, 0.0, 0.0, 0.0, 0.0))
+                for ent_cls, positions in self.tiles if not ent_cls.entity_type.static
+                for x_pos, y_pos in positions.tolist()
+            ]
+        self._saved.append((entity.__class__, entity.get_state()))
+
+    def activate(self, entity_mgr):
+        '''
+        Add the chunk's entities to the level. Their bodies are all added to
+        the space at once
+        '''
+        entities = []
+        for ent_cls, positions in self.tiles:
+            if ent_cls.entity_type.static:
+                static = [entity_mgr.acquire(ent_cls, x_pos, y_pos) for x_pos, y_pos in positions.tolist()]
+                self._static.extend(static)
+                entities.extend(static)
+            elif self._saved is None:
+                entities.extend(entity_mgr.acquire(ent_cls, x_pos, y_pos) for x_pos, y_pos in positions.tolist())
+
+        for ent_cls, state in self._saved or ():
+            entity = entity_mgr.acquire(ent_cls, state[0], state[1])
+            entity.set_state(state)
+            entities.append(entity)
+
+        entity_mgr.add_many(entities)
+        self._saved = []
+        self.active = True
+
+    def deactivate(self, entity_mgr):
+        '''
+        Remove the chunk's static entities from the level. Dynamic entities
+        are frozen by the ChunkStreamer
+        '''
+        for entity in self._static:
+            entity_mgr.release(entity)
+        self._static = []
+        self.active = False
+
+    def place_tile(self, entity_mgr, ent_cls, x_pos, y_pos):
+        '''
+        Add a tile to the map of a loaded level. If the chunk is active the
+        tile's entity is added to the level right away
+        '''
+        self.tiles.append((ent_cls, np.array([[x_pos, y_pos]], dtype=float)))
+
+        if self.active:
+            entity = entity_mgr.spawn(ent_cls, x_pos, y_pos)
+            if ent_cls.entity_type.static:
+                self._static.append(entity)
+        elif self._saved is not None and not ent_cls.entity_type.static:
+            # Dynamic entities of a chunk that was active before come from _saved
+            self._saved.append((ent_cls, (x_pos, y_pos, 0.0, 0.0, 0.0, 0.0)))
+
+    def clear_tile(self, entity_mgr, ent_cls, x_pos, y_pos):
+        '''
+        Remove a tile from the map of a loaded level along with its entity. For
+        dynamic tiles the entity of that type still on the tile is removed, if any
+        '''
+        for idx, (tile_cls, positions) in enumerate(self.tiles):
+            if tile_cls is not ent_cls:
+                continue
+            match = (positions[:, 0] == x_pos) & (positions[:, 1] == y_pos)
+            if match.any():
+                self.tiles[idx] = (tile_cls, positions[~match])
+                break
+        self.tiles = [(tile_cls, positions) for tile_cls, positions in self.tiles if len(positions)]
+
+        if ent_cls.entity_type.static:
+            for entity in self._static:
+                if entity.__class__ is ent_cls and (entity.x_pos, entity.y_pos) == (x_pos, y_pos):
+                    self._static.remove(entity)
+                    entity_mgr.release(entity)
+                    break
+        elif self.active:
+            for entity in entity_mgr.query_point(x_pos, y_pos):
+                if entity.__class__ is ent_cls:
+                    entity_mgr.release(entity)
+                    break
+        elif self._saved:
+            half_width, half_height = ent_cls.entity_type.width / 2, ent_cls.entity_type.height / 2
+            for idx, (saved_cls, state) in enumerate(self._saved):
+                if saved_cls is ent_cls and abs(state[0] - x_pos) < half_width and \
+                        abs(state[1] - y_pos) < half_height:
+                    del self._saved[idx]
+                    break
+
+    def capture(self):
+        '''
+        Get the frozen dynamic entities of the chunk for restore()
+        '''
+        return None if self._saved is None else list(self._saved)
+
+    def restore(self, entity_mgr, active, saved):
+        '''
+        Put the chunk back to a captured state. Static entities are only added
+        or removed if the chunk's active state changes. The dynamic entities
+        of an active chunk are restored by the caller
+        '''
+        if self.active and not active:
+            self.deactivate(entity_mgr)
+        elif active and not self.active:
+            self._static = [
+                entity_mgr.acquire(ent_cls, x_pos, y_pos)
+                for ent_cls, positions in self.tiles if ent_cls.entity_type.static
+                for x_pos, y_pos in positions.tolist()
+            ]
+            entity_mgr.add_many(self._static)
+            self.active = True
+
+        self._saved = None if saved is None else list(saved)
+
+
+class ChunkStreamer:
+    '''
+    Activates the chunks near a set of focus rectangles (the camera view and
+    the player) and deactivates the rest
+    '''
+
+    def __init__(self, width, height, margin=1):
+        #: Number of chunk columns
+        self.cols = max(1, math.ceil(width / CHUNK_TILES))
+        #: Number of chunk rows
+        self.rows = max(1, math.ceil(height / CHUNK_TILES))
+        #: Number of extra chunks kept active around each focus rectangle
+        self.margin = margin
+        #: Every chunk in the level keyed by (x, y)
+        self.chunks = {
+            (chunk_x, chunk_y): LevelChunk(chunk_x, chunk_y)
+            for chunk_x in range(self.cols) for chunk_y in range(self.rows)
+        }
+
+        # Active flag of each chunk so entity positions can be tested in bulk
+        self._active = np.zeros((self.cols, self.rows), dtype=bool)
+        # Keys of the active chunks
+        self._active_keys = set()
+
+    @staticmethod
+    def chunk_coords(x_pos, y_pos):
+        '''
+        Get the chunk coordinates containing pixel coordinates. Works on
+        scalars and NumPy arrays
+        '''
+        chunk_x = np.floor((x_pos + BLOCK_WIDTH / 2) / CHUNK_WIDTH).astype(int)
+        chunk_y = np.floor((y_pos + BLOCK_HEIGHT / 2) / CHUNK_HEIGHT).astype(int)
+        return chunk_x, chunk_y
+
+    def add_tiles(self, ent_cls, cols, rows):
+        '''
+        Add tiles of type ent_cls at the map columns and rows in the arrays cols
+        and rows (row 0 is the bottom of the level). The tiles are grouped by
+        chunk without looping over them in Python
+        '''
+        cols = np.asarray(cols, dtype=int)
+        rows = np.asarray(rows, dtype=int)
+        if not cols.size:
+            return
+
+        keys = (cols // CHUNK_TILES) * self.rows + rows // CHUNK_TILES
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        positions = np.column_stack((cols[order] * BLOCK_WIDTH, rows[order] * BLOCK_HEIGHT)).astype(float)
+
+        splits = np.flatnonzero(np.diff(keys)) + 1
+        for group_keys, group in zip(np.split(keys, splits), np.split(positions, splits)):
+            chunk_x, chunk_y = divmod(int(group_keys[0]), self.rows)
+            self.chunks[(chunk_x, chunk_y)].add_tiles(ent_cls, group)
+
+    def grow(self, width, height):
+        '''
+        Add chunks so a map of width x height tiles is covered. Never shrinks
+        '''
+        cols = max(self.cols, math.ceil(width / CHUNK_TILES))
+        rows = max(self.rows, math.ceil(height / CHUNK_TILES))
+        if (cols, rows) == (self.cols, self.rows):
+            return
+
+        for chunk_x in range(cols):
+            for chunk_y in range(rows):
+                if (chunk_x, chunk_y) not in self.chunks:
+                    self.chunks[(chunk_x, chunk_y)] = LevelChunk(chunk_x, chunk_y)
+
+        active = np.zeros((cols, rows), dtype=bool)
+        active[:self.cols, :self.rows] = self._active
+        self._active = active
+        self.cols, self.rows = cols, rows
+
+    def place_tile(self, entity_mgr, ent_cls, col, row):
+        '''
+        Add a tile to the map of a loaded level at map column and row
+        '''
+        self.chunks[(col // CHUNK_TILES, row // CHUNK_TILES)].place_tile(
+            entity_mgr, ent_cls, float(col * BLOCK_WIDTH), float(row * BLOCK_HEIGHT)
+        )
+
+    def clear_tile(self, entity_mgr, ent_cls, col, row):
+        '''
+        Remove a tile from the map of a loaded level at map column and row
+        '''
+        self.chunks[(col // CHUNK_TILES, row // CHUNK_TILES)].clear_tile(
+            entity_mgr, ent_cls, float(col * BLOCK_WIDTH), float(row * BLOCK_HEIGHT)
+        )
+
+    def capture(self):
+        '''
+        Get the streaming state: the active chunks and the frozen dynamic
+        entities of every chunk
+        '''
+        return frozenset(self._active_keys), {key: chunk.capture() for key, chunk in self.chunks.items()}
+
+    def restore(self, entity_mgr, state):
+        '''
+        Put the chunks back to a state from capture()
+        '''
+        active_keys, saved = state
+        for key, chunk in self.chunks.items():
+            chunk.restore(entity_mgr, key in active_keys, saved[key])
+
+        self._active[:] = False
+        for key in active_keys:
+            self._active[key] = True
+        self._active_keys = set(active_keys)
+
+    @property
+    def active_chunks(self):
+        '''
+        Get the chunks that are currently active
+        '''
+        return [self.chunks[key] for key in self._active_keys]
+
+    def wanted(self, rects):
+        '''
+        Get the keys of the chunks overlapping any of rects (left, bottom, right, top)
+        grown by margin chunks on every side
+        '''
+        keys = set()
+        for left, bottom, right, top in rects:
+            left_x, bottom_y = self.chunk_coords(left, bottom)
+            right_x, top_y = self.chunk_coords(right, top)
+            for chunk_x in range(max(0, left_x - self.margin), min(self.cols, right_x + self.margin + 1)):
+                for chunk_y in range(max(0, bottom_y - self.margin), min(self.rows, top_y + self.margin + 1)):
+                    keys.add((chunk_x, chunk_y))
+        return keys
+
+    def _freeze_inactive(self, entity_mgr, keep):
+        '''
+        Freeze and remove every dynamic entity positioned in an inactive chunk.
+        Entities outside the level are left alone
+        '''
+        for arch in list(entity_mgr.archetypes()):
+            if arch.static or not arch.count:
+                continue
+
+            pos = arch.positions[:arch.count]
+            chunk_x, chunk_y = self.chunk_coords(pos[:, 0], pos[:, 1])
+            inside = (chunk_x >= 0) & (chunk_x < self.cols) & (chunk_y >= 0) & (chunk_y < self.rows)
+            inactive = inside.copy()
+            inactive[inside] = ~self._active[chunk_x[inside], chunk_y[inside]]
+
+            # Releasing moves rows around so grab everything before releasing
+            frozen = [
+                (arch.entities[idx], (int(chunk_x[idx]), int(chunk_y[idx])))
+                for idx in inactive.nonzero()[0]
+            ]
+            for entity, key in frozen:
+                if entity in keep:
+                    continue
+                self.chunks[key].freeze(entity)
+                entity_mgr.release(entity)
+
+    def update(self, entity_mgr, rects, keep=()):
+        '''
+        Stream chunks in and out so only the chunks near rects are active.
+        Entities in keep (the player) are never frozen
+        '''
+        wanted = self.wanted(rects)
+
+        leaving = [self.chunks[key] for key in self._active_keys - wanted]
+        for chunk in leaving:
+            self._active[chunk.key] = False
+            self._active_keys.discard(chunk.key)
+
+        # Runs every update since dynamic bodies can also fall or roll into inactive chunks
+        self._freeze_inactive(entity_mgr, keep)
+
+        for chunk in leaving:
+            chunk.deactivate(entity_mgr)
+
+        for key in wanted - self._active_keys:
+            self.chunks[key].activate(entity_mgr)
+            self._active[key] = True
+            self._active_keys.add(key)
@@ -5,18 +5,22 @@ Main game engine
 import struct
 import logging
 
-import moderngl
-import pymunk
-
-from jackit2.core import VERTEX_SHADER, FRAGMENT_SHADER
-from jackit2.util import get_config, get_texture_loader, get_level_loader
+from jackit2.core import VERTEX_SHADER, FRAGMENT_SHADER, BLIT_VERTEX_SHADER, BLIT_FRAGMENT_SHADER
+from jackit2.util import get_config, get_texture_loader, get_level_loader, get_startup_profiler
 from jackit2.core.camera import Camera, complex_camera
-from jackit2.core.entity import EntityManager
-from jackit2.core.audio import GameAudio
 from jackit2.core.input import InputEventType
+from jackit2.core.replay import InputRecorder
+from jackit2.core.rewind import RewindBuffer
+from jackit2.core.hotreload import LevelWatcher
+from jackit2.core.sound import EFFECT_CHANNELS
+from jackit2.core.store import INSTANCE_BYTES
+from jackit2.core.texture import get_next_location
 
 LOGGER = logging.getLogger(__name__)
 
+#: Instances the instance buffer holds to begin with
+INSTANCE_RESERVE = 4096
+
 
 class SetupFailed(Exception):
     '''
@@ -50,31 +54,43 @@ class EngineSingleton:
         self.levels = get_level_loader()
         #: Loads all textures
         self.textures = get_texture_loader()
-        #: Deals with game audio
-        self.audio = GameAudio()
-        #: List of registered input handling functions
-        self.input_handlers = {}
+        #: Deals with game audio. Initialized in setup()
+        self.audio = None
         #: True if dev mode is enabled
         self.dev_mode = self.config.is_development_mode()
 
+        #: The moderngl module. Imported by setup() so importing the engine doesn't load OpenGL
+        self.gl = None
         #: The game context
         self.ctx = None
         #: Vertex and fragment shader programs
         self.program = None
-        #: Pymunk simulation space
-        self.space = None
+        #: The simulation of the current level (physics and game logic). Initialized in setup()
+        self.sim = None
+        #: Index of the current level in the level loader
+        self.level_index = 0
+        #: Builds the next level in the background. Initialized in setup()
+        self.preloader = None
+        #: Applies edits of the running level's file (dev mode only)
+        self.watcher = None
+        #: If set, the session's input is recorded and saved to this path on quit
+        self.record_path = None
+        #: True while the rewind key is held (dev mode only)
+        self.rewinding = False
+        #: True if the next level was asked for before the preloader finished building it
+        self.level_pending = False
         #: The camera position
         self.camera = None
         #: The mouse position
         self.mouse_pos = None
-        #: The entity manager. Has all entities to be rendered. Initialized in setup()
-        self.entity_mgr = None
-        #: The player
-        self.player = None
         #: The frame buffer
         self.frame_buffer = None
         #: The vertex array
         self.vertex_array = None
+        #: Frame the level is drawn to when the render scale is below 1 (None otherwise)
+        self.scene = None
+        #: Draws the scene over the whole window (None if there's no scene)
+        self.blit_array = None
 
         #: Total points
         self.total_points = 0
@@ -84,13 +100,22 @@ class EngineSingleton:
         self.width = 0
         #: Window height (populated in setup())
         self.height = 0
-        #: The amount to step the physics engine on each frame
-        self.physics_step = 0
+        #: The framerate the simulation is stepped at (populated in setup())
+        self.framerate = 0
+        #: Physics substeps per step (populated in setup())
+        self.substeps = 1
 
     def setup(self, width, height, framerate):
         '''
         Called to setup the OpenGL context
         '''
+        profiler = get_startup_profiler()
+        with profiler.phase("import OpenGL and physics"):
+            import moderngl
+            from jackit2.core.simulation import Simulation
+            from jackit2.core.preload import LevelPreloader
+        self.gl = moderngl
+
         if not self.levels:
             raise SetupFailed("No levels could be loaded")
 
@@ -98,18 +123,17 @@ class EngineSingleton:
         self.width = width
         self.height = height
 
-        # How much to step the physics on each frame
-        self.physics_step = 1.0 / framerate
+        # The physics is stepped once per frame. Recordings are replayed
+        # without substeps so they're recorded without them too
+        self.framerate = framerate
+        self.substeps = 1 if self.record_path else self.config.physics_substeps
 
         # Initialize modern GL context, camera, and shaders
-        self.ctx = moderngl.create_context(require=430)
-        self.ctx.viewport = (0, 0, self.width, self.height)
-        self.camera = Camera((self.width, self.height), complex_camera, initial_scale=self.config.high_dpi_scaling)
-        self.program = self.ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
-
-        # Initialize physics
-        self.space = pymunk.Space()
-        self.space.gravity = (0.0, -900.0)
+        with profiler.phase("OpenGL context and shaders"):
+            self.ctx = moderngl.create_context(require=430)
+            self.ctx.viewport = (0, 0, self.width, self.height)
+            self.camera = Camera((self.width, self.height), complex_camera, initial_scale=self.config.high_dpi_scaling)
+            self.program = self.ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
 
         vbo = self.ctx.buffer(struct.pack(
             '16f', -1.0, -1.0, 0.0, 0.0,
@@ -118,7 +142,8 @@ class EngineSingleton:
             1.0, 1.0, 1.0, 1.0,
         ))
 
-        self.frame_buffer = self.ctx.buffer(reserve=(self.width * self.height))
+        # Holds the instance data of one archetype at a time. Grown when drawing if an archetype doesn't fit
+        self.frame_buffer = self.ctx.buffer(reserve=INSTANCE_RESERVE * INSTANCE_BYTES)
 
         varray_content = [
             (vbo, '2f 2f', 'in_vert', 'in_texture'),
@@ -127,47 +152,176 @@ class EngineSingleton:
 
         self.vertex_array = self.ctx.vertex_array(self.program, varray_content)
 
-        # Create the entity manager to draw and update all objects
-        self.entity_mgr = EntityManager(self.space, self.frame_buffer, self.vertex_array, self.program)
+        # Below a render scale of 1 the level is drawn to a smaller frame which
+        # is stretched over the window, so fewer pixels are shaded
+        if self.config.render_scale < 1:
+            self._setup_scene(vbo)
 
         # Load textures
-        self.textures.load(self.ctx)
+        with profiler.phase("textures"):
+            self.textures.load(self.ctx)
 
-        # Load the level
-        lvl_width, lvl_height, self.player = self.levels[0].load(self.entity_mgr)
+        # Load the level and create the simulation to update all objects
+        renderer = (self.frame_buffer, self.vertex_array, self.program)
+        with profiler.phase("first level"):
+            self.sim = Simulation(self.levels[0], self.framerate, renderer=renderer, substeps=self.substeps)
 
-        # Update the camera
-        self.camera.load_level((lvl_width, lvl_height))
+        if self.record_path:
+            self.sim.recorder = InputRecorder(self.sim)
+
+        self._start_level(self.sim, 0)
+
+        if self.dev_mode:
+            self.watcher = LevelWatcher(self.levels)
+
+        # Build the next level in the background while this one is played
+        self.preloader = LevelPreloader(self.framerate, renderer, self.substeps)
+        self._preload_next()
+
+        # Init the sound. It loads in the background and starts the music once it's ready
+        with profiler.phase("audio"):
+            from jackit2.core.audio import GameAudio
+            self.audio = GameAudio(on_ready=self._audio_ready, num_channels=EFFECT_CHANNELS[self.config.effects])
+            if self.config.effects:
+                self.audio.load_effects(self.sim.level.sound_effects)
 
-        # Init the sound
-        self.audio = GameAudio()
+            # Decides whether the sound is on by default or not
+            if self.config.music_enabled:
+                self.audio.play_game_music()
 
-        # Decides whether the sound is on by default or not
-        if self.config.music_enabled:
-            self.audio.play_game_music()
+    def _setup_scene(self, vbo):
+        '''
+        Create the frame the level is drawn to at the render scale and the
+        program that stretches it over the window. vbo is the quad's vertices
+        '''
+        texture = self.ctx.texture((self.config.render_width, self.config.render_height), 4)
+        texture.filter = (self.gl.LINEAR, self.gl.LINEAR)
+        location = get_next_location()
+        texture.use(location=location)
+        self.scene = self.ctx.framebuffer(color_attachments=[texture])
+
+        blit_program = self.ctx.program(vertex_shader=BLIT_VERTEX_SHADER, fragment_shader=BLIT_FRAGMENT_SHADER)
+        blit_program["Scene"].value = location
+        self.blit_array = self.ctx.vertex_array(blit_program, [(vbo, '2f 2f', 'in_vert', 'in_texture')])
+
+    def _audio_ready(self, audio):  # pylint: disable=R0201
+        '''
+        Called from the audio loading thread once the audio is loaded
+        '''
+        get_startup_profiler().mark("audio ready")
+        LOGGER.debug("audio ready. music loaded: %s", audio.music_loaded)
 
     def update(self):
         '''
         Updates all game components
         '''
-        # Clear the screen
+        # Clear the screen (or the smaller frame the level is drawn to)
+        if self.scene is not None:
+            self.scene.use()
         self.ctx.clear(0, 0, 0)
-        self.ctx.enable(moderngl.BLEND)
+        self.ctx.enable(self.gl.BLEND)
+
+        # Switch to the next level once it's built. Until then the current one is played
+        if self.level_pending:
+            self._switch_level()
+
+        # Apply edits of the level file in dev mode
+        if self.watcher is not None and self.watcher.poll(self.sim):
+            self.camera.load_level((self.sim.width, self.sim.height))
 
-        # Step the physics engine a constant amount. We're banking on the
-        # framerate being consistent. If the framerate is lower than in the
-        # settings it should be adjusted to compensate for slower hardware
-        self.space.step(self.physics_step)
+        # Step the physics and game logic. Keeps the level around the camera active
+        self.sim.view_rect = self.camera.view_rect()
+        if not self.rewinding or self.sim.rewind is None or not self.sim.rewind.restore(self.sim):
+            deaths = self.sim.deaths
+            self.sim.step()
+            self.deaths += self.sim.deaths - deaths
+
+        # Play the step's sound effects. Dropped while the audio is still loading
+        events = self.sim.sounds.drain() if self.sim.sounds is not None else None
+        if events and self.audio.sounds is not None:
+            self.audio.sounds.play_events(events)
 
         if self.mouse_pos is None:
             # Update the camera to follow the player
-            self.camera.update(self.player)
+            self.camera.update(self.sim.player)
 
         # Display the camera
         self.camera.draw(self.program)
 
         # Draw all entities
-        self.entity_mgr.draw()
+        self.sim.entity_mgr.draw()
+
+        # Stretch the smaller frame over the window
+        if self.scene is not None:
+            self.ctx.screen.use()
+            self.ctx.viewport = (0, 0, self.width, self.height)
+            self.ctx.disable(self.gl.BLEND)
+            self.blit_array.render(self.gl.TRIANGLE_STRIP)
+
+        get_startup_profiler().finish()
+
+    def _start_level(self, sim, index):
+        '''
+        Make sim the simulation being played
+        '''
+        if self.dev_mode and sim.recorder is None:
+            # Keep the last few seconds so the level can be rewound while 'r' is held.
+            # Not while recording, the recorded steps have to keep counting up
+            sim.rewind = RewindBuffer(framerate=self.framerate)
+
+        if self.config.effects:
+            sim.enable_sounds()
+            # The first level's effects are loaded once the audio is created in setup()
+            if self.audio is not None:
+                self.audio.load_effects(sim.level.sound_effects)
+        if self.sim is not None and self.sim is not sim:
+            self.sim.close()
+        self.sim = sim
+        self.level_index = index
+
+        # Update the camera
+        self.camera.load_level((sim.width, sim.height))
+
+    def _preload_next(self):
+        '''
+        Start building the level after the current one, if there is one
+        '''
+        if self.level_index + 1 < len(self.levels):
+            self.preloader.start(self.levels, self.level_index + 1)
+
+    def next_level(self):
+        '''
+        Switch to the next level. It's normally already built by the preloader
+        so only the simulation is swapped. If it's still being built the current
+        level keeps being played and the switch happens on the first frame after
+        it's done. Returns False if this is the last level
+        '''
+        if self.preloader.index is None:
+            return False
+
+        self.level_pending = True
+        self._switch_level()
+        return True
+
+    def _switch_level(self):
+        '''
+        Swap in the preloaded level if it's done building. Returns True if it was
+        '''
+        if not self.preloader.ready():
+            return False
+
+        index = self.preloader.index
+        sim = self.preloader.take()
+        self.level_pending = False
+
+        if self.sim.recorder is not None:
+            # Recordings are of a single level
+            self.sim.recorder.recording.save(self.record_path)
+            LOGGER.info("level changed; saved input recording: %s", self.record_path)
+
+        self._start_level(sim, index)
+        self._preload_next()
+        return True
 
     def handle_input_event(self, event, event_type):
         '''
@@ -175,14 +329,18 @@ class EngineSingleton:
         '''
 
         # First call the registered handlers
-        for handler in self.input_handlers.get(event_type, []):
-            if not handler(event):
-                break  # If a handler returns false don't pass the event to any other handlers
+        if self.sim is not None:
+            self.sim.handle_input_event(event, event_type)
 
         if self.dev_mode:
             # In dev mode we allow some additional controls
             # for level/camera exploring
-            if event_type == InputEventType.MOUSE_PRESS:
+            if event_type in (InputEventType.KEY_PRESS, InputEventType.KEY_RELEASE):
+                if event.text() == "r":
+                    self.rewinding = event_type == InputEventType.KEY_PRESS
+                elif event.text() == "n" and event_type == InputEventType.KEY_PRESS and not event.isAutoRepeat():
+                    self.next_level()
+            elif event_type == InputEventType.MOUSE_PRESS:
                 self.mouse_press(event.x(), event.y())
             elif event_type == InputEventType.MOUSE_RELEASE:
                 self.mouse_release(event.x(), event.y())
@@ -191,13 +349,11 @@ class EngineSingleton:
             elif event_type == InputEventType.MOUSE_WHEEL:
                 self.mouse_wheel(event.angleDelta().y())
 
-    def register_event_handler(self, handler, event_type):
+    def register_event_handler(self, handler, event_type, key=None):
         '''
         Register an event handler
         '''
-        if event_type not in self.input_handlers:
-            self.input_handlers[event_type] = []
-        self.input_handlers[event_type].append(handler)
+        self.sim.input.register(handler, event_type, key)
 
     def mouse_press(self, x_pos, y_pos):
         '''
@@ -234,11 +390,15 @@ class EngineSingleton:
         '''
         self.camera.zoom(delta)
 
-    def quit(self):  # pylint: disable=R0201
+    def quit(self):
         '''
         Quits the game
         '''
         LOGGER.debug("EngineSingleton.quit()")
 
+        if self.preloader is not None:
+            self.preloader.shutdown()
 
-GAME_ENGINE = EngineSingleton.instance()
+        if self.sim is not None and self.sim.recorder is not None:
+            self.sim.recorder.recording.save(self.record_path)
+            LOGGER.info("saved input recording: %s", self.record_path)
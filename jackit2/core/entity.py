@@ -3,11 +3,18 @@ Base class for all game objects and helper methods to create them
 '''
 # pylint: disable=R0913
 
-import struct
+from collections import namedtuple
 
-import moderngl
 import pymunk
 
+from jackit2.core import BLOCK_HEIGHT, BLOCK_WIDTH
+from jackit2.core.spatial import SpatialGrid
+from jackit2.core.store import Archetype
+from jackit2.util import get_texture_loader
+
+#: Result of EntityManager.raycast(). alpha is the fraction along the ray of the hit
+RaycastHit = namedtuple('RaycastHit', ['entity', 'point', 'alpha'])
+
 
 def create_static_box(x_pos, y_pos, width, height, friction):
     '''
@@ -44,42 +51,81 @@ def create_circle(x_pos, y_pos, radius, mass, friction):
     return shape
 
 
-class Entity:
+class EntityType:
     '''
-    Represents any objects drawn on screen that's
-    not the player or enemies (those are actors)
+    Data shared by every instance of an entity type. Each Entity subclass
+    has exactly one of these so per-instance objects only hold their shape
     '''
-    # pylint: disable=R0902
+    # pylint: disable=R0902,R0903
+
+    __slots__ = (
+        'texture_name', 'width', 'height', 'static',
+        'collectable', 'breakable', 'value', 'contains', 'physical', '_texture'
+    )
+
+    def __init__(self, texture_name, width=BLOCK_WIDTH, height=BLOCK_HEIGHT, static=False,
+                 collectable=False, breakable=False, value=None, contains=None, physical=True):
+        # pylint: disable=R0913
+        #: Name of the texture used to draw the entity
+        self.texture_name = texture_name
+        #: Width of the entity
+        self.width = width
+        #: Height of the entity
+        self.height = height
+        #: If True, this item cannot be moved and has no physics applied
+        self.static = static
+        #: Whether or not this entity can be collected
+        self.collectable = collectable
+        #: Whether or not the entity can be broken
+        self.breakable = breakable
+        #: The value of the item if collected. Can be callable or number
+        self.value = value
+        #: An optional collectable entity class that this object contains.
+        #: Will appear when broken if it's breakable
+        self.contains = contains
+        #: If False the entity's body is never added to the pymunk space. It only
+        #: holds the entity's position and the entity is found with a grid instead
+        self.physical = physical
+        # Looked up on first use since textures are loaded after the GL context exists
+        self._texture = None
 
-    def __init__(self, x_pos, y_pos, width, height, shape, texture, static=False):
-        self._x_pos = x_pos
-        self._y_pos = y_pos
-        self._width = width
-        self._height = height
+    @property
+    def texture(self):
+        '''
+        The texture for the entity type
+        '''
+        if self._texture is None:
+            self._texture = get_texture_loader().get_texture_by_name(self.texture_name)
+        return self._texture
 
-        # The pymunk shape
-        self._shape = shape
 
-        # The texture for the object
-        self._texture = texture
+class Entity:
+    '''
+    Represents any objects drawn on screen that's
+    not the player or enemies (those are actors).
+
+    Entities are thin handles. The data the game systems work on lives in
+    the columns of the entity's Archetype in row _index
+    '''
+    # pylint: disable=R0904
 
-        # If True, this item cannot be moved and has no physics applied
-        self._static = static
+    # __weakref__ lets input handlers reference their entity weakly
+    __slots__ = ('_shape', '_archetype', '_index', '_spawn', '__weakref__')
 
-        # Whether or not this entity can be collected
-        # Set by subclass
-        self._collectable = False
+    #: Data shared by all instances of the entity. Set by subclass
+    entity_type = None
 
-        # The value of the item if collected
-        # Set by subclass. Can be callable or number
-        self._value = None
+    def __init__(self, shape):
+        # The pymunk shape
+        self._shape = shape
 
-        # Whether or not the entity can be broken
-        self._breakable = False
+        # The column store and row the entity lives in. None/-1 when not in a level
+        self._archetype = None
+        self._index = -1
 
-        # An optional collectable entity that this object contains
-        # Will appear when broken if it's breakable
-        self._contains = None
+        # EntityManager generation the entity was added at. Tells a pooled
+        # entity's current life apart from an earlier one. -1 when not in a level
+        self._spawn = -1
 
     @property
     def x_pos(self):
@@ -102,28 +148,51 @@ class Entity:
         '''
         return self._shape.body.angle
 
+    @property
+    def body(self):
+        '''
+        Get the pymunk body
+        '''
+        return self._shape.body
+
+    @property
+    def shape(self):
+        '''
+        Get the pymunk shape
+        '''
+        return self._shape
+
     @property
     def width(self):
         '''
         Get the width of the object
         '''
-        return self._width
+        return self.entity_type.width
 
     @property
     def height(self):
         '''
         Get the height of the object
         '''
-        return self._height
+        return self.entity_type.height
+
+    def bounds(self):
+        '''
+        Get the (left, bottom, right, top) axis aligned bounding box of the entity
+        '''
+        half_w = self.width / 2
+        half_h = self.height / 2
+        return (self.x_pos - half_w, self.y_pos - half_h, self.x_pos + half_w, self.y_pos + half_h)
 
     @property
     def value(self):
         '''
         Get the value of the item
         '''
-        if callable(self._value):
-            return self._value()  # pylint: disable=E1102
-        return self._value
+        value = self.entity_type.value
+        if callable(value):
+            return value()
+        return value
 
     def apply_world_force(self, x_force, y_force, world_x=None, world_y=None):
         '''
@@ -165,46 +234,139 @@ class Entity:
         '''
         space.add(self._shape.body, self._shape)
 
+    def remove_from_space(self, space):
+        '''
+        Remove this object from the pymunk space
+        '''
+        space.remove(self._shape.body, self._shape)
+
+    def reset(self, x_pos, y_pos):
+        '''
+        Reset the entity so it can be reused at a new position
+        '''
+        body = self._shape.body
+        body.position = pymunk.Vec2d(x_pos, y_pos)
+        body.angle = 0
+        body.velocity = pymunk.Vec2d(0, 0)
+        body.angular_velocity = 0
+        body.force = pymunk.Vec2d(0, 0)
+        body.torque = 0
+
     def is_collectable(self):
         '''
         Return whether or not the entity is collectable
         '''
-        return self._collectable
+        return self.entity_type.collectable
+
+    def get_state(self):
+        '''
+        Get the (x, y, angle, x velocity, y velocity, angular velocity) of the body
+        '''
+        body = self._shape.body
+        return (
+            body.position.x, body.position.y, body.angle,
+            body.velocity.x, body.velocity.y, body.angular_velocity
+        )
+
+    def set_state(self, state):
+        '''
+        Restore a state from get_state()
+        '''
+        x_pos, y_pos, angle, vel_x, vel_y, ang_vel = state
+        body = self._shape.body
+        body.position = pymunk.Vec2d(x_pos, y_pos)
+        body.angle = angle
+        body.velocity = pymunk.Vec2d(vel_x, vel_y)
+        body.angular_velocity = ang_vel
+
+    def is_physical(self):
+        '''
+        Returns whether or not the entity takes part in the physics simulation
+        '''
+        return self.entity_type.physical
 
     def is_static(self):
         '''
         Returns whether or not the entity is static
         '''
-        return self._static
+        return self.entity_type.static
 
     def is_breakable(self):
         '''
         Returns whether or not the entity is breakable
         '''
-        return self._breakable
+        return self.entity_type.breakable
+
+    def get_contains(self):
+        '''
+        Returns the entity class that appears when this entity is broken
+        '''
+        return self.entity_type.contains
 
     def get_texture(self):
         '''
         Return the location attribute of the texture
         '''
-        return self._texture
+        return self.entity_type.texture
 
-    def to_bytes(self):
+    @property
+    def tint(self):
         '''
-        Convert the object raw bytes to be written to the OpenGL buffer
+        The (r, g, b, a) tint applied over the texture
         '''
-        return struct.pack(
-            '3f2f4f', self.x_pos, self.y_pos,
-            self.angle, (self.width / 2), (self.height / 2),
-            1, 1, 1, 0
-        )
+        if self._archetype is None:
+            return None
+        return tuple(self._archetype.tints[self._index].tolist())
+
+    @tint.setter
+    def tint(self, value):
+        '''
+        Set the tint. Only valid while the entity is in a level
+        '''
+        self._archetype.set_tint(self._index, value)
+
+    def get_index(self):
+        '''
+        Returns the entity's row in its archetype
+        '''
+        return self._index
+
+    def set_index(self, index, archetype=None, spawn=None):
+        '''
+        Set the entity's row (and optionally archetype and the generation
+        it was added at) in the column store
+        '''
+        if archetype is not None:
+            self._archetype = archetype
+        if spawn is not None:
+            self._spawn = spawn
+        self._index = index
+
+    def clear_index(self):
+        '''
+        Called when the entity is removed from the column store
+        '''
+        self._archetype = None
+        self._index = -1
+        self._spawn = -1
+
+    def get_spawn(self):
+        '''
+        Returns the EntityManager generation the entity was added at (-1 if
+        it isn't in a level)
+        '''
+        return self._spawn
 
 
 class EntityManager:
     '''
-    Has list of all entities for a level (static and dynamic) and handles rendering
-    them efficiently
+    Has all entities for a level (static and dynamic) and handles rendering
+    them efficiently. Entity data is kept per type in column stores (Archetype)
+    so systems like rendering and reaping are vectorized passes. Entities removed
+    from the level are kept in a per-type pool and recycled by spawn() so churn
+    does not allocate new bodies and shapes
     '''
+    # pylint: disable=R0902,R0904
 
     def __init__(self, space, frame_buffer, vertex_array, program):
         # The pymunk space
@@ -219,7 +381,80 @@ class EntityManager:
         # The modern GL shader program
         self.program = program
 
-        self._entities = {}
+        # Primitive the entities are drawn with. moderngl is only imported if there's something to draw with
+        self._draw_mode = None
+        if vertex_array is not None:
+            import moderngl
+            self._draw_mode = moderngl.TRIANGLE_STRIP
+
+        # Column store for each entity type. Keyed by type name
+        self._archetypes = {}
+
+        # Released entities (with their body and shape) waiting to be reused. Keyed by type
+        self._pools = {}
+
+        # Maps pymunk shapes back to the entity that owns them for spatial queries
+        self._shape_index = {}
+
+        # Spatial index for entities that are not in the pymunk space
+        self._grid = SpatialGrid()
+
+        #: Incremented every time an entity is added or removed
+        self.generation = 0
+
+        # Removed entities whose body and shape are still in the space. They are
+        # taken out of the space in one call by flush() after the physics step
+        self._pending_removal = {}
+
+        #: Optional SoundEvents the break and collect sounds are emitted into
+        self.sounds = None
+
+    def __len__(self):
+        '''
+        Returns the number of live entities
+        '''
+        return sum(arch.count for arch in self._archetypes.values())
+
+    def __iter__(self):
+        '''
+        Iterate over all live entities
+        '''
+        for arch in self._archetypes.values():
+            yield from arch.entities
+
+    def archetypes(self):
+        '''
+        Get the column stores of every entity type
+        '''
+        return self._archetypes.values()
+
+    def dynamic_entities(self):
+        '''
+        Get every live non-static entity in a stable order
+        '''
+        return [entity for arch in self._archetypes.values() if not arch.static for entity in arch.entities]
+
+    def dynamic_bodies(self):
+        '''
+        Get the bodies of every live non-static entity in a stable order
+        '''
+        return [body for arch in self._archetypes.values() if not arch.static for body in arch.bodies]
+
+    def dynamic_owners(self):
+        '''
+        Get (entity, generation it was added at) of every live non-static
+        entity, in the same order as dynamic_bodies()
+        '''
+        return [
+            (entity, entity.get_spawn())
+            for arch in self._archetypes.values() if not arch.static for entity in arch.entities
+        ]
+
+    def get_archetype(self, ent_cls):
+        '''
+        Get the column store for an entity type or None if there isn't one
+        '''
+        return self._archetypes.get(ent_cls.__name__)
 
     def add(self, entity):
         '''
@@ -228,22 +463,302 @@ class EntityManager:
         '''
         ent_type = entity.__class__.__name__
 
-        if ent_type not in self._entities:
-            self._entities[ent_type] = []
+        if ent_type not in self._archetypes:
+            self._archetypes[ent_type] = Archetype(entity.entity_type)
+
+        arch = self._archetypes[ent_type]
+        self.generation += 1
+        entity.set_index(arch.add(entity, entity.body), arch, self.generation)
+
+        if entity.is_physical():
+            self._shape_index[entity.shape] = entity
+            if entity in self._pending_removal:
+                # Removed and re-added before flush(). The body never left the space
+                del self._pending_removal[entity]
+                self.space.reindex_shapes_for_body(entity.body)
+            else:
+                entity.add_to_space(self.space)
+        else:
+            self._grid.insert(entity, entity.bounds())
+
+    def add_many(self, entities):
+        '''
+        Add several entities. Every body and shape that isn't already in the
+        space is added to it in a single call
+        '''
+        by_type = {}
+        for entity in entities:
+            by_type.setdefault(entity.__class__, []).append(entity)
+
+        self.generation += 1
+        objs = []
+        for ent_cls, group in by_type.items():
+            ent_type = ent_cls.__name__
+            if ent_type not in self._archetypes:
+                self._archetypes[ent_type] = Archetype(ent_cls.entity_type)
+
+            arch = self._archetypes[ent_type]
+            start = arch.add_many(group, [entity.body for entity in group])
+            for idx, entity in enumerate(group, start):
+                entity.set_index(idx, arch, self.generation)
+
+            if not ent_cls.entity_type.physical:
+                for entity in group:
+                    self._grid.insert(entity, entity.bounds())
+                continue
+
+            for entity in group:
+                shape = entity.shape
+                self._shape_index[shape] = entity
+                if entity in self._pending_removal:
+                    del self._pending_removal[entity]
+                    self.space.reindex_shapes_for_body(shape.body)
+                else:
+                    objs.append(shape.body)
+                    objs.append(shape)
+
+        if objs:
+            self.space.add(*objs)
+
+    def spawn(self, ent_cls, x_pos, y_pos, *args):
+        '''
+        Add an entity of type ent_cls at (x_pos, y_pos). Reuses a pooled
+        entity if one is available, otherwise creates a new one with
+        ent_cls(x_pos, y_pos, *args)
+        '''
+        entity = self.acquire(ent_cls, x_pos, y_pos, *args)
+        self.add(entity)
+        return entity
+
+    def acquire(self, ent_cls, x_pos, y_pos, *args):
+        '''
+        Get a pooled entity of type ent_cls reset to (x_pos, y_pos) or create
+        one with ent_cls(x_pos, y_pos, *args). It isn't added to the level
+        '''
+        pool = self._pools.get(ent_cls.__name__)
+        if pool:
+            entity = pool.pop()
+            entity.reset(x_pos, y_pos)
+            return entity
+        return ent_cls(x_pos, y_pos, *args)
+
+    def spawn_many(self, ent_cls, positions, *args):
+        '''
+        spawn() an entity of type ent_cls at every (x, y) in positions and add
+        them all at once with add_many(). Returns the entities
+        '''
+        entities = [self.acquire(ent_cls, x_pos, y_pos, *args) for x_pos, y_pos in positions]
+        self.add_many(entities)
+        return entities
+
+    def remove(self, entity):
+        '''
+        Remove the entity from the level in O(1). The last entity of the same
+        type takes its row. The body and shape stay in the space until flush()
+        so this is safe to call during the physics step. Returns False (and
+        does nothing) if the entity isn't in the level, e.g. already removed
+        '''
+        if entity.get_index() < 0:
+            return False
+
+        ent_type = entity.__class__.__name__
+        self._archetypes[ent_type].remove(entity.get_index())
+        entity.clear_index()
+        self.generation += 1
+
+        if entity.is_physical():
+            del self._shape_index[entity.shape]
+            self._pending_removal[entity] = (entity.body, entity.shape)
+        else:
+            self._grid.remove(entity)
+        return True
+
+    def remove_many(self, entities):
+        '''
+        Remove several entities from the level
+        '''
+        for entity in entities:
+            self.remove(entity)
+
+    def flush(self):
+        '''
+        Remove the bodies and shapes of every removed entity from the
+        space in a single call. Called once after the physics step
+        '''
+        if not self._pending_removal:
+            return
+
+        objs = [obj for pair in self._pending_removal.values() for obj in pair]
+        self._pending_removal.clear()
+        self.space.remove(*objs)
+
+    def release(self, entity):
+        '''
+        Remove the entity from the level and return it to the pool
+        for its type so it can be reused by spawn(). An entity that isn't in
+        the level isn't pooled again
+        '''
+        ent_type = entity.__class__.__name__
+        if not self.remove(entity):
+            return
+
+        if ent_type not in self._pools:
+            self._pools[ent_type] = []
+        self._pools[ent_type].append(entity)
 
-        self._entities[ent_type].append(entity)
-        entity.add_to_space(self.space)
+    def prefill(self, ent_cls, count, *args):
+        '''
+        Create count pooled entities of type ent_cls ahead of time so the
+        first spawns during gameplay don't have to allocate
+        '''
+        ent_type = ent_cls.__name__
+        if ent_type not in self._pools:
+            self._pools[ent_type] = []
+
+        pool = self._pools[ent_type]
+        while len(pool) < count:
+            pool.append(ent_cls(0, 0, *args))
+
+    def pool_size(self, ent_cls):
+        '''
+        Get the number of pooled entities of type ent_cls
+        '''
+        return len(self._pools.get(ent_cls.__name__, []))
+
+    def break_entity(self, entity):
+        '''
+        Break a breakable entity. The entity is released and the
+        entity it contains (if any) is spawned in its place and returned
+        '''
+        if not entity.is_breakable():
+            return None
+
+        x_pos, y_pos = entity.x_pos, entity.y_pos
+        contains = entity.get_contains()
+        self.release(entity)
+        if self.sounds is not None:
+            self.sounds.emit("break")
+
+        if contains is None:
+            return None
+        return self.spawn(contains, x_pos, y_pos)
+
+    def collect(self, entity):
+        '''
+        Collect a collectable entity. The entity is released and
+        its value is returned
+        '''
+        if not entity.is_collectable():
+            return None
+
+        value = entity.value
+        self.release(entity)
+        if self.sounds is not None:
+            self.sounds.emit("collect")
+        return value
+
+    def move(self, entity, x_pos, y_pos):
+        '''
+        Teleport a live entity to (x_pos, y_pos) keeping the spatial indexes up to date
+        '''
+        entity.body.position = pymunk.Vec2d(x_pos, y_pos)
+        if not entity.is_physical():
+            self._grid.move(entity, entity.bounds())
+        elif entity.is_static():
+            self.space.reindex_shapes_for_body(entity.body)
+
+    def _shape_entities(self, shapes):
+        '''
+        Map pymunk shapes back to the entities that own them
+        '''
+        index = self._shape_index
+        return [index[shape] for shape in shapes if shape in index]
+
+    def query_point(self, x_pos, y_pos):
+        '''
+        Get the entities under the point (x_pos, y_pos)
+        '''
+        hits = self.space.point_query((x_pos, y_pos), 0, pymunk.ShapeFilter())
+        return self._shape_entities(hit.shape for hit in hits) + self._grid.query_point(x_pos, y_pos)
+
+    def query_rect(self, left, bottom, right, top):
+        '''
+        Get the entities overlapping the rectangle (left, bottom, right, top)
+        '''
+        shapes = self.space.bb_query(pymunk.BB(left, bottom, right, top), pymunk.ShapeFilter())
+        return self._shape_entities(shapes) + self._grid.query_rect(left, bottom, right, top)
+
+    def query_radius(self, x_pos, y_pos, radius):
+        '''
+        Get the entities within radius of the point (x_pos, y_pos)
+        '''
+        hits = self.space.point_query((x_pos, y_pos), radius, pymunk.ShapeFilter())
+        return self._shape_entities(hit.shape for hit in hits) + self._grid.query_radius(x_pos, y_pos, radius)
+
+    def raycast(self, start, end, radius=0):
+        '''
+        Get a RaycastHit for every entity along the segment start -> end,
+        nearest first. A radius > 0 sweeps a circle instead of a line
+        '''
+        hits = []
+        for info in self.space.segment_query(start, end, radius, pymunk.ShapeFilter()):
+            entity = self._shape_index.get(info.shape)
+            if entity is not None:
+                hits.append(RaycastHit(entity, tuple(info.point), info.alpha))
+
+        for entity, alpha in self._grid.query_segment(start, end):
+            point = (start[0] + (end[0] - start[0]) * alpha, start[1] + (end[1] - start[1]) * alpha)
+            hits.append(RaycastHit(entity, point, alpha))
+
+        hits.sort(key=lambda hit: hit.alpha)
+        return hits
+
+    def update(self):
+        '''
+        Copy body state into the column stores. Called once after each physics step
+        '''
+        for arch in self._archetypes.values():
+            arch.sync()
+
+    def reap(self, death_zone, keep=(), reaped=None):
+        '''
+        Release every entity outside death_zone (left, bottom, right, top) except
+        those in keep. Returns the entities outside the zone that were kept. If
+        reaped is a list, (entity class name, x, y) is appended to it for every
+        entity released
+        '''
+        kept = []
+        for arch in self._archetypes.values():
+            if arch.static or not arch.count:
+                continue
+
+            outside = arch.outside(*death_zone).nonzero()[0]
+            for entity in [arch.entities[idx] for idx in outside]:
+                if entity in keep:
+                    kept.append(entity)
+                else:
+                    if reaped is not None:
+                        reaped.append((type(entity).__name__, entity.x_pos, entity.y_pos))
+                    self.release(entity)
+        return kept
 
     def draw(self):
         '''
         Draw the entities on the screen
         '''
-        for _, entities in self._entities.items():
-            # Entities are grouped by type and drawn all at once (per type)
-            self.frame_buffer.write(b''.join(ent.to_bytes() for ent in entities))
+        for arch in self._archetypes.values():
+            if not arch.count:
+                continue
+
+            # Entities are grouped by type and drawn all at once (per type).
+            # Grow the buffer if they don't fit. Doubled so it's rarely grown
+            data = arch.instance_data()
+            if data.nbytes > self.frame_buffer.size:
+                self.frame_buffer.orphan(max(data.nbytes, self.frame_buffer.size * 2))
+            self.frame_buffer.write(data)
 
             # Since we're grouping by type, they should all share the same texture
-            self.program["Texture"].value = entities[0].get_texture().location
+            self.program["Texture"].value = arch.entity_type.texture.location
 
-            self.vertex_array.render(moderngl.TRIANGLE_STRIP, instances=len(entities))
+            self.vertex_array.render(self._draw_mode, instances=arch.count)
             self.frame_buffer.orphan()
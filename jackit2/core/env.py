@@ -0,0 +1,293 @@
+'''
+Environment API for bots and automated playtesting. LevelEnv wraps a single
+headless Simulation, VectorEnv steps many of them in one process and
+ProcessVectorEnv shards a VectorEnv across worker processes. Actions,
+observations, rewards and done flags are passed through NumPy arrays that
+ProcessVectorEnv keeps in shared memory.
+'''
+
+import multiprocessing
+
+import numpy as np
+
+from jackit2.core import BLOCK_WIDTH
+from jackit2.core.input import InputEventType, KeyEvent
+from jackit2.core.physics import STATE_SIZE, read_body_states
+from jackit2.core.simulation import Simulation
+
+#: Action bit flags. An action is any combination of them
+ACTION_NONE = 0
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_JUMP = 4
+
+#: Key pressed for each action bit
+ACTION_KEYS = (
+    (ACTION_LEFT, "a"),
+    (ACTION_RIGHT, "d"),
+    (ACTION_JUMP, " "),
+)
+
+#: Observation values: player x, y, angle, x velocity, y velocity, angular velocity
+OBS_SIZE = STATE_SIZE
+
+#: Default number of steps before an episode ends
+MAX_STEPS = 3600
+
+
+class LevelEnv:
+    '''
+    A single level. Reward is the distance the player moved right, in blocks.
+    An episode is done when the player dies (leaves the level) or after max_steps steps
+    '''
+
+    def __init__(self, level_cls, framerate=60, max_steps=MAX_STEPS):
+        #: Level class instantiated on every reset
+        self.level_cls = level_cls
+        #: Framerate the simulation is stepped at
+        self.framerate = framerate
+        #: Number of steps in an episode
+        self.max_steps = max_steps
+        #: The simulation. Built by the first reset() and restarted by the later ones
+        self.sim = None
+        #: The action of the last step. Its keys are held until an action without them
+        self.action = ACTION_NONE
+        # True if the last step ended with a death and the level already restarted itself
+        self._restarted = False
+
+        # One KeyEvent per action bit, reused on every step
+        self._events = [(bit, KeyEvent(text)) for bit, text in ACTION_KEYS]
+
+    def reset(self):
+        '''
+        Start a new episode. Returns the first observation. The level is only
+        built once, later episodes restart it from its snapshot
+        '''
+        if self.sim is None:
+            self.sim = Simulation(self.level_cls(), self.framerate)
+        elif not self._restarted:
+            self.sim.restart()
+
+        # Episodes are counted from step 0 with no keys held
+        self.sim.steps = 0
+        self.sim.input.release_keys()
+        self.action = ACTION_NONE
+        self._restarted = False
+        return self.observe()
+
+    def close(self):
+        '''
+        Tear down the simulation
+        '''
+        if self.sim is not None:
+            self.sim.close()
+            self.sim = None
+
+    def observe(self):
+        '''
+        Get the current observation
+        '''
+        return read_body_states((self.sim.player.body,))[0].astype(np.float32)
+
+    def step(self, action):
+        '''
+        Apply an action for one step. The keys of the action are held down
+        (pressed if they weren't already), the others released. Returns
+        (observation, reward, done)
+        '''
+        sim = self.sim
+        changed = action ^ self.action
+        for bit, event in self._events:
+            if changed & bit:
+                event_type = InputEventType.KEY_PRESS if action & bit else InputEventType.KEY_RELEASE
+                sim.handle_input_event(event, event_type)
+        self.action = action
+
+        start_x = sim.player.x_pos
+        deaths = sim.deaths
+        sim.step()
+        obs = self.observe()
+
+        if sim.deaths != deaths:
+            # The player has already been respawned
+            self._restarted = True
+            return obs, 0.0, True
+        return obs, (obs[0] - start_x) / BLOCK_WIDTH, sim.steps >= self.max_steps
+
+
+class VectorEnv:
+    '''
+    num_envs independent LevelEnvs stepped together. Environments that finish
+    an episode are reset right away and their done flag is set for that step.
+    The (observations, rewards, dones) arrays can be passed in so they can
+    live in shared memory
+    '''
+
+    def __init__(self, level_cls, num_envs, framerate=60, max_steps=MAX_STEPS, arrays=None):
+        #: The environments
+        self.envs = [LevelEnv(level_cls, framerate, max_steps) for _ in range(num_envs)]
+        if arrays is None:
+            arrays = (
+                np.zeros((num_envs, OBS_SIZE), dtype=np.float32),
+                np.zeros(num_envs, dtype=np.float32),
+                np.zeros(num_envs, dtype=np.bool_),
+            )
+        #: (num_envs, OBS_SIZE) float32 observations
+        self.observations = arrays[0]
+        #: (num_envs,) float32 reward of the last step
+        self.rewards = arrays[1]
+        #: (num_envs,) bool, True if the environment's episode ended on the last step
+        self.dones = arrays[2]
+
+    def __len__(self):
+        return len(self.envs)
+
+    def reset(self):
+        '''
+        Reset every environment. Returns the observations
+        '''
+        for idx, env in enumerate(self.envs):
+            self.observations[idx] = env.reset()
+        self.rewards[:] = 0
+        self.dones[:] = False
+        return self.observations
+
+    def step(self, actions):
+        '''
+        Step every environment with its action. Returns (observations, rewards, dones)
+        '''
+        for idx, (env, action) in enumerate(zip(self.envs, actions.tolist())):
+            obs, self.rewards[idx], done = env.step(action)
+            self.dones[idx] = done
+            self.observations[idx] = env.reset() if done else obs
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        '''
+        Tear down every environment's simulation
+        '''
+        for env in self.envs:
+            env.close()
+
+
+def _shared_array(ctype, shape, dtype):
+    '''
+    Allocate a shared memory block and return it with a NumPy view of it
+    '''
+    size = int(np.prod(shape))
+    raw = multiprocessing.RawArray(ctype, size)
+    return raw, np.frombuffer(raw, dtype=dtype, count=size).reshape(shape)
+
+
+def _shard_views(shared, start, stop):
+    '''
+    NumPy views of rows [start, stop) of the shared (actions, observations,
+    rewards, dones) arrays
+    '''
+    raw_actions, raw_obs, raw_rewards, raw_dones = shared
+    total = len(raw_rewards)
+    return (
+        np.frombuffer(raw_actions, dtype=np.uint8, count=total)[start:stop],
+        np.frombuffer(raw_obs, dtype=np.float32).reshape(total, OBS_SIZE)[start:stop],
+        np.frombuffer(raw_rewards, dtype=np.float32, count=total)[start:stop],
+        np.frombuffer(raw_dones, dtype=np.bool_, count=total)[start:stop],
+    )
+
+
+def _worker(conn, level_cls, env_options, shared, rows):
+    '''
+    Runs a VectorEnv over the (start, stop) rows of the shared arrays.
+    env_options are the VectorEnv's (framerate, max_steps)
+    '''
+    actions, observations, rewards, dones = _shard_views(shared, *rows)
+    vec = VectorEnv(level_cls, rows[1] - rows[0], *env_options, arrays=(observations, rewards, dones))
+
+    while True:
+        cmd = conn.recv()
+        if cmd == "step":
+            vec.step(actions)
+        elif cmd == "reset":
+            vec.reset()
+        else:
+            break
+        conn.send(None)
+    vec.close()
+    conn.close()
+
+
+class ProcessVectorEnv:
+    '''
+    Same interface as VectorEnv with the environments sharded across worker
+    processes. Actions are written to the shared actions array and the
+    returned observations, rewards and dones are views of shared memory that
+    are overwritten by the next step
+    '''
+
+    def __init__(self, level_cls, num_envs, num_workers=None, framerate=60, max_steps=MAX_STEPS):
+        num_workers = min(num_envs, num_workers or multiprocessing.cpu_count())
+        self.num_envs = num_envs
+
+        raw_actions, self.actions = _shared_array('B', (num_envs,), np.uint8)
+        raw_obs, self.observations = _shared_array('f', (num_envs, OBS_SIZE), np.float32)
+        raw_rewards, self.rewards = _shared_array('f', (num_envs,), np.float32)
+        raw_dones, self.dones = _shared_array('B', (num_envs,), np.uint8)
+        self.dones = self.dones.view(np.bool_)
+        shared = (raw_actions, raw_obs, raw_rewards, raw_dones)
+
+        self._conns = []
+        self._procs = []
+        self._start_workers(level_cls, (framerate, max_steps), shared, num_workers)
+
+    def _start_workers(self, level_cls, env_options, shared, num_workers):
+        '''
+        Start the worker processes, each with an even share of the environments
+        '''
+        bounds = np.linspace(0, self.num_envs, num_workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            parent, child = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_worker, args=(child, level_cls, env_options, shared, (start, stop)), daemon=True
+            )
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def __len__(self):
+        return self.num_envs
+
+    def _call(self, cmd):
+        '''
+        Send a command to every worker and wait for them to finish it
+        '''
+        for conn in self._conns:
+            conn.send(cmd)
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self):
+        '''
+        Reset every environment. Returns the observations
+        '''
+        self._call("reset")
+        return self.observations
+
+    def step(self, actions):
+        '''
+        Step every environment with its action. Returns (observations, rewards, dones)
+        '''
+        self.actions[:] = actions
+        self._call("step")
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        '''
+        Stop the worker processes
+        '''
+        for conn in self._conns:
+            conn.send("close")
+            conn.close()
+        for proc in self._procs:
+            proc.join()
+        self._conns = []
+        self._procs = []
@@ -0,0 +1,81 @@
+'''
+Dev mode hot reload. Watches the file of the level being played and applies
+edits to the running level without rebuilding it.
+'''
+
+import os
+import time
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+#: Seconds between checks of the level file
+POLL_INTERVAL = 0.5
+
+
+class LevelWatcher:
+    '''
+    Polls the modification time of the running level's file from the game
+    loop. Polling keeps every change to the physics space on the thread that
+    steps it and needs no extra dependencies
+    '''
+
+    def __init__(self, levels, interval=POLL_INTERVAL):
+        #: The LevelLoader
+        self.levels = levels
+        #: Seconds between checks
+        self.interval = interval
+
+        self._next_poll = 0
+        # (path, mtime) of the file last seen
+        self._watched = None
+
+    def poll(self, sim):
+        '''
+        Check the running level's file and apply any edit. Returns True if
+        the level changed
+        '''
+        now = time.monotonic()
+        if now < self._next_poll:
+            return False
+        self._next_poll = now + self.interval
+
+        stub = self.levels.get_stub(sim.level.level_num)
+        if stub is None:
+            return False
+
+        try:
+            mtime = os.path.getmtime(stub.path)
+        except OSError:
+            return False
+
+        if self._watched is None or self._watched[0] != stub.path:
+            self._watched = (stub.path, mtime)
+            return False
+        if self._watched[1] == mtime:
+            return False
+        self._watched = (stub.path, mtime)
+
+        return self.apply(sim, stub.path)
+
+    def apply(self, sim, path):
+        '''
+        Re-import the level file and apply its map to the running level
+        '''
+        start = time.perf_counter()
+        stub = self.levels.reload_file(path)
+        if stub is None:
+            LOGGER.warning("level file no longer defines a level; not reloaded: %s", path)
+            return False
+
+        try:
+            changed = sim.reload_map(stub().level_map)
+        except Exception:  # pylint: disable=W0703
+            LOGGER.exception("could not apply the edited level: %s", path)
+            return False
+
+        LOGGER.info(
+            "hot reloaded %s: %d tiles changed in %.1f ms",
+            os.path.basename(path), changed, (time.perf_counter() - start) * 1000
+        )
+        return True
@@ -1,10 +1,18 @@
 '''
-User input classes/methods
+User input classes/methods. Key events are timestamped and queued as they
+arrive and only processed once per simulation step: they're folded into a
+key state bitmap and the handlers registered for each (event type, key) are
+called for presses and releases. Continuous actions (like moving while a key
+is held) read the key state from a step handler instead of relying on key repeat
 '''
 
+import time
+import weakref
+import inspect
+import threading
+import contextlib
 from enum import Enum
-
-from jackit2.util import get_game_engine
+from collections import deque
 
 
 class InputEventType(Enum):
@@ -19,9 +27,287 @@ class InputEventType(Enum):
     MOUSE_WHEEL = 5
 
 
-def register_event_handler(handler, event_type):
+#: Event types that are queued and folded into the key state
+KEY_EVENTS = (InputEventType.KEY_PRESS, InputEventType.KEY_RELEASE)
+
+
+class Key:
+    '''
+    Key codes. The same values as Qt's so no Qt import is needed
+    '''
+    # pylint: disable=R0903
+    SPACE = 0x20
+    A = 0x41
+    D = 0x44
+    W = 0x57
+
+
+class KeyEvent:
+    '''
+    Key event with the same interface as the Qt key events the game
+    receives. Used to feed input to the game without Qt
+    '''
+
+    __slots__ = ('_key', '_text')
+
+    def __init__(self, text, key=None):
+        self._text = text
+        # Qt key codes for letters, numbers and space are their uppercase ASCII value
+        self._key = key if key is not None else ord(text.upper())
+
+    def key(self):
+        '''
+        Get the key code
+        '''
+        return self._key
+
+    def text(self):
+        '''
+        Get the text the key produces
+        '''
+        return self._text
+
+    def isAutoRepeat(self):  # pylint: disable=C0103,R0201
+        '''
+        Events made with this class are never key repeats
+        '''
+        return False
+
+
+class KeyState:
+    '''
+    Which keys are held, as a bitmap. Each key code gets a bit the first
+    time it's seen
+    '''
+
+    def __init__(self):
+        #: Bitmap of the keys held
+        self.down = 0
+        # Key code -> bit
+        self._bits = {}
+
+    def _bit(self, key):
+        bit = self._bits.get(key)
+        if bit is None:
+            bit = self._bits[key] = 1 << len(self._bits)
+        return bit
+
+    def press(self, key):
+        '''
+        Mark a key as held. Returns False if it already was
+        '''
+        bit = self._bit(key)
+        if self.down & bit:
+            return False
+        self.down |= bit
+        return True
+
+    def release(self, key):
+        '''
+        Mark a key as released. Returns False if it wasn't held
+        '''
+        bit = self._bit(key)
+        if not self.down & bit:
+            return False
+        self.down &= ~bit
+        return True
+
+    def is_down(self, key):
+        '''
+        Check if a key is held
+        '''
+        return bool(self.down & self._bits.get(key, 0))
+
+    def clear(self):
+        '''
+        Release every key
+        '''
+        self.down = 0
+
+
+def _handler_ref(handler):
+    '''
+    Get a callable returning handler, or None once it's gone. Bound methods
+    are referenced weakly so registering one doesn't keep its object (the
+    player and through it the level's physics objects) alive. Plain functions
+    are kept
+    '''
+    if inspect.ismethod(handler):
+        return weakref.WeakMethod(handler)
+    return lambda: handler
+
+
+class InputDispatcher:
+    '''
+    Queues input events and passes them to the registered handlers once per
+    step. Each thread has its own current dispatcher so a level can be built
+    on a worker thread without its actors registering with the level being played
+    '''
+
+    _local = threading.local()
+
+    def __init__(self):
+        #: References to the registered input handling functions by (event
+        #: type, key). Key is None for handlers of every event of the type
+        self.handlers = {}
+        #: References to the functions called with the KeyState on every step
+        self.step_handlers = []
+        #: The keys held as of the last processed step
+        self.keys = KeyState()
+        #: Seconds the oldest event processed on the last step waited in the queue
+        self.latency = 0.0
+
+        # (time queued, event type, KeyEvent) waiting for the next step
+        self._queue = deque()
+
+    @classmethod
+    def create(cls):
+        '''
+        Create an input dispatcher and make it the one handlers are registered
+        with on the calling thread
+        '''
+        dispatcher = cls()
+        InputDispatcher._local.instance = dispatcher
+        return dispatcher
+
+    @classmethod
+    def get(cls):
+        '''
+        Get or create the calling thread's current input dispatcher
+        '''
+        return getattr(cls._local, 'instance', None) or cls.create()
+
+    @contextlib.contextmanager
+    def current(self):
+        '''
+        Make this the calling thread's current dispatcher for the with block.
+        Used to scope the handlers registered while a level loads to the level
+        '''
+        previous = getattr(InputDispatcher._local, 'instance', None)
+        InputDispatcher._local.instance = self
+        try:
+            yield self
+        finally:
+            InputDispatcher._local.instance = previous
+
+    def register(self, handler, event_type, key=None):
+        '''
+        Register an event handler for the events of a type, or only for one
+        key's events if key is given. Bound methods are held weakly and are
+        dropped once their object is gone
+        '''
+        self.handlers.setdefault((event_type, key), []).append(_handler_ref(handler))
+
+    def register_step(self, handler):
+        '''
+        Register a function called with the KeyState once per step. Held
+        weakly like register()
+        '''
+        self.step_handlers.append(_handler_ref(handler))
+
+    def unregister(self, handler, event_type, key=None):
+        '''
+        Remove an event handler
+        '''
+        refs = self.handlers.get((event_type, key), [])
+        refs[:] = [ref for ref in refs if ref() != handler]
+
+    def unregister_step(self, handler):
+        '''
+        Remove a step handler
+        '''
+        self.step_handlers[:] = [ref for ref in self.step_handlers if ref() != handler]
+
+    def clear(self):
+        '''
+        Remove every handler and queued event and release all keys. Called
+        when the level is torn down
+        '''
+        self.handlers.clear()
+        self.step_handlers.clear()
+        self.release_keys()
+
+    def release_keys(self):
+        '''
+        Drop the queued events and release all keys without calling any handlers
+        '''
+        self._queue.clear()
+        self.keys.clear()
+
+    def queue(self, event, event_type):
+        '''
+        Queue a key event for the next step. Key repeats are dropped since
+        held keys are tracked by the key state. Other events are dispatched
+        right away (they don't affect the simulation). Safe to call from any thread
+        '''
+        if event_type not in KEY_EVENTS:
+            self.dispatch(event, event_type)
+        elif not event.isAutoRepeat():
+            # Copy the event. Qt reuses its event objects once the callback returns
+            self._queue.append((time.perf_counter(), event_type, KeyEvent(event.text(), event.key())))
+
+    def process(self):
+        '''
+        Apply the queued events in order and call the step handlers. Called
+        once at the start of every step
+        '''
+        self.latency = 0.0
+        if self._queue:
+            self.latency = time.perf_counter() - self._queue[0][0]
+
+        keys = self.keys
+        while self._queue:
+            _, event_type, event = self._queue.popleft()
+            key = event.key()
+            changed = keys.press(key) if event_type == InputEventType.KEY_PRESS else keys.release(key)
+            if changed:
+                self.dispatch(event, event_type, key)
+
+        self.call_step_handlers()
+
+    def call_step_handlers(self):
+        '''
+        Call the step handlers with the key state. Also called between the
+        physics substeps of a step since forces only last one physics step
+        '''
+        keys = self.keys
+        for handler in _live(self.step_handlers):
+            handler(keys)
+
+    def dispatch(self, event, event_type, key=None):
+        '''
+        Call the handlers for an event: those for its key first, then those for
+        every event of the type. Returns False if a handler consumed it
+        '''
+        lookups = ((event_type, None),) if key is None else ((event_type, key), (event_type, None))
+        for lookup in lookups:
+            for handler in _live(self.handlers.get(lookup, [])):
+                if not handler(event):
+                    return False  # If a handler returns false don't pass the event to any other handlers
+        return True
+
+
+def _live(refs):
+    '''
+    Get the handlers of a list of handler references that are still alive.
+    References to handlers that are gone are removed from the list
+    '''
+    handlers = [ref() for ref in refs]
+    if None in handlers:
+        refs[:] = [ref for ref, handler in zip(refs, handlers) if handler is not None]
+        handlers = [handler for handler in handlers if handler is not None]
+    return handlers
+
+
+def register_event_handler(handler, event_type, key=None):
+    '''
+    Register an input event handler with the current input dispatcher
+    '''
+    InputDispatcher.get().register(handler, event_type, key)
+
+
+def register_step_handler(handler):
     '''
-    Register an input event handler with the game engine
+    Register a per step key state handler with the current input dispatcher
     '''
-    game_engine = get_game_engine()
-    game_engine.register_event_handler(handler, event_type)
+    InputDispatcher.get().register_step(handler)
@@ -2,7 +2,11 @@
 Base class for levels
 '''
 
+import numpy as np
+
 from jackit2.core import BLOCK_HEIGHT, BLOCK_WIDTH
+from jackit2.core.chunk import ChunkStreamer
+from jackit2.core.sound import SOUND_EFFECTS
 from jackit2.entities import Floor, Wall, Crate
 from jackit2.actors.player import Player
 
@@ -26,12 +30,69 @@ class LevelMap:
     CRATE = "C"
 
 
+#: Tile characters and the entity class created for them
+TILE_ENTITIES = {
+    LevelMap.FLOOR: Floor,
+    LevelMap.WALL: Wall,
+    LevelMap.CRATE: Crate,
+}
+
+#: Every character allowed in a level map
+MAP_CHARACTERS = tuple(TILE_ENTITIES) + (LevelMap.SPAWN, LevelMap.EXIT, ' ')
+
+#: Character codes of TILE_ENTITIES and MAP_CHARACTERS
+TILE_CODES = {ord(char): ent_cls for char, ent_cls in TILE_ENTITIES.items()}
+MAP_CODES = frozenset(ord(char) for char in MAP_CHARACTERS)
+
+
+def parse_level_map(level_map):
+    '''
+    Convert a level map (list of strings, top row first) into a (rows, cols)
+    NumPy grid of characters with row 0 at the bottom of the level. Short rows
+    are padded with empty space. The map isn't modified
+    '''
+    num_rows = len(level_map)
+    num_cols = len(max(level_map, key=len)) if level_map else 0
+    if not num_rows or not num_cols:
+        return np.full((num_rows, num_cols), ' ', dtype='<U1')
+
+    text = "".join(row.ljust(num_cols) for row in reversed(level_map))
+    return np.frombuffer(text.encode('utf-32-le'), dtype='<U1').reshape(num_rows, num_cols)
+
+
+def map_codes(level_map):
+    '''
+    Get a level map as a (rows, cols) grid of integer character codes with
+    row 0 at the bottom. A map that already is a grid of codes (read from a
+    binary level file) is returned as is, without copying
+    '''
+    if isinstance(level_map, np.ndarray):
+        return level_map
+    return parse_level_map(level_map).view(np.uint32)
+
+
+def pad_codes(grid, num_rows, num_cols):
+    '''
+    Pad a map_codes() grid to num_rows by num_cols with empty space. The grid
+    is returned as is if it already has that size
+    '''
+    if grid.shape == (num_rows, num_cols):
+        return grid
+    padded = np.full((num_rows, num_cols), ord(' '), dtype=np.uint32)
+    padded[:grid.shape[0], :grid.shape[1]] = grid
+    return padded
+
+
 class Level:
     '''
     Base class for a level
     '''
     # pylint: disable=R0902,R0903
 
+    #: Names of the sound effects (in SOUND_EFFECTS) the level plays. They're
+    #: decoded when the level starts
+    sound_effects = tuple(SOUND_EFFECTS)
+
     def __init__(self, level_num, level_map, name="", description=""):
         self.level_num = level_num
         self.name = name
@@ -51,6 +112,9 @@ class Level:
         # Set when building the level to the object on the spawn point
         self.player = None
 
+        #: Streams the chunks of the level in and out. Created when the level is loaded
+        self.chunks = None
+
     def load(self, entity_mgr):
         '''
         Load the level
@@ -61,45 +125,102 @@ class Level:
         # Coordinates for  rectangle 50 pixels bigger on all sides than the level
         self.death_zone = (-50, -50, self.width + 50, self.height + 50)
 
+        # Bring in the part of the level around the player
+        self.stream(entity_mgr)
+
         return self.width, self.height, self.player
 
-    def _build_level(self, entity_mgr):
+    def unload(self, entity_mgr):
         '''
-        Build the level from the map
+        Remove the level's entities from entity_mgr and drop the level's
+        references to them. The level can be loaded again afterwards
         '''
+        entity_mgr.remove_many(list(entity_mgr))
+        entity_mgr.flush()
+        self.player = None
+        self.chunks = None
+
+    def apply_map(self, entity_mgr, level_map):
+        '''
+        Change the map of the loaded level to level_map (an edited copy of the
+        map). The two maps are compared as grids and only the tiles that differ
+        are removed from or added to the level. The player is left where it is.
+        Returns the number of tiles that changed
+        '''
+        old = map_codes(self.level_map)
+        new = map_codes(level_map)
+        new_rows, new_cols = new.shape
+
+        # Pad both grids to the same size with empty space
+        num_rows, num_cols = max(old.shape[0], new_rows), max(old.shape[1], new_cols)
+        old = pad_codes(old, num_rows, num_cols)
+        new = pad_codes(new, num_rows, num_cols)
+
+        diff = old != new
+        unknown = set(new[diff].tolist()) - MAP_CODES
+        if unknown:
+            raise LevelGeneratorError("Unknown block character '{}'".format(chr(unknown.pop())))
 
-        cur_x = cur_y = 0
-        entity = None
-        self.level_map.reverse()
-        for row in self.level_map:
-            for col in row:
-                args = [cur_x, cur_y, BLOCK_WIDTH, BLOCK_HEIGHT]
-                # sprite = None
-                if col == LevelMap.FLOOR:
-                    entity = Floor(*args)
-                elif col == LevelMap.EXIT:
-                    # sprite = self.create_exit_block(x, y)
-                    pass
-                elif col == LevelMap.SPAWN:
-                    self.player = entity = Player(cur_x, cur_y)
-                elif col == LevelMap.WALL:
-                    entity = Wall(*args)
-                elif col == LevelMap.CRATE:
-                    entity = Crate(*args)
-                elif col == ' ':
-                    # Empty space is empty space
-                    pass
-                else:
-                    raise LevelGeneratorError("Unknown block character '{}'".format(col))
-
-                if entity:
-                    entity_mgr.add(entity)
-                    entity = None
-
-                cur_x += BLOCK_WIDTH
-            cur_y += BLOCK_HEIGHT
-            cur_x = 0
-
-        total_level_width = len(max(self.level_map, key=len)) * BLOCK_WIDTH
-        total_level_height = len(self.level_map) * BLOCK_HEIGHT
+        self.chunks.grow(num_cols, num_rows)
+        changed = np.argwhere(diff).tolist()
+        self._replace_tiles(entity_mgr, old, new, changed)
+
+        self.level_map = level_map
+        self.width, self.height = new_cols * BLOCK_WIDTH, new_rows * BLOCK_HEIGHT
+        self.death_zone = (-50, -50, self.width + 50, self.height + 50)
+        return len(changed)
+
+    def _replace_tiles(self, entity_mgr, old, new, tiles):
+        '''
+        Swap the (row, col) tiles of the old grid for those of the new one
+        '''
+        for row_idx, col_idx in tiles:
+            old_cls = TILE_CODES.get(int(old[row_idx, col_idx]))
+            if old_cls is not None:
+                self.chunks.clear_tile(entity_mgr, old_cls, col_idx, row_idx)
+
+            new_cls = TILE_CODES.get(int(new[row_idx, col_idx]))
+            if new_cls is not None:
+                self.chunks.place_tile(entity_mgr, new_cls, col_idx, row_idx)
+
+    def stream(self, entity_mgr, view_rect=None):
+        '''
+        Activate the chunks of the level near the player and view_rect
+        (left, bottom, right, top) and deactivate the rest
+        '''
+        rects = []
+        if self.player is not None:
+            rects.append(self.player.bounds())
+        if view_rect is not None:
+            rects.append(view_rect)
+
+        self.chunks.update(entity_mgr, rects, keep=(self.player,))
+
+    def _build_level(self, entity_mgr):
+        '''
+        Build the level from the map. The player is added right away. Every
+        other tile is added to the chunk it's in and only added to the level
+        when that chunk is streamed in. Tiles are located with whole grid
+        operations per tile type instead of character by character
+        '''
+        grid = map_codes(self.level_map)
+        num_rows, num_cols = grid.shape
+
+        unknown = np.argwhere(~np.isin(grid, sorted(MAP_CODES)))
+        if len(unknown):
+            row_idx, col_idx = unknown[0]
+            raise LevelGeneratorError("Unknown block character '{}'".format(chr(grid[row_idx, col_idx])))
+
+        self.chunks = ChunkStreamer(num_cols, num_rows)
+        for code, ent_cls in TILE_CODES.items():
+            rows, cols = np.nonzero(grid == code)
+            self.chunks.add_tiles(ent_cls, cols, rows)
+
+        # sprite = self.create_exit_block(x, y) for LevelMap.EXIT
+        for row_idx, col_idx in np.argwhere(grid == ord(LevelMap.SPAWN)).tolist():
+            self.player = Player(col_idx * BLOCK_WIDTH, row_idx * BLOCK_HEIGHT)
+            entity_mgr.add(self.player)
+
+        total_level_width = num_cols * BLOCK_WIDTH
+        total_level_height = num_rows * BLOCK_HEIGHT
         return total_level_width, total_level_height
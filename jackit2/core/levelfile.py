@@ -0,0 +1,262 @@
+'''
+Binary level format for very large maps. A level file is a fixed header,
+the level's name and description and a grid of one byte (the LevelMap
+character) per tile. The file is memory mapped and the grid is used as a
+NumPy array without being copied or parsed.
+
+Layout (little endian):
+
+    header      HEADER (magic, version, flags, chunk size, width, height,
+                level number, name length, description length)
+    name        UTF-8
+    description UTF-8
+    padding     to a multiple of 8 bytes
+    grid        FLAG_CHUNKED not set: height rows of width bytes, bottom row first
+                FLAG_CHUNKED set: one uint32 offset per chunk (chunk x major,
+                0 if the chunk is empty and not stored) followed by the stored
+                chunks, each chunk_tiles rows of chunk_tiles bytes
+'''
+
+import os
+import mmap
+import struct
+import tempfile
+
+import numpy as np
+
+from jackit2.core import LEVEL_FILE_EXT
+from jackit2.core.chunk import CHUNK_TILES
+from jackit2.core.level import Level, map_codes
+
+#: Identifies a binary level
+LEVEL_FILE_MAGIC = b'JKLV'
+#: Binary level format version
+LEVEL_FILE_VERSION = 1
+#: The grid is stored as chunks and empty chunks are left out
+FLAG_CHUNKED = 0x1
+
+#: magic, version, flags, chunk tiles, width, height, level number, name length, description length
+HEADER = struct.Struct('<4sBBHIIiHH')
+
+EMPTY = ord(' ')
+
+
+class LevelFileError(Exception):
+    '''
+    Error reading or writing a binary level
+    '''
+    pass
+
+
+def _pad(offset):
+    '''
+    Round an offset up to a multiple of 8
+    '''
+    return (offset + 7) & ~7
+
+
+def read_header(data):
+    '''
+    Parse the header at the start of data. Returns (flags, chunk_tiles, width,
+    height, level_num, name, description, grid offset)
+    '''
+    if len(data) < HEADER.size:
+        raise LevelFileError("Truncated level file")
+
+    magic, version, flags, chunk_tiles, width, height, level_num, name_len, desc_len = \
+        HEADER.unpack_from(data, 0)
+    if magic != LEVEL_FILE_MAGIC:
+        raise LevelFileError("Not a level file")
+    if version != LEVEL_FILE_VERSION:
+        raise LevelFileError("Unsupported level file version {}".format(version))
+
+    offset = HEADER.size
+    name = bytes(data[offset:offset + name_len]).decode('utf-8')
+    offset += name_len
+    description = bytes(data[offset:offset + desc_len]).decode('utf-8')
+    offset = _pad(offset + desc_len)
+    return flags, chunk_tiles, width, height, level_num, name, description, offset
+
+
+class LevelFile:
+    '''
+    A memory mapped binary level. data can be given to read the level from
+    a buffer (such as a memoryview of an asset pack) instead of the file
+    '''
+    # pylint: disable=R0902
+
+    def __init__(self, path, data=None):
+        #: Path of the file
+        self.path = path
+        if data is None:
+            with open(path, 'rb') as level_file:
+                data = mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = data
+
+        (self.flags, self.chunk_tiles, self.width, self.height,
+         self.level_num, self.name, self.description, self._grid_offset) = read_header(self._data)
+
+        expected = self._grid_offset + (
+            self._chunk_count() * 4 if self.chunked else self.width * self.height
+        )
+        if len(self._data) < expected:
+            raise LevelFileError("Truncated level file: {}".format(path))
+
+    @property
+    def chunked(self):
+        '''
+        True if the grid is stored as chunks
+        '''
+        return bool(self.flags & FLAG_CHUNKED)
+
+    def _chunk_count(self):
+        '''
+        (columns, rows) of chunks
+        '''
+        cols = -(-self.width // self.chunk_tiles)
+        rows = -(-self.height // self.chunk_tiles)
+        return cols * rows
+
+    def grid(self):
+        '''
+        Get the (height, width) uint8 grid of character codes, bottom row first.
+        For unchunked files it's a read only view of the mapped file
+        '''
+        if not self.chunked:
+            return np.frombuffer(
+                self._data, dtype=np.uint8, count=self.width * self.height, offset=self._grid_offset
+            ).reshape(self.height, self.width)
+
+        size = self.chunk_tiles
+        cols = -(-self.width // size)
+        rows = -(-self.height // size)
+        grid = np.full((rows * size, cols * size), EMPTY, dtype=np.uint8)
+        for chunk_x in range(cols):
+            for chunk_y in range(rows):
+                chunk = self.read_chunk(chunk_x, chunk_y)
+                if chunk is not None:
+                    grid[chunk_y * size:(chunk_y + 1) * size, chunk_x * size:(chunk_x + 1) * size] = chunk
+        return grid[:self.height, :self.width]
+
+    def read_chunk(self, chunk_x, chunk_y):
+        '''
+        Get a view of one chunk of a chunked file. None if the chunk is empty
+        '''
+        if not self.chunked:
+            raise LevelFileError("Level file isn't chunked: {}".format(self.path))
+
+        rows = -(-self.height // self.chunk_tiles)
+        offset, = struct.unpack_from('<I', self._data, self._grid_offset + (chunk_x * rows + chunk_y) * 4)
+        if not offset:
+            return None
+        size = self.chunk_tiles
+        return np.frombuffer(self._data, dtype=np.uint8, count=size * size, offset=offset).reshape(size, size)
+
+
+def write_level_file(path, level_map, level_num, name="", description="", chunked=False):
+    '''
+    Write a level map (text map or grid of codes) as a binary level. The file
+    is replaced atomically so levels mapped from the old file aren't affected
+    '''
+    # pylint: disable=R0913
+    grid = map_codes(level_map)
+    if grid.size and grid.max() > 0x7F:
+        raise LevelFileError("Level maps must be ASCII")
+    grid = grid.astype(np.uint8)
+    height, width = grid.shape
+
+    name = name.encode('utf-8')
+    description = description.encode('utf-8')
+    out = bytearray(HEADER.pack(
+        LEVEL_FILE_MAGIC, LEVEL_FILE_VERSION, FLAG_CHUNKED if chunked else 0, CHUNK_TILES,
+        width, height, level_num, len(name), len(description)
+    ))
+    out += name + description
+    out += bytes(_pad(len(out)) - len(out))
+
+    out += _chunk_table(grid, len(out)) if chunked else grid.tobytes()
+
+    handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=LEVEL_FILE_EXT)
+    try:
+        with os.fdopen(handle, 'wb') as level_file:
+            level_file.write(out)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _chunk_table(grid, start):
+    '''
+    Get the chunk offset table and the non-empty chunks of a grid of codes,
+    for a file where they start at byte start
+    '''
+    height, width = grid.shape
+    cols = -(-width // CHUNK_TILES)
+    rows = -(-height // CHUNK_TILES)
+    padded = np.full((rows * CHUNK_TILES, cols * CHUNK_TILES), EMPTY, dtype=np.uint8)
+    padded[:height, :width] = grid
+
+    offsets = np.zeros(cols * rows, dtype='<u4')
+    chunks = bytearray()
+    data_start = start + offsets.nbytes
+    for chunk_x in range(cols):
+        for chunk_y in range(rows):
+            chunk = padded[chunk_y * CHUNK_TILES:(chunk_y + 1) * CHUNK_TILES,
+                           chunk_x * CHUNK_TILES:(chunk_x + 1) * CHUNK_TILES]
+            if (chunk != EMPTY).any():
+                offsets[chunk_x * rows + chunk_y] = data_start + len(chunks)
+                chunks += chunk.tobytes()
+    return offsets.tobytes() + chunks
+
+
+def level_to_file(level, path, chunked=False):
+    '''
+    Convert a Level to a binary level file
+    '''
+    write_level_file(path, level.level_map, level.level_num, level.name, level.description, chunked)
+
+
+def file_to_map(path):
+    '''
+    Convert a binary level file to a text level map (list of strings, top row first)
+    '''
+    grid = LevelFile(path).grid()
+    return [row.tobytes().decode('ascii') for row in grid[::-1]]
+
+
+def file_to_source(path, class_name="ConvertedLevel"):
+    '''
+    Convert a binary level file to the source of a Python level module
+    '''
+    level_file = LevelFile(path)
+    rows = "".join("        {!r},\n".format(row) for row in file_to_map(path))
+    return (
+        "'''\n{name}\n'''\n\n"
+        "from jackit2.core.level import Level\n\n\n"
+        "class {cls}(Level):\n"
+        "    '''\n    {description}\n    '''\n"
+        "    # pylint: disable=R0903\n\n"
+        "    _map = [\n{rows}    ]\n\n"
+        "    def __init__(self):\n"
+        "        super().__init__({num}, self._map, {name!r}, {description!r})\n\n\n"
+        "__Level__ = {cls}  # pylint: disable=C0103\n"
+    ).format(
+        name=level_file.name, cls=class_name, description=level_file.description,
+        rows=rows, num=level_file.level_num
+    )
+
+
+class BinaryLevel(Level):
+    '''
+    Level loaded from a binary level file. The map is the file's grid
+    '''
+    # pylint: disable=R0903
+
+    def __init__(self, path, data=None):
+        #: The mapped file. Kept open as long as the level since the map is a view of it
+        self.level_file = LevelFile(path, data)
+        super().__init__(
+            self.level_file.level_num, self.level_file.grid(),
+            self.level_file.name, self.level_file.description
+        )
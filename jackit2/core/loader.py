@@ -1,29 +1,116 @@
 '''
-Loads the levels dynamically
+Loads the levels dynamically. Levels are Python modules or binary level files
+(see levelfile). What each level file contains is cached in a manifest keyed
+on the file's path, mtime and hash so level modules are only imported when a
+level is played or the file has changed.
 '''
 import os
+import re
+import sys
+import json
+import hashlib
 import logging
-import types
-from uuid import uuid4
+import functools
+import importlib.util
 
-from importlib.machinery import SourceFileLoader
+from jackit2.core import LEVEL_FILE_EXT
 
 LOGGER = logging.getLogger(__name__)
 
+#: Prefix of the module names level files are imported as
+LEVEL_MODULE_PREFIX = "jackit2_level_"
+
+#: Manifest format version. Cached entries from other versions are ignored
+MANIFEST_VERSION = 1
+
+
+def file_hash(path):
+    '''
+    Get the SHA-1 of a file's contents
+    '''
+    with open(path, 'rb') as level_file:
+        return hashlib.sha1(level_file.read()).hexdigest()
+
+
+def level_module_name(root, path):
+    '''
+    Get the stable module name a level file is imported as. Based on the
+    path relative to the directory containing the search path so the same
+    file always gets the same name and two search paths can't collide
+    '''
+    rel = os.path.relpath(path, os.path.dirname(os.path.abspath(root)))
+    rel = os.path.splitext(rel)[0]
+    return LEVEL_MODULE_PREFIX + re.sub(r'\W', '_', rel)
+
+
+def import_level_module(module_name, path, source=None):
+    '''
+    Import a level file as module_name. The module is registered in sys.modules
+    so the level classes in it can be pickled. If source is given the module
+    is created from it (a level in the asset pack) instead of reading path
+    '''
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if source is None:
+        spec = importlib.util.spec_from_file_location(module_name, path)
+    else:
+        spec = importlib.util.spec_from_loader(module_name, loader=None, origin=path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = mod
+    try:
+        if source is None:
+            spec.loader.exec_module(mod)
+        else:
+            exec(compile(bytes(source), path, 'exec'), mod.__dict__)  # pylint: disable=W0122
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return mod
+
 
 class LevelStub:
     '''
-    Stub for a level class.
+    Stub for a level class. The module the class is in is imported the first
+    time the level is loaded. Binary levels have no module
     '''
 
-    def __init__(self, level_cls):
-        self._level_cls = level_cls
+    def __init__(self, path, module_name, level_num, name="", pack=None):
+        #: File the level is defined in. The asset name if it's in pack
+        self.path = path
+        #: The AssetPack the level is in. None if it's a loose file
+        self.pack = pack
+        #: Module name the file is imported as. None for binary levels
+        self.module_name = module_name
+        #: Level number and name, from the manifest
+        self.level_num = level_num
+        self.name = name
+        self._level_cls = None
+
+    def __repr__(self):
+        return "LevelStub({}, {!r}, {})".format(self.level_num, self.name, self.path)
+
+    @property
+    def level_cls(self):
+        '''
+        The level class. Imports the level's module if needed. For binary
+        levels it's BinaryLevel bound to the file
+        '''
+        if self._level_cls is None:
+            data = self.pack.get(self.path) if self.pack is not None else None
+            if self.module_name is None:
+                from jackit2.core.levelfile import BinaryLevel
+                self._level_cls = functools.partial(BinaryLevel, self.path, data)
+            else:
+                mod = import_level_module(self.module_name, self.path, data)
+                self._level_cls = mod.__Level__
+        return self._level_cls
 
     def load(self):
         '''
         Create an instance of the level
         '''
-        return self._level_cls()
+        return self.level_cls()
 
     def __call__(self):
         '''
@@ -42,6 +129,14 @@ class LevelLoader:
     def __init__(self):
         self.paths = []
         self._levels = []
+        # Level number -> LevelStub
+        self._by_num = {}
+
+        #: Where the manifest is cached. Nothing is cached when None
+        self.manifest_path = None
+        # path -> {"mtime", "hash", "level"} for every .py file seen
+        self._manifest = None
+        self._manifest_dirty = False
 
     @classmethod
     def create(cls):
@@ -82,40 +177,83 @@ class LevelLoader:
         '''
         Get level by number
         '''
-        if not level_num:
+        stub = self._by_num.get(level_num)
+        return stub() if stub is not None else None
+
+    def get_stub(self, level_num):
+        '''
+        Get the LevelStub of a level by number without loading the level
+        '''
+        return self._by_num.get(level_num)
+
+    def reload_file(self, path):
+        '''
+        Scan a single level file again after it was edited. Only that file's
+        module is re-imported and only if its contents changed. Returns the
+        new LevelStub, or None if the file no longer defines a level (the old
+        stub is kept so a typo doesn't drop the level being edited)
+        '''
+        path = os.path.abspath(path)
+        roots = [root for root in self.paths if path.startswith(os.path.abspath(root) + os.sep)]
+        if not roots:
+            return None
+
+        self._load_manifest()
+        stub = self._discover_level(roots[0], path)
+        self._save_manifest()
+        if stub is None:
             return None
 
+        self._levels = [stub if old.path == path else old for old in self._levels]
+        self._by_num = {}
         for level in self._levels:
-            if level.level_num == level_num:
-                return level()
-        return None
+            self._by_num.setdefault(level.level_num, level)
+        return stub
 
     def search(self, path):
         '''
-        Search a path for levels
+        Search a path for levels. Directories and files are visited in sorted
+        order so the level order is the same on every machine
         '''
+        self._load_manifest()
+
         for (dirpath, dirnames, filenames) in os.walk(path):
             LOGGER.debug("scanning directory for levels: %s", dirpath)
             if '__pycache__' in dirnames:
                 dirnames.remove('__pycache__')
+            dirnames.sort()
+            filenames.sort()
 
             if "__init__.py" in filenames:
                 filenames.remove('__init__.py')
-                level = self._discover_level(os.path.join(dirpath, "__init__.py"))
-                if level:
-                    LOGGER.debug("found level in __init__.py; skipping all child directories: %s", path)
+                stub = self._discover_level(path, os.path.join(dirpath, "__init__.py"))
+                if stub:
+                    LOGGER.debug("found level in __init__.py; skipping all child directories: %s", dirpath)
                     dirnames.clear()
                     filenames.clear()
-                    self._levels.append(LevelStub(level))
+                    self._add(stub)
 
             for filename in filenames:
                 LOGGER.debug("found file: %s", filename)
-                path = os.path.join(dirpath, filename)
 
-                if filename.endswith(".py"):
-                    level = self._discover_level(path)
-                    self._levels.append(LevelStub(level))
-                    LOGGER.debug("Levels: %s", self._levels)
+                if filename.endswith(".py") or filename.endswith(LEVEL_FILE_EXT):
+                    stub = self._discover_level(path, os.path.join(dirpath, filename))
+                    if stub:
+                        self._add(stub)
+                        LOGGER.debug("Levels: %s", self._levels)
+
+        self._save_manifest()
+
+    def add_pack(self, pack):
+        '''
+        Add the levels in an asset pack. The pack has an index of its levels
+        so nothing is imported until a level is played
+        '''
+        from jackit2.core.assets import LEVEL_INDEX
+
+        index = json.loads(bytes(pack.get(LEVEL_INDEX)).decode('utf-8'))
+        for level in index["levels"]:
+            self._add(LevelStub(level["path"], level["module"], level["level_num"], level["name"], pack))
 
     def add_search_path(self, path):
         '''
@@ -129,28 +267,139 @@ class LevelLoader:
         Reload the levels
         '''
         self._levels = []
+        self._by_num = {}
         for path in self.paths:
             self.search(path)
 
-    def _discover_level(self, path):  # pylint: disable=R0201
+    def _add(self, stub):
+        '''
+        Add a level. get_by_num() returns the first level found with a number
         '''
-        Private method used to discover and return the level found in a file
+        self._levels.append(stub)
+        if stub.level_num in self._by_num:
+            LOGGER.warning(
+                "level number %s of %s is already used by %s",
+                stub.level_num, stub.path, self._by_num[stub.level_num].path
+            )
+        else:
+            self._by_num[stub.level_num] = stub
+
+    def _load_manifest(self):
         '''
-        loader = SourceFileLoader(str(uuid4()).replace('-', ''), path)
+        Read the cached manifest if it hasn't been read yet
+        '''
+        if self._manifest is not None:
+            return
+
+        self._manifest = {}
+        if self.manifest_path is None or not os.path.exists(self.manifest_path):
+            return
 
         try:
-            mod = types.ModuleType(loader.name)
-            mod.__file__ = path
-            loader.exec_module(mod)
+            with open(self.manifest_path, 'r') as manifest_file:
+                data = json.loads(manifest_file.read())
+            if data.get("version") == MANIFEST_VERSION:
+                self._manifest = data["files"]
+        except (OSError, ValueError, KeyError, AttributeError) as exc:
+            LOGGER.warning("ignoring unreadable level manifest %s: %s", self.manifest_path, str(exc))
+
+    def _save_manifest(self):
+        '''
+        Write the manifest if anything in it changed
+        '''
+        if self.manifest_path is None or not self._manifest_dirty:
+            return
+
+        try:
+            with open(self.manifest_path, 'w') as manifest_file:
+                manifest_file.write(json.dumps(
+                    {"version": MANIFEST_VERSION, "files": self._manifest}, sort_keys=True, indent=1
+                ))
+            self._manifest_dirty = False
+        except OSError as exc:
+            LOGGER.warning("could not write level manifest %s: %s", self.manifest_path, str(exc))
+
+    def _discover_level(self, root, path):
+        '''
+        Private method used to discover the level in a file. Returns its
+        LevelStub or None if the file doesn't define a level
+        '''
+        path = os.path.abspath(path)
+        binary = path.endswith(LEVEL_FILE_EXT)
+        module_name = None if binary else level_module_name(root, path)
+        mtime = os.path.getmtime(path)
+
+        # Hashed at most once, when the manifest can't tell from the mtime
+        digest = None
+        entry = self._manifest.get(path)
+        if entry is not None and entry["mtime"] != mtime:
+            # Touched but maybe not changed
+            digest = file_hash(path)
+            if entry["hash"] == digest:
+                entry["mtime"] = mtime
+                self._manifest_dirty = True
+            else:
+                entry = None
+
+        if entry is None:
+            # New or changed
+            if binary:
+                level = self._inspect_level_file(path)
+            else:
+                # Drop any stale copy of the module before importing it
+                sys.modules.pop(module_name, None)
+                level = self._inspect_level(module_name, path)
+            entry = {"mtime": mtime, "hash": digest or file_hash(path), "level": level}
+            self._manifest[path] = entry
+            self._manifest_dirty = True
+
+        level = entry["level"]
+        if level is None:
+            return None
+        return LevelStub(path, module_name, level["level_num"], level["name"])
+
+    def _inspect_level(self, module_name, path):  # pylint: disable=R0201
+        '''
+        Import a level file and get the manifest info of the level in it
+        '''
+        try:
+            mod = import_level_module(module_name, path)
         except BaseException as exc:
             LOGGER.exception("file is not a valid Python module: %s. %s.", path, str(exc))
             return None
 
-        if hasattr(mod, '__Level__'):
-            # pylint: disable=E1101
-            level = mod.__Level__
-            LOGGER.debug("found level: %s", path)
-            return level
+        if not hasattr(mod, '__Level__'):
+            LOGGER.debug("module __Level__ attribute is not defined; file is not a valid level: %s", path)
+            return None
+
+        # pylint: disable=E1101
+        level_cls = mod.__Level__
+        try:
+            level = level_cls()
+        except BaseException as exc:
+            LOGGER.exception("level could not be created: %s. %s.", path, str(exc))
+            return None
+
+        LOGGER.debug("found level: %s", path)
+        return {
+            "module": module_name, "class": level_cls.__qualname__,
+            "level_num": level.level_num, "name": level.name
+        }
+
+    def _inspect_level_file(self, path):  # pylint: disable=R0201
+        '''
+        Read the header of a binary level file for the manifest
+        '''
+        from jackit2.core.levelfile import LevelFile, LevelFileError
+
+        try:
+            level_file = LevelFile(path)
+        except (OSError, ValueError, LevelFileError) as exc:
+            LOGGER.error("file is not a valid level file: %s. %s.", path, str(exc))
+            return None
 
-        LOGGER.debug("module __Level__ attribute is not defined; file is not a valid level: %s", path)
-        return None
+        LOGGER.debug("found binary level: %s", path)
+        return {
+            "module": None, "class": "BinaryLevel",
+            "level_num": level_file.level_num, "name": level_file.name
+        }
@@ -0,0 +1,49 @@
+'''
+Helpers for reading pymunk body state in bulk
+'''
+
+import zlib
+
+import numpy as np
+
+#: Number of values in a body state (x, y, angle, x velocity, y velocity, angular velocity)
+STATE_SIZE = 6
+
+
+def read_body_states(bodies):
+    '''
+    Get an (n, STATE_SIZE) float64 array with the state of every body
+    '''
+    bodies = list(bodies)
+    return np.fromiter(
+        (
+            val for body in bodies for val in (
+                body.position.x, body.position.y, body.angle,
+                body.velocity.x, body.velocity.y, body.angular_velocity
+            )
+        ),
+        dtype=np.float64, count=len(bodies) * STATE_SIZE
+    ).reshape(len(bodies), STATE_SIZE)
+
+
+def write_body_states(bodies, states):
+    '''
+    Write an (n, STATE_SIZE) array from read_body_states() back into the bodies.
+    Forces accumulated for the next step are cleared
+    '''
+    for body, (x_pos, y_pos, angle, vel_x, vel_y, ang_vel) in zip(bodies, states.tolist()):
+        body.position = (x_pos, y_pos)
+        body.angle = angle
+        body.velocity = (vel_x, vel_y)
+        body.angular_velocity = ang_vel
+        body.force = (0, 0)
+        body.torque = 0
+
+
+def state_hash(bodies):
+    '''
+    Cheap hash of the state of the bodies. Two runs that have diverged by even
+    one bit produce different hashes. The bodies must be in a stable order (pymunk's
+    space.bodies is not, use EntityManager.dynamic_bodies())
+    '''
+    return zlib.crc32(read_body_states(bodies).tobytes())
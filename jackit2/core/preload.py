@@ -0,0 +1,81 @@
+'''
+Builds the next level's Simulation on a worker thread while the current level
+is played so switching levels only has to swap the simulation in.
+'''
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from jackit2.core.simulation import Simulation
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LevelPreloader:
+    '''
+    Preloads one level at a time on a single worker thread
+    '''
+
+    def __init__(self, framerate=60, renderer=None, substeps=1):
+        #: Framerate the preloaded simulations are stepped at
+        self.framerate = framerate
+        #: Physics substeps of the preloaded simulations
+        self.substeps = substeps
+        #: (frame_buffer, vertex_array, program) given to the preloaded simulations
+        self.renderer = renderer
+        #: Index in the LevelLoader of the level being preloaded. None if there isn't one
+        self.index = None
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+
+    def _build(self, level_stub):
+        '''
+        Runs on the worker thread. Map parsing, entity construction and the
+        physics space setup all happen here
+        '''
+        LOGGER.debug("preloading level: %s", level_stub)
+        return Simulation(level_stub(), self.framerate, renderer=self.renderer, substeps=self.substeps)
+
+    def start(self, levels, index):
+        '''
+        Start preloading the level at index in levels (the LevelLoader). Any
+        level that was being preloaded is dropped
+        '''
+        self.cancel()
+        self.index = index
+        self._future = self._executor.submit(self._build, list(levels)[index])
+
+    def ready(self):
+        '''
+        Returns True if the preloaded level is done building
+        '''
+        return self._future is not None and self._future.done()
+
+    def take(self, timeout=None):
+        '''
+        Get the preloaded Simulation, waiting up to timeout seconds (forever if
+        None) for it to finish. Raises the exception the build raised, if any
+        '''
+        if self._future is None:
+            raise RuntimeError("No level is being preloaded")
+
+        future, self._future = self._future, None
+        self.index = None
+        return future.result(timeout)
+
+    def cancel(self):
+        '''
+        Drop the level being preloaded
+        '''
+        if self._future is not None:
+            self._future.cancel()
+        self._future = None
+        self.index = None
+
+    def shutdown(self):
+        '''
+        Stop the worker thread
+        '''
+        self.cancel()
+        self._executor.shutdown(wait=False)
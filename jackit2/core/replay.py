@@ -0,0 +1,253 @@
+'''
+Records the input fed to a Simulation keyed by simulation step and replays
+it. A hash of every dynamic body's state is stored every hash_interval steps
+so a replay can detect the step where it diverged from the recording.
+'''
+
+import zlib
+import logging
+
+from jackit2.core.input import InputEventType, KeyEvent
+from jackit2.core.physics import state_hash
+
+LOGGER = logging.getLogger(__name__)
+
+#: Identifies a replay file
+REPLAY_MAGIC = b'JKRP'
+#: Replay file format version. Version 2 recordings are of buffered input
+#: (held keys move the player every step) and can't be replayed the old way
+REPLAY_VERSION = 2
+
+#: Event types that are recorded. Mouse input only moves the dev mode camera
+RECORDED_EVENTS = (InputEventType.KEY_PRESS, InputEventType.KEY_RELEASE)
+
+
+class ReplayError(Exception):
+    '''
+    Error reading a replay file
+    '''
+    pass
+
+
+class ReplayDivergence(Exception):
+    '''
+    Raised when a replayed simulation no longer matches the recording
+    '''
+
+    def __init__(self, step):
+        super().__init__("Replay diverged from the recording at step {}".format(step))
+        #: The first step whose state hash did not match
+        self.step = step
+
+
+def write_varint(out, value):
+    '''
+    Append an unsigned LEB128 varint to a bytearray
+    '''
+    if value < 0:
+        raise ValueError("varints are unsigned, got {}".format(value))
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def read_varint(data, offset):
+    '''
+    Read an unsigned LEB128 varint. Returns the value and the new offset
+    '''
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError("Truncated replay data")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+class Recording:
+    '''
+    Input events (step, event type, key, text) and state hashes of a session
+    '''
+    # pylint: disable=R0902
+
+    def __init__(self, level_num, framerate, hash_interval=60):
+        #: Number of the level that was played
+        self.level_num = level_num
+        #: Framerate the simulation was stepped at
+        self.framerate = framerate
+        #: A state hash is stored every hash_interval steps
+        self.hash_interval = hash_interval
+        #: Total number of steps recorded
+        self.steps = 0
+        #: (step, event type, key, text) in the order they were fed
+        self.events = []
+        #: State hash after step (i + 1) * hash_interval
+        self.hashes = []
+
+    def to_bytes(self):
+        '''
+        Encode the recording. Steps are stored as deltas from the previous
+        event so a typical session is a few bytes per key press
+        '''
+        body = bytearray()
+        for value in (self.level_num, self.framerate, self.hash_interval, self.steps,
+                      len(self.events), len(self.hashes)):
+            write_varint(body, value)
+
+        prev_step = 0
+        for step, event_type, key, text in self.events:
+            write_varint(body, step - prev_step)
+            body.append(event_type.value)
+            write_varint(body, key)
+            text = text.encode('utf-8')
+            write_varint(body, len(text))
+            body.extend(text)
+            prev_step = step
+
+        for value in self.hashes:
+            body.extend(value.to_bytes(4, 'little'))
+
+        return REPLAY_MAGIC + bytes([REPLAY_VERSION]) + zlib.compress(bytes(body))
+
+    @classmethod
+    def from_bytes(cls, raw):
+        '''
+        Decode a recording created by to_bytes()
+        '''
+        if raw[:4] != REPLAY_MAGIC:
+            raise ReplayError("Not a replay file")
+        if raw[4] != REPLAY_VERSION:
+            raise ReplayError("Unsupported replay version {}".format(raw[4]))
+
+        try:
+            data = zlib.decompress(raw[5:])
+        except zlib.error as exc:
+            raise ReplayError("Corrupt replay data: {}".format(str(exc)))
+
+        level_num, offset = read_varint(data, 0)
+        framerate, offset = read_varint(data, offset)
+        hash_interval, offset = read_varint(data, offset)
+        recording = cls(level_num, framerate, hash_interval)
+        recording.steps, offset = read_varint(data, offset)
+        num_events, offset = read_varint(data, offset)
+        num_hashes, offset = read_varint(data, offset)
+
+        step = 0
+        for _ in range(num_events):
+            event, offset = cls._read_event(data, offset, step)
+            recording.events.append(event)
+            step = event[0]
+
+        for _ in range(num_hashes):
+            recording.hashes.append(int.from_bytes(data[offset:offset + 4], 'little'))
+            offset += 4
+
+        return recording
+
+    @staticmethod
+    def _read_event(data, offset, prev_step):
+        '''
+        Decode the event at offset. Returns ((step, event type, key, text), next offset)
+        '''
+        delta, offset = read_varint(data, offset)
+        event_type = InputEventType(data[offset])
+        key, offset = read_varint(data, offset + 1)
+        length, offset = read_varint(data, offset)
+        text = data[offset:offset + length].decode('utf-8')
+        return (prev_step + delta, event_type, key, text), offset + length
+
+    def save(self, path):
+        '''
+        Write the recording to a file
+        '''
+        with open(path, 'wb') as replay_file:
+            replay_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Read a recording from a file
+        '''
+        with open(path, 'rb') as replay_file:
+            return cls.from_bytes(replay_file.read())
+
+
+class InputRecorder:
+    '''
+    Attached to a Simulation to record its input and state hashes
+    '''
+
+    def __init__(self, sim, hash_interval=60):
+        #: The recording being made
+        self.recording = Recording(
+            sim.level.level_num, int(round(1.0 / sim.step_size)), hash_interval
+        )
+        # Record from the simulation's current step onward
+        self._first_step = sim.steps
+
+    def record_event(self, step, event, event_type):
+        '''
+        Called by the Simulation for every input event before it's dispatched
+        '''
+        if event_type in RECORDED_EVENTS:
+            self.recording.events.append(
+                (step - self._first_step, event_type, event.key(), event.text())
+            )
+
+    def record_step(self, sim):
+        '''
+        Called by the Simulation after every step
+        '''
+        rec = self.recording
+        rec.steps = sim.steps - self._first_step
+        if rec.steps % rec.hash_interval == 0:
+            rec.hashes.append(state_hash(sim.entity_mgr.dynamic_bodies()))
+
+
+class InputReplayer:
+    '''
+    Feeds a recording back into a freshly loaded Simulation of the same level
+    '''
+    # pylint: disable=R0903
+
+    def __init__(self, recording):
+        #: The recording being replayed
+        self.recording = recording
+
+    def run(self, sim, strict=True):
+        '''
+        Replay every recorded step. If strict a ReplayDivergence is raised at
+        the first state hash mismatch, otherwise the mismatching steps are logged.
+        Returns the list of steps whose hash did not match
+        '''
+        rec = self.recording
+        events = iter(rec.events)
+        pending = next(events, None)
+        diverged = []
+
+        for step in range(rec.steps):
+            while pending is not None and pending[0] == step:
+                _, event_type, key, text = pending
+                sim.handle_input_event(KeyEvent(text, key), event_type)
+                pending = next(events, None)
+
+            sim.step()
+
+            done = step + 1
+            if done % rec.hash_interval == 0:
+                expected = rec.hashes[done // rec.hash_interval - 1]
+                if state_hash(sim.entity_mgr.dynamic_bodies()) != expected:
+                    if strict:
+                        raise ReplayDivergence(done)
+                    LOGGER.warning("replay diverged at step %d", done)
+                    diverged.append(done)
+
+        return diverged
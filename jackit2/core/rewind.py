@@ -0,0 +1,134 @@
+'''
+Keeps the last few seconds of a Simulation's dynamic body state in memory so
+the simulation can be rewound or scrubbed without rebuilding the level.
+'''
+
+import numpy as np
+
+from jackit2.core.physics import read_body_states, write_body_states
+
+#: Default number of seconds kept
+REWIND_SECONDS = 10
+
+
+class RewindBuffer:
+    '''
+    Fixed size ring of quantized physics snapshots. Positions and angles are
+    stored as float32 and velocities as float16, 18 bytes per body per frame
+    '''
+    # pylint: disable=R0902
+
+    def __init__(self, seconds=REWIND_SECONDS, framerate=60, max_bodies=256):
+        #: Number of frames kept
+        self.capacity = max(1, int(seconds * framerate))
+
+        # (x, y, angle) and (x velocity, y velocity, angular velocity) per frame and body
+        self._poses = np.zeros((self.capacity, max_bodies, 3), dtype=np.float32)
+        self._vels = np.zeros((self.capacity, max_bodies, 3), dtype=np.float16)
+        # Simulation step of each frame
+        self._steps = np.zeros(self.capacity, dtype=np.int64)
+        # Bodies of each frame and the (entity, spawn generation) that owned each
+        # body. Frames share the same lists until an entity is added or removed
+        self._bodies = [None] * self.capacity
+        self._owners = [None] * self.capacity
+
+        # Slot the next frame is written to and the number of frames stored
+        self._head = 0
+        self._size = 0
+        # Body and owner lists of the most recent frame and the EntityManager generation they're for
+        self._last_bodies = None
+        self._last_owners = None
+        self._last_generation = None
+
+    def __len__(self):
+        '''
+        Returns the number of frames stored
+        '''
+        return self._size
+
+    @property
+    def nbytes(self):
+        '''
+        Memory used by the snapshot arrays
+        '''
+        return self._poses.nbytes + self._vels.nbytes + self._steps.nbytes
+
+    def clear(self):
+        '''
+        Drop every stored frame
+        '''
+        self._head = 0
+        self._size = 0
+        self._bodies = [None] * self.capacity
+        self._owners = [None] * self.capacity
+        self._last_bodies = None
+        self._last_owners = None
+        self._last_generation = None
+
+    def _grow(self, max_bodies):
+        '''
+        Make room for max_bodies bodies per frame
+        '''
+        poses = np.zeros((self.capacity, max_bodies, 3), dtype=np.float32)
+        vels = np.zeros((self.capacity, max_bodies, 3), dtype=np.float16)
+        poses[:, :self._poses.shape[1]] = self._poses
+        vels[:, :self._vels.shape[1]] = self._vels
+        self._poses = poses
+        self._vels = vels
+
+    def record(self, sim):
+        '''
+        Store the state of the simulation's dynamic bodies. Called after each step
+        '''
+        entity_mgr = sim.entity_mgr
+        if entity_mgr.generation != self._last_generation:
+            self._last_bodies = entity_mgr.dynamic_bodies()
+            self._last_owners = entity_mgr.dynamic_owners()
+            self._last_generation = entity_mgr.generation
+
+        bodies = self._last_bodies
+        if len(bodies) > self._poses.shape[1]:
+            self._grow(max(len(bodies), self._poses.shape[1] * 2))
+
+        states = read_body_states(bodies)
+        slot = self._head
+        self._poses[slot, :len(bodies)] = states[:, :3]
+        self._vels[slot, :len(bodies)] = states[:, 3:]
+        self._steps[slot] = sim.steps
+        self._bodies[slot] = bodies
+        self._owners[slot] = self._last_owners
+
+        self._head = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def restore(self, sim, frames_back=1):
+        '''
+        Put the simulation back to the state it had frames_back frames before
+        the latest one. Newer frames are dropped so stepping continues from the
+        restored state. Bodies whose entity was removed from the level since the
+        frame was recorded are skipped, even if the entity has been reused from
+        the pool or a reloaded chunk since. Returns False if there aren't enough
+        frames
+        '''
+        if frames_back < 0 or frames_back >= self._size:
+            return False
+
+        slot = (self._head - 1 - frames_back) % self.capacity
+        bodies = self._bodies[slot]
+        states = np.concatenate(
+            (self._poses[slot, :len(bodies)], self._vels[slot, :len(bodies)]), axis=1
+        ).astype(np.float64)
+
+        live = [idx for idx, (entity, spawn) in enumerate(self._owners[slot]) if entity.get_spawn() == spawn]
+        if len(live) == len(bodies):
+            write_body_states(bodies, states)
+        else:
+            write_body_states([bodies[idx] for idx in live], states[live])
+
+        sim.steps = int(self._steps[slot])
+        sim.entity_mgr.update()
+
+        # The restored frame becomes the latest one
+        self._head = (slot + 1) % self.capacity
+        self._size -= frames_back
+        return True
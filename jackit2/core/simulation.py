@@ -0,0 +1,178 @@
+'''
+The physics and game logic for a level. Has no dependency on Qt, ModernGL
+or pygame so it can be stepped headless as fast as the CPU allows.
+'''
+
+import time
+
+import pymunk
+
+from jackit2.core.entity import EntityManager
+from jackit2.core.input import KEY_EVENTS, InputDispatcher
+from jackit2.core.snapshot import LevelSnapshot
+from jackit2.core.sound import SoundEvents, watch_impacts
+
+#: Gravity applied to the physics space
+GRAVITY = (0.0, -900.0)
+
+
+class Simulation:
+    '''
+    A loaded level, its physics space and its entities
+    '''
+    # pylint: disable=R0902
+
+    def __init__(self, level, framerate=60, renderer=None, substeps=1):
+        #: The level being simulated
+        self.level = level
+        #: The amount to step the physics engine on each step
+        self.step_size = 1.0 / framerate
+        #: Number of physics steps each step is split into. More is more
+        #: stable (fast bodies tunnel less) but costs that many times as much
+        self.substeps = max(1, substeps)
+        #: Number of steps simulated
+        self.steps = 0
+        #: Number of times the player left the level and the level was restarted
+        self.deaths = 0
+        #: Area of the level in view (left, bottom, right, top). Level chunks
+        #: around it are kept active. None when nothing is being drawn
+        self.view_rect = None
+        #: Optional InputRecorder that records the input and state of each step
+        self.recorder = None
+        #: Optional RewindBuffer that keeps the last few seconds of body state
+        self.rewind = None
+        #: Optional list (entity class name, x, y) is appended to for every
+        #: entity that leaves the level
+        self.escaped = None
+        #: Optional SoundEvents contacts are turned into. Set by enable_sounds()
+        self.sounds = None
+
+        #: Pymunk simulation space
+        self.space = pymunk.Space()
+        self.space.gravity = GRAVITY
+
+        #: Passes input events to handlers. The level's actors register with
+        #: it while the level is loaded
+        self.input = InputDispatcher()
+
+        # renderer is an optional (frame_buffer, vertex_array, program) tuple
+        # used by the EntityManager to draw. Leave it out to run headless
+        frame_buffer, vertex_array, program = renderer or (None, None, None)
+        #: The entity manager. Has all entities in the level
+        self.entity_mgr = EntityManager(self.space, frame_buffer, vertex_array, program)
+
+        #: Level width, height and the player
+        with self.input.current():
+            self.width, self.height, self.player = self.level.load(self.entity_mgr)
+
+        #: State of the level right after it was built. restart() goes back to it
+        self.start = LevelSnapshot(self)
+
+    def handle_input_event(self, event, event_type):
+        '''
+        Queue an input event. It's processed at the start of the next step
+        '''
+        if event_type in KEY_EVENTS and event.isAutoRepeat():
+            return  # Held keys are tracked by the key state
+        if self.recorder is not None:
+            self.recorder.record_event(self.steps, event, event_type)
+        self.input.queue(event, event_type)
+
+    def close(self):
+        '''
+        Tear the level down once it's no longer played. Its input handlers are
+        unregistered and its entities removed so nothing outside the
+        simulation keeps the level's entities or physics objects alive
+        '''
+        self.input.clear()
+        self.level.unload(self.entity_mgr)
+        self.player = None
+        self.start = None
+        if self.rewind is not None:
+            self.rewind.clear()
+
+    def enable_sounds(self):
+        '''
+        Collect sound events for the contacts between bodies and for broken
+        and collected entities in self.sounds. Off by default (headless runs
+        don't need it) since every new contact then calls back into Python
+        '''
+        if self.sounds is None:
+            self.sounds = SoundEvents()
+            self.entity_mgr.sounds = self.sounds
+            watch_impacts(self.space, self.sounds)
+        return self.sounds
+
+    def reload_map(self, level_map):
+        '''
+        Apply an edited map to the running level. Only the changed tiles are
+        touched. restart() goes back to the state right after the edit.
+        Returns the number of tiles that changed
+        '''
+        changed = self.level.apply_map(self.entity_mgr, level_map)
+        self.entity_mgr.flush()
+        self.entity_mgr.update()
+
+        self.width, self.height = self.level.width, self.level.height
+        self.start = LevelSnapshot(self)
+        if self.rewind is not None:
+            self.rewind.clear()
+        return changed
+
+    def restart(self):
+        '''
+        Put the level back to how it was right after it was built. Only the
+        dynamic entities are reset, the static geometry is left in place. The
+        step counter keeps counting so recordings stay in order
+        '''
+        self.start.restore(self)
+        if self.rewind is not None:
+            self.rewind.clear()
+
+    def step(self):
+        '''
+        Advance the simulation by one step
+        '''
+        # Apply the input that arrived since the last step
+        self.input.process()
+
+        # Step the physics engine a constant amount. We're banking on the
+        # framerate being consistent. If the framerate is lower than in the
+        # settings it should be adjusted to compensate for slower hardware
+        if self.substeps == 1:
+            self.space.step(self.step_size)
+        else:
+            substep = self.step_size / self.substeps
+            for idx in range(self.substeps):
+                if idx:
+                    # Forces are cleared by every physics step so held keys are applied again
+                    self.input.call_step_handlers()
+                self.space.step(substep)
+
+        # Copy the new body state into the entity columns and remove anything
+        # that has left the level. The player leaving the level is a death
+        self.entity_mgr.update()
+        kept = self.entity_mgr.reap(self.level.death_zone, keep=(self.player,), reaped=self.escaped)
+        if kept:
+            self.deaths += 1
+            self.restart()
+
+        # Stream in the chunks of the level near the view and player
+        self.level.stream(self.entity_mgr, self.view_rect)
+        self.entity_mgr.flush()
+
+        self.steps += 1
+        if self.recorder is not None:
+            self.recorder.record_step(self)
+        if self.rewind is not None:
+            self.rewind.record(self)
+
+    def run(self, num_steps):
+        '''
+        Step the simulation num_steps times as fast as possible. Returns the
+        elapsed time in seconds
+        '''
+        start = time.perf_counter()
+        for _ in range(num_steps):
+            self.step()
+        return time.perf_counter() - start
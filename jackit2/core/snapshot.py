@@ -0,0 +1,66 @@
+'''
+Snapshot of a built level used to restart it without rebuilding. Static
+geometry is kept as is, only the dynamic entities and the streaming state of
+the level's chunks are put back.
+'''
+
+from jackit2.core.physics import read_body_states, write_body_states
+
+
+class LevelSnapshot:
+    '''
+    The state of a Simulation's level at the time it was captured
+    '''
+    # pylint: disable=R0903
+
+    def __init__(self, sim):
+        entity_mgr = sim.entity_mgr
+
+        #: (ent_cls, state) of every dynamic entity but the player
+        self.entities = [
+            (entity.__class__, entity.get_state())
+            for entity in entity_mgr.dynamic_entities() if entity is not sim.player
+        ]
+        #: State of the player
+        self.player_state = sim.player.get_state()
+        #: Active chunks and frozen entities of the level
+        self.chunks = sim.level.chunks.capture()
+
+        # While nothing has been added or removed since the snapshot was
+        # captured (or last restored) the live bodies are the same and their
+        # state can be written back in place
+        self._generation = entity_mgr.generation
+        self._bodies = entity_mgr.dynamic_bodies()
+        self._states = read_body_states(self._bodies)
+
+    def restore(self, sim):
+        '''
+        Put the simulation's level back to the captured state
+        '''
+        entity_mgr = sim.entity_mgr
+        if entity_mgr.generation == self._generation:
+            write_body_states(self._bodies, self._states)
+            entity_mgr.update()
+            return
+
+        for entity in entity_mgr.dynamic_entities():
+            if entity is not sim.player:
+                entity_mgr.release(entity)
+
+        sim.level.chunks.restore(entity_mgr, self.chunks)
+
+        entities = []
+        for ent_cls, state in self.entities:
+            entity = entity_mgr.acquire(ent_cls, state[0], state[1])
+            entity.set_state(state)
+            entities.append(entity)
+        entity_mgr.add_many(entities)
+
+        sim.player.set_state(self.player_state)
+        entity_mgr.flush()
+        entity_mgr.update()
+
+        # Same bodies until something is added or removed again
+        self._generation = entity_mgr.generation
+        self._bodies = entity_mgr.dynamic_bodies()
+        self._states = read_body_states(self._bodies)
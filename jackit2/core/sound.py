@@ -0,0 +1,191 @@
+'''
+Sound effects. The simulation turns contacts into sound events, coalesced to
+at most one per effect per step, and the SoundBank plays them on a fixed pool
+of mixer channels. However many crates collide in a frame only a bounded
+number of sounds is started. Nothing here imports pygame, the mixer is given
+to the SoundBank so the simulation stays headless.
+'''
+
+import time
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+#: Sound effect name -> (asset name, priority, volume). Higher priority
+#: effects take channels from lower priority ones when all are busy.
+#: test.wav stands in until the effects have their own sounds
+SOUND_EFFECTS = {
+    "impact": ("audio/sounds/test.wav", 1, 0.6),
+    "break": ("audio/sounds/test.wav", 2, 0.8),
+    "collect": ("audio/sounds/test.wav", 3, 1.0),
+}
+
+#: Number of mixer channels used for effects
+NUM_CHANNELS = 8
+#: Channels used at each effects level of the config (0 turns sound effects off)
+EFFECT_CHANNELS = (0, NUM_CHANNELS // 2, NUM_CHANNELS)
+#: The same effect isn't started again within this many seconds
+COALESCE_WINDOW = 0.05
+#: Relative speed (pixels per second) of two bodies that start touching
+#: needed for an impact sound and the speed at which it's played at full volume
+IMPACT_SPEED = 150.0
+IMPACT_FULL_SPEED = 1200.0
+
+
+class SoundEvents:
+    '''
+    The sound events of one step. Each effect is kept once, at the loudest
+    volume it was emitted with
+    '''
+
+    def __init__(self):
+        self._events = {}
+
+    def __len__(self):
+        return len(self._events)
+
+    def emit(self, name, volume=1.0):
+        '''
+        Add a sound event
+        '''
+        if volume > self._events.get(name, 0.0):
+            self._events[name] = volume
+
+    def drain(self):
+        '''
+        Get the (name, volume) events and clear them
+        '''
+        events = list(self._events.items())
+        self._events.clear()
+        return events
+
+
+def watch_impacts(space, events, min_speed=IMPACT_SPEED, full_speed=IMPACT_FULL_SPEED):
+    '''
+    Emit an impact event into events whenever two shapes in space start
+    touching fast enough. Only new contacts call back into Python, resting
+    contacts cost nothing
+    '''
+    def begin(arbiter, _space, _data):
+        shape_a, shape_b = arbiter.shapes
+        speed = (shape_a.body.velocity - shape_b.body.velocity).length
+        if speed >= min_speed:
+            events.emit("impact", min(1.0, speed / full_speed))
+        return True
+
+    handler = space.add_default_collision_handler()
+    handler.begin = begin
+    return handler
+
+
+class SoundBank:
+    '''
+    Preloaded sound effects played on a fixed pool of channels. A sound goes
+    to a free channel, or takes the channel of the lowest priority (then
+    oldest) sound playing if that's no higher than its own priority, or is
+    dropped. An effect started less than window seconds ago isn't started again
+    '''
+    # pylint: disable=R0902
+
+    def __init__(self, mixer, num_channels=NUM_CHANNELS, window=COALESCE_WINDOW, clock=time.monotonic):
+        #: pygame.mixer (or anything with the same Sound and Channel API)
+        self.mixer = mixer
+        #: Seconds within which repeats of an effect are coalesced
+        self.window = window
+        #: Returns the current time in seconds
+        self.clock = clock
+
+        mixer.set_num_channels(num_channels)
+        #: The channel pool
+        self.channels = [mixer.Channel(idx) for idx in range(num_channels)]
+        # (priority, start time) of the last sound started on each channel
+        self._playing = [None] * num_channels
+
+        # Effect name -> (Sound, priority, volume)
+        self._sounds = {}
+        # Effect name -> time it was last started
+        self._last_started = {}
+
+        #: Counts of sounds started, coalesced, dropped for lack of a channel
+        #: and started by stopping a lower priority sound
+        self.started = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.stolen = 0
+
+    def __contains__(self, name):
+        return name in self._sounds
+
+    def load(self, assets, effects=None):
+        '''
+        Decode the sound effects (SOUND_EFFECTS by default) from the AssetStore.
+        Effects already loaded are skipped and effects that can't be loaded
+        are left out (playing them does nothing)
+        '''
+        for name, (asset, priority, volume) in (effects or SOUND_EFFECTS).items():
+            if name in self._sounds:
+                continue
+            try:
+                sound = self.mixer.Sound(assets.open(asset))
+            except Exception as exc:  # pylint: disable=W0703
+                LOGGER.warning("unable to load sound effect %s (%s): %s", name, asset, str(exc))
+                continue
+            self._sounds[name] = (sound, priority, volume)
+
+    def play(self, name, volume=1.0):
+        '''
+        Play a sound effect. Returns True if it was started
+        '''
+        effect = self._sounds.get(name)
+        if effect is None:
+            return False
+        sound, priority, effect_volume = effect
+
+        now = self.clock()
+        last = self._last_started.get(name)
+        if last is not None and now - last < self.window:
+            self.coalesced += 1
+            return False
+
+        idx = self._find_channel(priority)
+        if idx is None:
+            self.dropped += 1
+            return False
+
+        channel = self.channels[idx]
+        if channel.get_busy():
+            channel.stop()
+            self.stolen += 1
+        channel.set_volume(min(1.0, volume * effect_volume))
+        channel.play(sound)
+
+        self._playing[idx] = (priority, now)
+        self._last_started[name] = now
+        self.started += 1
+        return True
+
+    def play_events(self, events):
+        '''
+        Play the (name, volume) events of a step, highest priority first
+        '''
+        def priority(event):
+            effect = self._sounds.get(event[0])
+            return effect[1] if effect is not None else 0
+
+        for name, volume in sorted(events, key=priority, reverse=True):
+            self.play(name, volume)
+
+    def _find_channel(self, priority):
+        '''
+        Index of a free channel, or of the channel to take for a sound of
+        priority. None if every channel has a higher priority sound
+        '''
+        victim, victim_playing = None, None
+        for idx, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return idx
+
+            playing = self._playing[idx] or (0, 0.0)
+            if playing[0] <= priority and (victim is None or playing < victim_playing):
+                victim, victim_playing = idx, playing
+        return victim
@@ -0,0 +1,205 @@
+'''
+Uniform grid used to answer spatial queries for entities that are not in
+the pymunk space
+'''
+
+import math
+
+from jackit2.core import BLOCK_WIDTH
+
+
+def segment_hits_rect(start, end, rect):
+    '''
+    Slab test. Returns the fraction along start -> end where the segment
+    enters rect (left, bottom, right, top) or None if it misses
+    '''
+    t_min, t_max = 0.0, 1.0
+    for axis in (0, 1):
+        delta = end[axis] - start[axis]
+        low, high = rect[axis], rect[axis + 2]
+        if delta == 0:
+            if start[axis] < low or start[axis] > high:
+                return None
+            continue
+
+        t_low = (low - start[axis]) / delta
+        t_high = (high - start[axis]) / delta
+        if t_low > t_high:
+            t_low, t_high = t_high, t_low
+
+        t_min = max(t_min, t_low)
+        t_max = min(t_max, t_high)
+        if t_min > t_max:
+            return None
+    return t_min
+
+
+def _grid_walk(start, end, size):
+    '''
+    Set up the walk of the segment start -> end through cells of size. For
+    each axis: the direction stepped, the fraction along the segment where
+    the first cell boundary is crossed and the fraction between boundaries.
+    Returns the three as (x, y) lists
+    '''
+    steps, t_next, t_delta = [], [], []
+    for axis in (0, 1):
+        delta = end[axis] - start[axis]
+        step = 1 if delta > 0 else -1
+        steps.append(step)
+        if delta:
+            cell = math.floor(start[axis] / size)
+            t_next.append(((cell + (step > 0)) * size - start[axis]) / delta)
+            t_delta.append(size / abs(delta))
+        else:
+            t_next.append(math.inf)
+            t_delta.append(math.inf)
+    return steps, t_next, t_delta
+
+
+class SpatialGrid:
+    '''
+    Buckets entity bounding boxes into fixed size cells. A query only looks
+    at the cells it overlaps so its cost depends on the number of nearby
+    entities, not the size of the level
+    '''
+
+    def __init__(self, cell_size=BLOCK_WIDTH * 4):
+        #: Width and height of a cell in pixels
+        self.cell_size = cell_size
+        # (cell x, cell y) -> set of entities overlapping the cell
+        self._cells = {}
+        # entity -> (left, bottom, right, top)
+        self._bounds = {}
+
+    def __len__(self):
+        '''
+        Returns the number of entities in the grid
+        '''
+        return len(self._bounds)
+
+    def __contains__(self, entity):
+        '''
+        Returns True if the entity is in the grid
+        '''
+        return entity in self._bounds
+
+    def _cell_range(self, left, bottom, right, top):
+        '''
+        Iterate over the cells overlapping a rectangle
+        '''
+        size = self.cell_size
+        for cell_x in range(math.floor(left / size), math.floor(right / size) + 1):
+            for cell_y in range(math.floor(bottom / size), math.floor(top / size) + 1):
+                yield (cell_x, cell_y)
+
+    def _cells_along(self, start, end):
+        '''
+        Iterate over the cells the segment start -> end passes through, in
+        order (Amanatides & Woo). The cost is the number of cells crossed, not
+        the area of the segment's bounding box
+        '''
+        size = self.cell_size
+        cell_x, cell_y = math.floor(start[0] / size), math.floor(start[1] / size)
+        end_x, end_y = math.floor(end[0] / size), math.floor(end[1] / size)
+        yield (cell_x, cell_y)
+
+        steps, t_next, t_delta = _grid_walk(start, end, size)
+
+        # The end cells bound the walk so rounding can never step past them
+        while (cell_x, cell_y) != (end_x, end_y):
+            step_x = cell_x != end_x and (cell_y == end_y or t_next[0] <= t_next[1])
+            step_y = cell_y != end_y and (cell_x == end_x or t_next[1] <= t_next[0])
+            if step_x and step_y:
+                # Through a corner. The cells on either side are touched too
+                yield (cell_x + steps[0], cell_y)
+                yield (cell_x, cell_y + steps[1])
+            if step_x:
+                cell_x += steps[0]
+                t_next[0] += t_delta[0]
+            if step_y:
+                cell_y += steps[1]
+                t_next[1] += t_delta[1]
+            yield (cell_x, cell_y)
+
+    def insert(self, entity, bounds):
+        '''
+        Add an entity with bounding box (left, bottom, right, top)
+        '''
+        self._bounds[entity] = bounds
+        for cell in self._cell_range(*bounds):
+            if cell not in self._cells:
+                self._cells[cell] = set()
+            self._cells[cell].add(entity)
+
+    def remove(self, entity):
+        '''
+        Remove an entity from the grid
+        '''
+        bounds = self._bounds.pop(entity)
+        for cell in self._cell_range(*bounds):
+            members = self._cells[cell]
+            members.discard(entity)
+            if not members:
+                del self._cells[cell]
+
+    def move(self, entity, bounds):
+        '''
+        Update the bounding box of an entity already in the grid
+        '''
+        self.remove(entity)
+        self.insert(entity, bounds)
+
+    def _candidates(self, left, bottom, right, top):
+        '''
+        Get the entities in the cells overlapping a rectangle
+        '''
+        found = set()
+        for cell in self._cell_range(left, bottom, right, top):
+            found.update(self._cells.get(cell, ()))
+        return found
+
+    def query_rect(self, left, bottom, right, top):
+        '''
+        Get the entities whose bounding box overlaps the rectangle
+        '''
+        result = []
+        for entity in self._candidates(left, bottom, right, top):
+            e_left, e_bottom, e_right, e_top = self._bounds[entity]
+            if e_left <= right and e_right >= left and e_bottom <= top and e_top >= bottom:
+                result.append(entity)
+        return result
+
+    def query_point(self, x_pos, y_pos):
+        '''
+        Get the entities whose bounding box contains the point
+        '''
+        return self.query_rect(x_pos, y_pos, x_pos, y_pos)
+
+    def query_radius(self, x_pos, y_pos, radius):
+        '''
+        Get the entities whose bounding box is within radius of the point
+        '''
+        result = []
+        for entity in self._candidates(x_pos - radius, y_pos - radius, x_pos + radius, y_pos + radius):
+            left, bottom, right, top = self._bounds[entity]
+            dist_x = max(left - x_pos, 0, x_pos - right)
+            dist_y = max(bottom - y_pos, 0, y_pos - top)
+            if dist_x * dist_x + dist_y * dist_y <= radius * radius:
+                result.append(entity)
+        return result
+
+    def query_segment(self, start, end):
+        '''
+        Get (entity, alpha) for every entity the segment start -> end passes
+        through. alpha is the fraction along the segment of the first contact
+        '''
+        candidates = set()
+        for cell in self._cells_along(start, end):
+            candidates.update(self._cells.get(cell, ()))
+
+        result = []
+        for entity in candidates:
+            alpha = segment_hits_rect(start, end, self._bounds[entity])
+            if alpha is not None:
+                result.append((entity, alpha))
+        return result
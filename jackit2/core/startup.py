@@ -0,0 +1,82 @@
+'''
+Times the phases of starting the game for --profile-startup
+'''
+
+import sys
+import time
+import contextlib
+
+
+class StartupProfiler:
+    '''
+    Records how long each startup phase takes. Phases are always timed (it's
+    a few clock reads) and only reported when enabled
+    '''
+
+    _instance = None
+
+    def __init__(self):
+        #: True if the report is printed once the first frame is drawn
+        self.enabled = False
+        #: (phase name, nesting depth, seconds) in the order the phases started
+        self.phases = []
+        #: When the profiler was created. Marks are relative to this
+        self.start = time.perf_counter()
+        #: (name, seconds since start) of points in time such as the first frame
+        self.marks = []
+        self._depth = 0
+        self._reported = False
+
+    @classmethod
+    def get(cls):
+        '''
+        Get or create the startup profiler
+        '''
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''
+        Time the code in the with block as a phase. Phases can be nested
+        '''
+        entry = [name, self._depth, 0.0]
+        self.phases.append(entry)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry[2] = time.perf_counter() - start
+            self._depth -= 1
+
+    def mark(self, name):
+        '''
+        Record the time since the profiler was created
+        '''
+        self.marks.append((name, time.perf_counter() - self.start))
+
+    def report(self):
+        '''
+        Get the timed breakdown as text
+        '''
+        lines = ["Startup phases:"]
+        for name, depth, seconds in self.phases:
+            lines.append("  {:<40} {:8.1f} ms".format("  " * depth + name, seconds * 1000))
+        for name, seconds in self.marks:
+            lines.append("  {:<40} {:8.1f} ms since start".format(name, seconds * 1000))
+        return "\n".join(lines)
+
+    def finish(self, name="first frame"):
+        '''
+        Mark the end of startup and print the report if enabled. Only the
+        first call does anything
+        '''
+        if self._reported:
+            return
+        self._reported = True
+        self.mark(name)
+        if self.enabled:
+            print(self.report())
+            sys.stdout.flush()
@@ -0,0 +1,234 @@
+'''
+Column oriented storage for entities. Every entity type (archetype) keeps the
+data needed by the game systems in contiguous NumPy arrays so the systems can
+run as vectorized passes instead of looping over Python objects.
+'''
+
+import numpy as np
+
+from .physics import read_body_states
+
+#: Entity flags stored in the flags column
+FLAG_STATIC = 0x1
+FLAG_COLLECTABLE = 0x2
+FLAG_BREAKABLE = 0x4
+
+#: Number of floats per instance in the OpenGL buffer (in_pos, in_size, in_tint)
+INSTANCE_FLOATS = 9
+#: Bytes per instance in the OpenGL buffer
+INSTANCE_BYTES = INSTANCE_FLOATS * 4
+
+#: Default tint (white, fully transparent so the texture shows through)
+DEFAULT_TINT = (1.0, 1.0, 1.0, 0.0)
+
+
+def type_flags(entity_type):
+    '''
+    Get the flags column value for an entity type
+    '''
+    flags = 0
+    if entity_type.static:
+        flags |= FLAG_STATIC
+    if entity_type.collectable:
+        flags |= FLAG_COLLECTABLE
+    if entity_type.breakable:
+        flags |= FLAG_BREAKABLE
+    return flags
+
+
+class Archetype:
+    '''
+    Column store for all live entities of one type. Row i of every column
+    belongs to entities[i] and the entity's _index is always i.
+    '''
+    # pylint: disable=R0902
+
+    def __init__(self, entity_type, capacity=64):
+        #: Data shared by all the entities in the archetype
+        self.entity_type = entity_type
+        #: Number of live entities
+        self.count = 0
+        #: Entity handles by row
+        self.entities = []
+        #: Pymunk bodies by row
+        self.bodies = []
+
+        #: (x, y) position of each entity
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        #: Angle of each entity in radians
+        self.angles = np.zeros(capacity, dtype=np.float32)
+        #: (width, height) of each entity
+        self.sizes = np.zeros((capacity, 2), dtype=np.float32)
+        #: (r, g, b, a) tint of each entity
+        self.tints = np.zeros((capacity, 4), dtype=np.float32)
+        #: Texture binding point of each entity. -1 until textures are loaded
+        self.textures = np.full(capacity, -1, dtype=np.int32)
+        #: FLAG_* bits for each entity
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+
+        # Interleaved per instance data for the OpenGL buffer
+        self._instances = np.zeros((capacity, INSTANCE_FLOATS), dtype=np.float32)
+        # True if the columns changed since the instance data was last built
+        self._dirty = True
+        # Texture binding point. Looked up on first add
+        self._texture = None
+
+    @property
+    def capacity(self):
+        '''
+        Number of rows allocated in each column
+        '''
+        return len(self.angles)
+
+    @property
+    def static(self):
+        '''
+        True if the entities in the archetype never move
+        '''
+        return self.entity_type.static
+
+    def _grow(self, capacity):
+        '''
+        Reallocate every column with room for capacity rows
+        '''
+        def grow(col, fill=0):
+            new_col = np.full((capacity,) + col.shape[1:], fill, dtype=col.dtype)
+            new_col[:self.count] = col[:self.count]
+            return new_col
+
+        self.positions = grow(self.positions)
+        self.angles = grow(self.angles)
+        self.sizes = grow(self.sizes)
+        self.tints = grow(self.tints)
+        self.textures = grow(self.textures, -1)
+        self.flags = grow(self.flags)
+        self._instances = grow(self._instances)
+
+    def _texture_location(self):
+        '''
+        Binding point of the archetype's texture or -1 if textures aren't loaded
+        (the simulation is running without a renderer)
+        '''
+        if self._texture is None:
+            try:
+                self._texture = self.entity_type.texture.location
+            except KeyError:
+                self._texture = -1
+        return self._texture
+
+    def add(self, entity, body):
+        '''
+        Add an entity and its body to the store and return its row
+        '''
+        if self.count == self.capacity:
+            self._grow(self.capacity * 2)
+
+        idx = self.count
+        self.entities.append(entity)
+        self.bodies.append(body)
+        self.positions[idx] = body.position
+        self.angles[idx] = body.angle
+        self.sizes[idx] = (self.entity_type.width, self.entity_type.height)
+        self.tints[idx] = DEFAULT_TINT
+        self.textures[idx] = self._texture_location()
+        self.flags[idx] = type_flags(self.entity_type)
+        self.count += 1
+        self._dirty = True
+        return idx
+
+    def add_many(self, entities, bodies):
+        '''
+        Add several entities and their bodies to the store. Returns the row
+        of the first one, the rest follow in order
+        '''
+        num = len(entities)
+        if not num:
+            return self.count
+
+        needed = self.count + num
+        if needed > self.capacity:
+            self._grow(max(needed, self.capacity * 2))
+
+        start, stop = self.count, needed
+        self.entities.extend(entities)
+        self.bodies.extend(bodies)
+        self.positions[start:stop] = [tuple(body.position) for body in bodies]
+        self.angles[start:stop] = [body.angle for body in bodies]
+        self.sizes[start:stop] = (self.entity_type.width, self.entity_type.height)
+        self.tints[start:stop] = DEFAULT_TINT
+        self.textures[start:stop] = self._texture_location()
+        self.flags[start:stop] = type_flags(self.entity_type)
+        self.count = needed
+        self._dirty = True
+        return start
+
+    def remove(self, idx):
+        '''
+        Remove the entity in row idx in O(1) by moving the last row into its
+        place. The moved entity's index is updated. Cached instance data is
+        patched the same way so static archetypes never need a full rebuild
+        '''
+        if not 0 <= idx < self.count:
+            raise IndexError("No entity in row {} of {} rows".format(idx, self.count))
+
+        last = self.count - 1
+        if idx != last:
+            for col in (self.positions, self.angles, self.sizes, self.tints,
+                        self.textures, self.flags, self._instances):
+                col[idx] = col[last]
+
+            moved = self.entities[last]
+            self.entities[idx] = moved
+            self.bodies[idx] = self.bodies[last]
+            moved.set_index(idx)
+
+        self.entities.pop()
+        self.bodies.pop()
+        self.count = last
+
+    def sync(self):
+        '''
+        Copy the position and angle of every body into the columns. The bodies
+        are pymunk objects so gathering their state is one pass over them, the
+        columns are then written in bulk. Static bodies never move so static
+        archetypes are skipped
+        '''
+        if self.static or not self.count:
+            return
+
+        states = read_body_states(self.bodies)
+        self.positions[:self.count] = states[:, :2]
+        self.angles[:self.count] = states[:, 2]
+        self._dirty = True
+
+    def set_tint(self, idx, tint):
+        '''
+        Set the tint of the entity in row idx
+        '''
+        self.tints[idx] = tint
+        self._dirty = True
+
+    def outside(self, left, bottom, right, top):
+        '''
+        Get a boolean mask of the rows whose position is outside the rectangle
+        '''
+        pos = self.positions[:self.count]
+        return (
+            (pos[:, 0] < left) | (pos[:, 0] > right) |
+            (pos[:, 1] < bottom) | (pos[:, 1] > top)
+        )
+
+    def instance_data(self):
+        '''
+        Get the interleaved per instance data for the OpenGL buffer. Only
+        rebuilt when the columns have changed
+        '''
+        count = self.count
+        if self._dirty:
+            inst = self._instances
+            inst[:count, 0:2] = self.positions[:count]
+            inst[:count, 2] = self.angles[:count]
+            inst[:count, 3:5] = self.sizes[:count] * 0.5
+            inst[:count, 5:9] = self.tints[:count]
+            self._dirty = False
+        return self._instances[:count]
@@ -0,0 +1,94 @@
+'''
+Generates synthetic levels of any size for scaling benchmarks. The maps use
+the normal LevelMap characters: walls around the edge, bands of floor
+platforms and stacks of crates standing on them.
+'''
+
+import numpy as np
+
+from jackit2.core.level import Level, LevelMap
+
+#: Level number given to generated levels
+STRESS_LEVEL_NUM = 1000
+
+
+def generate_map(width, height, crate_density=0.2, stack_height=4, static_ratio=0.5, seed=0):
+    '''
+    Generate a width x height level map (list of strings, top row first).
+
+    crate_density is the fraction of the cells inside the walls that get a
+    tile, static_ratio the fraction of those tiles that are static floor
+    (the rest are crates) and stack_height the tallest crate stack. Crates
+    are only stacked on floor tiles so a generated level starts out stable
+    and there may be fewer crates than asked for if there isn't enough floor
+    '''
+    # pylint: disable=R0913
+    if width < 4 or height < 4:
+        raise ValueError("A stress level must be at least 4x4 tiles")
+    stack_height = max(1, stack_height)
+
+    rng = np.random.RandomState(seed)
+    grid = np.full((height, width), ord(' '), dtype=np.uint32)  # Row 0 is the bottom
+    grid[[0, -1], :] = ord(LevelMap.WALL)
+    grid[:, [0, -1]] = ord(LevelMap.WALL)
+    grid[1, 1] = ord(LevelMap.SPAWN)
+
+    inner_cols = np.arange(1, width - 1)
+    total = int((width - 2) * (height - 2) * crate_density)
+
+    # Bands of one platform row with room for a stack and a gap above it.
+    # The first band leaves room for the player to spawn
+    band_rows = np.arange(3, height - 2 - stack_height, stack_height + 2)
+    if band_rows.size == 0 or not total:
+        return _to_map(grid)
+
+    num_static = min(len(inner_cols), int(round(total * static_ratio / len(band_rows))))
+    num_dynamic = int(round(total * (1 - static_ratio) / len(band_rows)))
+    _fill_bands(grid, rng, band_rows, (num_static, num_dynamic), stack_height)
+    return _to_map(grid)
+
+
+def _fill_bands(grid, rng, band_rows, counts, stack_height):
+    '''
+    Put (static, dynamic) counts of floor tiles and crates in every band of
+    the grid
+    '''
+    num_static, num_dynamic = counts
+    inner_cols = np.arange(1, grid.shape[1] - 1)
+    offsets = np.arange(stack_height)[:, None]
+    for row in band_rows:
+        floor_cols = np.sort(rng.choice(inner_cols, num_static, replace=False))
+        grid[row, floor_cols] = ord(LevelMap.FLOOR)
+        if not num_static or not num_dynamic:
+            continue
+
+        # Drop the band's crates on random floor columns. Stacks are cut at stack_height
+        heights = np.bincount(rng.randint(0, num_static, num_dynamic), minlength=num_static)
+        stacks = grid[row + 1:row + 1 + stack_height, floor_cols]
+        stacks[offsets < heights[None, :]] = ord(LevelMap.CRATE)
+        grid[row + 1:row + 1 + stack_height, floor_cols] = stacks
+
+
+def _to_map(grid):
+    '''
+    Convert a grid of character codes (row 0 at the bottom) to a level map
+    '''
+    rows = grid[::-1].astype('<u4').view('<U{}'.format(grid.shape[1])).ravel()
+    return rows.tolist()
+
+
+class StressLevel(Level):
+    '''
+    Generated level for benchmarks. Takes the generate_map() parameters
+    '''
+    # pylint: disable=R0903,R0913
+
+    def __init__(self, width=256, height=128, crate_density=0.2, stack_height=4, static_ratio=0.5, seed=0):
+        super().__init__(
+            STRESS_LEVEL_NUM,
+            generate_map(width, height, crate_density, stack_height, static_ratio, seed),
+            "Stress {}x{}".format(width, height),
+            "Generated level: {:.0%} tiles, stacks of {}, {:.0%} static".format(
+                crate_density, stack_height, static_ratio
+            )
+        )
@@ -2,6 +2,7 @@
 Classes used to load textures
 '''
 
+import io
 import os
 import logging
 
@@ -27,13 +28,13 @@ class Texture:
     '''
     # pylint: disable=R0903
 
-    def __init__(self, path, gl_ctx):
-        #: Path to the texture file
+    def __init__(self, path, gl_ctx, data=None):
+        #: Path to the texture file (its asset name)
         self.path = path
         #: ModernGL Context
         self.ctx = gl_ctx
-        #: Loaded image
-        self.image = Image.open(self.path).convert('RGBA')
+        #: Loaded image. From data (the file's contents) if given
+        self.image = Image.open(io.BytesIO(data) if data is not None else self.path).convert('RGBA')
         #: ModernGL texture. Image size, 4 components (e.g. RGBA), and the image bytes
         self.texture = self.ctx.texture(self.image.size, 4, self.image.tobytes())
         #: Unique location - Binding point for texture
@@ -86,19 +87,19 @@ class TextureLoader:
         '''
         Load all the textures
         '''
-        from deploy import SITE_DEPLOYMENT
-
-        for (dirpath, _, filenames) in os.walk(SITE_DEPLOYMENT.texture_path):
-            for filename in filenames:
-                if not filename.endswith(".png"):
-                    LOGGER.warning("file '%s' in textures directory is not a texture", filename)
-                    continue
-
-                LOGGER.debug("loading texture: %s", filename)
-                path = os.path.join(dirpath, filename)
-                name = os.path.splitext(filename)[0]  # Grab the filename component w/o file ext.
-
-                if name not in self._textures:
-                    self._textures[name] = Texture(path, gl_ctx)
-                else:
-                    LOGGER.warning("texture with name '%s' has already been loaded.", name)
+        from jackit2.util import get_site_deployment
+
+        assets = get_site_deployment().assets
+        for asset_name in assets.names("textures"):
+            filename = asset_name.rsplit('/', 1)[-1]
+            if not filename.endswith(".png"):
+                LOGGER.warning("file '%s' in textures directory is not a texture", filename)
+                continue
+
+            LOGGER.debug("loading texture: %s", filename)
+            name = os.path.splitext(filename)[0]  # Grab the filename component w/o file ext.
+
+            if name not in self._textures:
+                self._textures[name] = Texture(asset_name, gl_ctx, assets.get(asset_name))
+            else:
+                LOGGER.warning("texture with name '%s' has already been loaded.", name)
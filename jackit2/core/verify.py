@@ -0,0 +1,137 @@
+'''
+Headless stability and performance check of every level the LevelLoader
+finds. Each level is simulated for a fixed number of steps with the whole
+level streamed in and a JSON friendly report is made of how long it took to
+settle, what each step cost and whether anything fell out of the level.
+'''
+
+import time
+import multiprocessing
+
+import numpy as np
+
+from jackit2.util import get_level_loader
+from jackit2.core.physics import read_body_states
+from jackit2.core.simulation import Simulation
+
+#: A level is settled once no dynamic body moves faster than this (pixels per second)
+SETTLE_SPEED = 5.0
+#: ... or spins faster than this (radians per second)
+SETTLE_SPIN = 0.05
+
+
+def _max_motion(bodies):
+    '''
+    Get the highest linear and angular speed of the bodies
+    '''
+    if not bodies:
+        return 0.0, 0.0
+    states = read_body_states(bodies)
+    speeds = np.hypot(states[:, 3], states[:, 4])
+    return float(speeds.max()), float(np.abs(states[:, 5]).max())
+
+
+def verify_level(index, num_steps, framerate=60):
+    '''
+    Simulate the level at index in the LevelLoader for num_steps steps and
+    return its report
+    '''
+    report = {"index": index, "steps": num_steps}
+    try:
+        start = time.perf_counter()
+        sim = Simulation(get_level_loader()[index], framerate)
+        report["load_ms"] = (time.perf_counter() - start) * 1000
+    except Exception as exc:  # pylint: disable=W0703
+        report["error"] = "{}: {}".format(type(exc).__name__, str(exc))
+        report["ok"] = False
+        return report
+
+    report["level_num"] = sim.level.level_num
+    report["name"] = sim.level.name
+    report.update(_simulate(sim, num_steps))
+    report["ok"] = report["settled"] and not report["escaped"] and report["player_escaped_step"] is None
+    return report
+
+
+def _simulate(sim, num_steps):
+    '''
+    Step the level's simulation num_steps times. Returns the stability and
+    step cost part of the report
+    '''
+    # Keep the whole level active so every stack is simulated
+    sim.view_rect = (0, 0, sim.width, sim.height)
+    sim.escaped = []
+
+    costs = np.zeros(num_steps)
+    escaped = []
+    player_escaped = None
+    settle_step = 0
+    peak_bodies = peak_shapes = 0
+    for step in range(num_steps):
+        start = time.perf_counter()
+        sim.step()
+        costs[step] = time.perf_counter() - start
+
+        escaped.extend(
+            {"step": sim.steps, "type": ent_name, "x": x_pos, "y": y_pos} for ent_name, x_pos, y_pos in sim.escaped
+        )
+        del sim.escaped[:]
+
+        if player_escaped is None and sim.deaths:
+            player_escaped = sim.steps
+
+        speed, spin = _max_motion(sim.entity_mgr.dynamic_bodies())
+        if speed > SETTLE_SPEED or spin > SETTLE_SPIN:
+            settle_step = sim.steps
+
+        peak_bodies = max(peak_bodies, len(sim.space.bodies))
+        peak_shapes = max(peak_shapes, len(sim.space.shapes))
+
+    settled = settle_step < num_steps
+    return {
+        "settled": settled,
+        "settle_step": settle_step if settled else None,
+        "settle_seconds": settle_step * sim.step_size if settled else None,
+        "step_ms_mean": float(costs.mean() * 1000) if num_steps else 0.0,
+        "step_ms_peak": float(costs.max() * 1000) if num_steps else 0.0,
+        "bodies": len(sim.space.bodies),
+        "shapes": len(sim.space.shapes),
+        "peak_bodies": peak_bodies,
+        "peak_shapes": peak_shapes,
+        "escaped": escaped,
+        "player_escaped_step": player_escaped,
+    }
+
+
+def _init_worker():
+    '''
+    Make sure the site deployment is set up and the levels searched in worker
+    processes that didn't inherit them
+    '''
+    get_level_loader()
+
+
+def _verify_star(args):
+    return verify_level(*args)
+
+
+def verify_levels(num_steps, framerate=60, workers=None):
+    '''
+    Verify every level found by the LevelLoader in a process pool. Returns
+    the reports in level order
+    '''
+    jobs = [(index, num_steps, framerate) for index in range(len(get_level_loader()))]
+    if not jobs:
+        return []
+
+    workers = min(len(jobs), workers or multiprocessing.cpu_count())
+    if workers == 1:
+        return [verify_level(*job) for job in jobs]
+
+    # Closed and joined rather than terminated (which leaving the with block
+    # does). Terminating can hang waiting for a worker the pool just replaced
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        reports = pool.map(_verify_star, jobs)
+        pool.close()
+        pool.join()
+    return reports
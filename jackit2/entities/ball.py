@@ -2,8 +2,7 @@
 A ball entity
 '''
 
-from jackit2.util import get_texture_loader
-from jackit2.core.entity import Entity, create_circle
+from jackit2.core.entity import Entity, EntityType, create_circle
 
 
 class Ball(Entity):
@@ -11,10 +10,11 @@ class Ball(Entity):
     A crate object
     '''
 
-    def __init__(self, x_pos, y_pos, width, height):
-        txs = get_texture_loader()
+    __slots__ = ()
+
+    entity_type = EntityType("ball")
+
+    def __init__(self, x_pos, y_pos):
         super().__init__(
-            x_pos, y_pos, width, height,
-            create_circle(x_pos, y_pos, (width / 2), 100, 0.3),
-            txs.get_texture_by_name("ball")
+            create_circle(x_pos, y_pos, (self.entity_type.width / 2), 100, 0.3)
         )
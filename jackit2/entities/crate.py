@@ -2,8 +2,7 @@
 A crate entity
 '''
 
-from jackit2.util import get_texture_loader
-from jackit2.core.entity import Entity, create_box
+from jackit2.core.entity import Entity, EntityType, create_box
 
 
 class Crate(Entity):
@@ -11,10 +10,11 @@ class Crate(Entity):
     A crate object
     '''
 
-    def __init__(self, x_pos, y_pos, width, height):
-        txs = get_texture_loader()
+    __slots__ = ()
+
+    entity_type = EntityType("crate")
+
+    def __init__(self, x_pos, y_pos):
         super().__init__(
-            x_pos, y_pos, width, height,
-            create_box(x_pos, y_pos, width, height, 10, 0.3),
-            txs.get_texture_by_name("crate")
+            create_box(x_pos, y_pos, self.entity_type.width, self.entity_type.height, 10, 0.3)
         )
@@ -2,8 +2,7 @@
 A wall entity
 '''
 
-from jackit2.util import get_texture_loader
-from jackit2.core.entity import Entity, create_static_box
+from jackit2.core.entity import Entity, EntityType, create_static_box
 
 
 class Wall(Entity):
@@ -11,10 +10,11 @@ class Wall(Entity):
     A wall object
     '''
 
-    def __init__(self, x_pos, y_pos, width, height):
-        txs = get_texture_loader()
+    __slots__ = ()
+
+    entity_type = EntityType("floor", static=True)
+
+    def __init__(self, x_pos, y_pos):
         super().__init__(
-            x_pos, y_pos, width, height,
-            create_static_box(x_pos, y_pos, width, height, 0.5),
-            txs.get_texture_by_name("floor")
+            create_static_box(x_pos, y_pos, self.entity_type.width, self.entity_type.height, 0.5)
         )
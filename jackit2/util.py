@@ -22,10 +22,10 @@ def get_game_engine():
 
 def get_level_loader():
     '''
-    Get the level loader in an import safe way
+    Get the level loader in an import safe way. The level search paths are
+    searched the first time it's needed
     '''
-    from jackit2.core.loader import LevelLoader
-    return LevelLoader.get()
+    return get_site_deployment().levels
 
 
 def get_texture_loader():
@@ -36,6 +36,14 @@ def get_texture_loader():
     return TextureLoader.get()
 
 
+def get_startup_profiler():
+    '''
+    Get the startup profiler in an import safe way
+    '''
+    from jackit2.core.startup import StartupProfiler
+    return StartupProfiler.get()
+
+
 def get_config():
     '''
     Helper method that returns just the config from
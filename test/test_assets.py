@@ -0,0 +1,74 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase
+
+from jackit2.core.assets import AssetPack, AssetStore, build_pack
+from jackit2.core.levelfile import write_level_file
+from jackit2.core.loader import LevelLoader, level_module_name
+
+LEVEL_SOURCE = '''
+from jackit2.core.level import Level
+
+
+class TestLevel(Level):
+    def __init__(self):
+        super().__init__(1, ["WSW", "FFF"], "Packed")
+
+
+__Level__ = TestLevel
+'''
+
+
+class TestAssetPack(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.resources = os.path.join(self.root, "resources")
+        self.levels = os.path.join(self.root, "levels")
+        self.pack_path = os.path.join(self.root, "assets.pack")
+        self.write(os.path.join(self.resources, "textures", "a.png"), b"png data")
+        self.write(os.path.join(self.resources, "audio", "music", "b.mp3"), b"mp3")
+        self.write(os.path.join(self.levels, "level.py"), LEVEL_SOURCE.encode('utf-8'))
+        self.write(os.path.join(self.levels, "helpers.py"), b"VALUE = 1\n")
+        write_level_file(os.path.join(self.levels, "binary.jkl"), ["WSW", "FFF"], 2, "Binary")
+        build_pack(self.pack_path, self.resources, self.levels)
+
+    def tearDown(self):
+        for name in list(sys.modules):
+            if name.startswith(level_module_name(self.levels, self.levels)):
+                del sys.modules[name]
+        shutil.rmtree(self.root)
+
+    def write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as out:
+            out.write(data)
+
+    def test_pack_matches_loose_files(self):
+        loose = AssetStore(self.resources)
+        packed = AssetStore(self.resources, self.pack_path)
+        self.assertIsNone(loose.pack)
+        self.assertIsNotNone(packed.pack)
+
+        self.assertEqual(packed.names("textures"), ["textures/a.png"])
+        self.assertEqual(packed.names("audio"), loose.names("audio"))
+        data = packed.get("audio/music/b.mp3")
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(bytes(data), loose.get("audio/music/b.mp3"))
+        self.assertEqual(packed.open("textures/a.png").read(), b"png data")
+
+    def test_packed_levels(self):
+        pack = AssetPack(self.pack_path)
+        self.assertNotIn("levels/helpers.py", pack)
+
+        loader = LevelLoader()
+        loader.add_pack(pack)
+        self.assertEqual([stub.name for stub in loader], ["Binary", "Packed"])
+        self.assertEqual(loader.get_by_num(1).name, "Packed")
+        self.assertEqual(loader.get_by_num(2).level_map.shape, (2, 3))
+
+    def test_bad_pack_falls_back_to_loose_files(self):
+        self.write(self.pack_path, b"not a pack")
+        self.assertIsNone(AssetStore(self.resources, self.pack_path).pack)
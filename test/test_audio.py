@@ -0,0 +1,45 @@
+import os
+import tempfile
+import threading
+import wave
+from unittest import TestCase
+
+from jackit2.core.assets import AssetStore
+from jackit2.core.audio import GameAudio
+
+
+class TestGameAudio(TestCase):
+
+    def test_missing_music_still_becomes_ready(self):
+        ready = threading.Event()
+        with tempfile.TemporaryDirectory() as root:
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+            audio = GameAudio(on_ready=lambda _: ready.set(), assets=AssetStore(root))
+            audio.play_game_music()  # Before or after loading finished, this must not block or raise
+            self.assertTrue(ready.wait(10))
+
+        self.assertTrue(audio.wait(0))
+        self.assertFalse(audio.music_loaded)
+        audio.toggle_game_music()
+
+    def test_effects_loaded_when_level_starts(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "audio", "sounds"))
+            with wave.open(os.path.join(root, "audio", "sounds", "test.wav"), 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(22050)
+                wav.writeframes(bytes(2205 * 2))
+
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+            audio = GameAudio(assets=AssetStore(root), num_channels=4)
+            audio.load_effects(["impact"])  # Probably before the mixer is open
+            self.assertTrue(audio.wait(10))
+            if audio.sounds is None:
+                self.skipTest("no audio device")
+
+            self.assertIn("impact", audio.sounds)
+            self.assertNotIn("break", audio.sounds)
+            audio.load_effects(["impact", "break"])
+            self.assertIn("break", audio.sounds)
+            self.assertEqual(len(audio.sounds.channels), 4)
@@ -0,0 +1,38 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from jackit2.config import JackitConfig
+from jackit2.core import calibrate
+
+
+class TestCalibrate(TestCase):
+
+    def test_choose_profile_fast_machine(self):
+        profile = calibrate.choose_profile(0.5, 0.1, 1.0, (800, 600))
+        self.assertEqual(profile, {"framerate": 60, "physics_substeps": 4, "render_scale": 1.0, "effects": 2})
+
+    def test_choose_profile_slow_machine(self):
+        # 16.7 ms frames at 60 fps leave 8.3 ms. 10 ms of physics needs a lower framerate
+        profile = calibrate.choose_profile(10.0, 0.5, 1.0, (800, 600))
+        self.assertLess(profile["framerate"], 60)
+        self.assertEqual(profile["physics_substeps"], 1)
+
+        # A slow GPU costs render scale before framerate
+        profile = calibrate.choose_profile(1.0, 0.5, 20.0, (800, 600))
+        self.assertEqual(profile["framerate"], 60)
+        self.assertLess(profile["render_scale"], 1.0)
+
+        # Nothing fits: everything at its lowest
+        profile = calibrate.choose_profile(100.0, 0.5, 1.0, (800, 600))
+        self.assertEqual(profile, {"framerate": 30, "physics_substeps": 1, "render_scale": 0.5, "effects": 0})
+
+    def test_calibrate_applies_profile(self):
+        config = JackitConfig("test.site.cfg.json")
+        with patch.object(calibrate, "measure_fill", return_value=None):
+            profile = calibrate.calibrate(config)
+
+        self.assertEqual(config.profile, calibrate.AUTO_PROFILE)
+        self.assertEqual(config.profiles[config.profile], profile)
+        self.assertEqual(config.physics_substeps, profile["physics_substeps"])
+        self.assertGreater(profile["benchmark"]["physics_step_ms"], 0.0)
+        self.assertTrue(config.needs_save)
@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import pymunk
+
+from jackit2.core.chunk import ChunkStreamer, CHUNK_HEIGHT
+from jackit2.core.entity import EntityManager
+from jackit2.entities import Crate, Floor
+
+#: Covers only chunk (0, 0)
+BOTTOM = (0, 0, 10, 10)
+#: Covers only chunk (0, 1)
+TOP = (0, CHUNK_HEIGHT + 100, 10, CHUNK_HEIGHT + 110)
+
+
+class TestChunkStreamer(TestCase):
+
+    def setUp(self):
+        self.mgr = EntityManager(pymunk.Space(), None, None, None)
+        self.chunks = ChunkStreamer(16, 48, margin=0)
+        self.chunks.add_tiles(Floor, [0, 1], [0, 20])
+        self.chunks.add_tiles(Crate, [10], [20])  # In chunk (0, 1) at (640, 1280)
+
+    def positions(self, ent_cls):
+        return sorted((entity.x_pos, entity.y_pos) for entity in self.mgr if isinstance(entity, ent_cls))
+
+    def test_stream_in_and_out(self):
+        self.chunks.update(self.mgr, [BOTTOM])
+        self.assertEqual([chunk.key for chunk in self.chunks.active_chunks], [(0, 0)])
+        self.assertEqual(self.positions(Floor), [(0, 0)])
+        self.assertEqual(self.positions(Crate), [])
+
+        self.chunks.update(self.mgr, [TOP])
+        self.assertEqual(self.positions(Floor), [(64, 1280)])
+        self.assertEqual(self.positions(Crate), [(640, 1280)])
+
+        # The crate is frozen where it is and comes back there
+        self.mgr.move(self.mgr.get_archetype(Crate).entities[0], 700, 1300)
+        self.mgr.update()
+        self.chunks.update(self.mgr, [BOTTOM])
+        self.mgr.flush()
+        self.assertEqual(self.positions(Crate), [])
+        self.chunks.update(self.mgr, [TOP])
+        self.assertEqual(self.positions(Crate), [(700, 1300)])
+
+    def test_entity_falls_into_chunk_never_active(self):
+        self.chunks.update(self.mgr, [BOTTOM])
+        self.mgr.spawn(Crate, 100, 1300)  # In chunk (0, 1), which was never active
+        self.mgr.update()
+        self.chunks.update(self.mgr, [BOTTOM])
+        self.mgr.flush()
+        self.assertEqual(self.positions(Crate), [])
+
+        # Both the crate that fell in and the chunk's own crate from the map are there
+        self.chunks.update(self.mgr, [TOP])
+        self.assertEqual(self.positions(Crate), [(100, 1300), (640, 1280)])
@@ -126,3 +126,51 @@ class TestConfig(TestCase):
         mock_file.side_effect = IOError("Access Denied")
         with self.assertRaises(ConfigError):
             self.config.save()
+
+    def test_needs_save(self):
+        self.assertTrue(self.config.needs_save)  # Not written yet
+
+        self.config.from_json(self.config.to_json())
+        self.assertFalse(self.config.needs_save)
+
+        raw = self.config.to_json()
+        del raw["framerate"]
+        self.config.from_json(raw)
+        self.assertTrue(self.config.needs_save)
+
+    def test_profiles(self):
+        profile = {"framerate": 45, "physics_substeps": 2, "render_scale": 0.75, "effects": 1, "benchmark": {}}
+        self.config.apply_profile("auto", profile)
+        self.assertEqual(self.config.profile, "auto")
+        self.assertEqual((self.config.framerate, self.config.physics_substeps), (45, 2))
+        self.assertEqual((self.config.render_width, self.config.render_height), (600, 450))
+
+        # Profiles survive a save and load
+        raw = self.config.to_json()
+        config = JackitConfig("test.site.cfg.json")
+        config.from_json(raw)
+        self.assertEqual(config.profiles, self.config.profiles)
+        self.assertEqual(config.effects, 1)
+        self.assertFalse(config.needs_save)
+
+        with self.assertRaises(ConfigError):
+            self.config.apply_profile("missing")
+        with self.assertRaises(ConfigError):
+            self.config.apply_profile("bad", dict(profile, render_scale=2.0))
+        with self.assertRaises(ConfigError):
+            self.config.apply_profile("bad", {"framerate": 60})
+
+    def test_older_config_keeps_settings(self):
+        # A config from before the performance settings existed
+        raw = self.config.to_json()
+        for setting in ("physics_substeps", "render_scale", "effects", "profile", "profiles"):
+            del raw[setting]
+        raw["framerate"] = 30
+        self.config.from_json(raw)
+        self.assertEqual(self.config.unset_settings, ("physics_substeps", "render_scale", "effects"))
+
+        profile = {"framerate": 60, "physics_substeps": 2, "render_scale": 0.75, "effects": 1}
+        self.config.apply_profile("auto", profile, self.config.unset_settings)
+        self.assertEqual(self.config.framerate, 30)
+        self.assertEqual((self.config.physics_substeps, self.config.render_scale, self.config.effects), (2, 0.75, 1))
+        self.assertEqual(self.config.unset_settings, ())
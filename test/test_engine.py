@@ -0,0 +1,65 @@
+import threading
+import time
+from unittest import TestCase, mock
+
+from jackit2.core.engine import EngineSingleton
+from jackit2.core.level import Level
+from jackit2.core.preload import LevelPreloader
+from jackit2.core.simulation import Simulation
+
+LEVEL_MAP = [
+    "W    W",
+    "WS   W",
+    "WFFFFW",
+]
+
+
+class TestNextLevel(TestCase):
+
+    def setUp(self):
+        self.engine = EngineSingleton()
+        self.engine.levels = [lambda: Level(1, LEVEL_MAP), lambda: Level(2, LEVEL_MAP)]
+        self.engine.gl = mock.Mock()
+        self.engine.ctx = mock.Mock()
+        self.engine.camera = mock.Mock()
+        self.engine.camera.view_rect.return_value = (0, 0, 400, 200)
+        self.engine.sim = Simulation(self.engine.levels[0]())
+
+        # The next level's build waits until the test lets it finish
+        self.built = threading.Event()
+        self.engine.preloader = LevelPreloader()
+        build = self.engine.preloader._build
+        self.engine.preloader._build = lambda stub: self.built.wait(5) and build(stub)
+        self.engine._preload_next()
+
+    def tearDown(self):
+        self.built.set()
+        self.engine.preloader.shutdown()
+
+    def update(self):
+        with mock.patch("jackit2.core.entity.EntityManager.draw"):
+            self.engine.update()
+
+    def test_waits_for_preload(self):
+        first = self.engine.sim
+        self.assertTrue(self.engine.next_level())
+
+        # The current level keeps being played while the next one is built
+        self.update()
+        self.assertIs(self.engine.sim, first)
+        self.assertEqual(first.steps, 1)
+        self.assertTrue(self.engine.level_pending)
+
+        self.built.set()
+        deadline = time.time() + 5
+        while not self.engine.preloader.ready() and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.update()
+        self.assertIsNot(self.engine.sim, first)
+        self.assertEqual(self.engine.sim.level.level_num, 2)
+        self.assertEqual(self.engine.level_index, 1)
+        self.assertFalse(self.engine.level_pending)
+
+        # That was the last level
+        self.assertFalse(self.engine.next_level())
@@ -0,0 +1,132 @@
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+import pymunk
+
+from jackit2.core.entity import EntityManager
+from jackit2.entities import Crate
+
+
+def make_manager():
+    return EntityManager(pymunk.Space(), None, None, None)
+
+
+class TestEntityPool(TestCase):
+
+    def setUp(self):
+        self.mgr = make_manager()
+
+    def test_released_entity_is_reused(self):
+        crate = self.mgr.spawn(Crate, 10, 20)
+        self.mgr.release(crate)
+        self.mgr.flush()
+        self.assertEqual(self.mgr.pool_size(Crate), 1)
+        self.assertEqual(len(self.mgr), 0)
+
+        self.assertIs(self.mgr.spawn(Crate, 30, 40), crate)
+        self.assertEqual(self.mgr.pool_size(Crate), 0)
+        self.assertIsNot(self.mgr.spawn(Crate, 50, 60), crate)  # Pool is empty, a new one is made
+
+    def test_reused_entity_is_reset(self):
+        crate = self.mgr.spawn(Crate, 10, 20)
+        self.mgr.spawn(Crate, 100, 100)
+        crate.body.velocity = (50, -30)
+        crate.body.angular_velocity = 2.0
+        crate.body.angle = 1.0
+        self.mgr.release(crate)
+        self.mgr.flush()
+
+        self.assertIs(self.mgr.spawn(Crate, 30, 40), crate)
+        self.assertEqual(crate.get_state(), (30, 40, 0, 0, 0, 0))
+
+        # It has a fresh row at the end of the archetype holding its new position
+        arch = self.mgr.get_archetype(Crate)
+        self.assertEqual(crate.get_index(), 1)
+        self.assertIs(arch.entities[1], crate)
+        self.assertEqual(tuple(arch.positions[1]), (30, 40))
+        self.assertIn(crate.body, self.mgr.space.bodies)
+
+    def test_prefill(self):
+        self.mgr.prefill(Crate, 5)
+        self.assertEqual(self.mgr.pool_size(Crate), 5)
+        self.mgr.prefill(Crate, 3)  # Already big enough
+        self.assertEqual(self.mgr.pool_size(Crate), 5)
+
+        crates = self.mgr.spawn_many(Crate, [(idx * 40, 0) for idx in range(7)])
+        self.assertEqual(self.mgr.pool_size(Crate), 0)
+        self.assertEqual(len(set(crates)), 7)
+        self.assertEqual(len(self.mgr), 7)
+
+
+class TestEntityRemoval(TestCase):
+
+    def setUp(self):
+        self.mgr = make_manager()
+        self.crates = self.mgr.spawn_many(Crate, [(idx * 40, 0) for idx in range(3)])
+        self.arch = self.mgr.get_archetype(Crate)
+
+    def test_remove(self):
+        crate = self.crates[2]
+        self.assertTrue(self.mgr.remove(crate))
+        self.assertEqual(crate.get_index(), -1)
+        self.assertEqual(len(self.mgr), 2)
+        self.assertIn(crate.body, self.mgr.space.bodies)  # Until the flush
+        self.mgr.flush()
+        self.assertNotIn(crate.body, self.mgr.space.bodies)
+
+    def test_swap_remove(self):
+        first, _, last = self.crates
+        self.mgr.remove(first)
+        self.assertEqual(last.get_index(), 0)
+        self.assertIs(self.arch.entities[0], last)
+        self.assertEqual(tuple(self.arch.positions[0]), (80, 0))
+
+    def test_double_remove(self):
+        first, middle, last = self.crates
+        self.mgr.remove(first)
+        self.assertFalse(self.mgr.remove(first))
+
+        # The live entities keep their rows
+        self.assertEqual(self.arch.count, 2)
+        for idx, entity in enumerate(self.arch.entities):
+            self.assertEqual(entity.get_index(), idx)
+        self.assertEqual({middle.get_index(), last.get_index()}, {0, 1})
+
+        # Released twice is pooled once
+        self.mgr.release(middle)
+        self.mgr.release(middle)
+        self.assertEqual(self.mgr.pool_size(Crate), 1)
+        self.assertEqual(self.arch.entities, [last])
+        self.assertEqual(last.get_index(), 0)
+
+
+class FakeBuffer:
+    '''
+    Stands in for the OpenGL instance buffer
+    '''
+
+    def __init__(self, size):
+        self.size = size
+
+    def write(self, data):
+        assert data.nbytes <= self.size, "buffer overflow"
+
+    def orphan(self, size=-1):
+        if size != -1:
+            self.size = size
+
+
+class TestEntityDraw(TestCase):
+
+    def test_buffer_grows(self):
+        buffer = FakeBuffer(64)
+        vertex_array = mock.Mock()
+        mgr = EntityManager(pymunk.Space(), buffer, vertex_array, {"Texture": SimpleNamespace(value=None)})
+        mgr.spawn_many(Crate, [(idx * 40, 0) for idx in range(10)])
+        arch = mgr.get_archetype(Crate)
+
+        with mock.patch.object(arch.entity_type, "_texture", SimpleNamespace(location=3)):
+            mgr.draw()
+
+        self.assertGreaterEqual(buffer.size, arch.instance_data().nbytes)
+        self.assertEqual(vertex_array.render.call_args[1]["instances"], 10)
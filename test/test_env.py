@@ -0,0 +1,108 @@
+import functools
+from unittest import TestCase
+
+import numpy as np
+
+from jackit2.core.env import ACTION_NONE, ACTION_RIGHT, ACTION_JUMP, OBS_SIZE, LevelEnv, VectorEnv
+from jackit2.core.level import Level
+
+LEVEL_MAP = [
+    "W    C    W",
+    "W    C    W",
+    "WS        W",
+    "WFFFFFFFFFW",
+]
+
+#: Nothing under the spawn point
+NO_FLOOR_MAP = [
+    "W  W",
+    "WS W",
+    "W  W",
+    "W  W",
+]
+
+
+def level_cls(level_map):
+    return functools.partial(Level, 1, level_map)
+
+
+def play(env, actions):
+    return [env.step(action) for action in actions]
+
+
+class TestLevelEnv(TestCase):
+
+    def setUp(self):
+        self.env = LevelEnv(level_cls(LEVEL_MAP), max_steps=20)
+
+    def tearDown(self):
+        self.env.close()
+
+    def test_episodes_restart_the_level(self):
+        first = self.env.reset()
+        self.assertEqual(first.shape, (OBS_SIZE,))
+        sim = self.env.sim
+
+        results = play(self.env, [ACTION_RIGHT | ACTION_JUMP] * 10 + [ACTION_RIGHT] * 10)
+        self.assertTrue(results[-1][2])  # max_steps
+        self.assertGreater(sum(reward for _, reward, _ in results), 0)
+
+        # The same simulation is restarted, not rebuilt, with no keys held
+        np.testing.assert_array_equal(self.env.reset(), first)
+        self.assertIs(self.env.sim, sim)
+        self.assertEqual(sim.steps, 0)
+        self.assertEqual(sim.input.keys.down, 0)
+
+        # And plays out about the same. Not bit for bit since the physics
+        # space keeps its cached contacts across a restart
+        again = play(self.env, [ACTION_RIGHT | ACTION_JUMP] * 10 + [ACTION_RIGHT] * 10)
+        for (obs, _, done), (obs2, _, done2) in zip(results, again):
+            np.testing.assert_allclose(obs, obs2, rtol=0.01, atol=1.0)
+            self.assertEqual(done, done2)
+
+    def test_death_ends_episode(self):
+        env = LevelEnv(level_cls(NO_FLOOR_MAP))
+        first = env.reset()
+        for _ in range(600):
+            obs, reward, done = env.step(ACTION_NONE)
+            if done:
+                break
+        self.assertTrue(done)
+        self.assertEqual(reward, 0.0)
+        self.assertEqual(env.sim.deaths, 1)
+        np.testing.assert_array_equal(obs, first)  # Already respawned
+        np.testing.assert_array_equal(env.reset(), first)
+
+    def test_close(self):
+        self.env.reset()
+        sim = self.env.sim
+        self.env.close()
+        self.assertIsNone(self.env.sim)
+        self.assertIsNone(sim.player)
+        self.assertEqual(sim.input.handlers, {})
+
+
+class TestVectorEnv(TestCase):
+
+    def test_step_and_reset(self):
+        vec = VectorEnv(level_cls(LEVEL_MAP), 3, max_steps=5)
+        obs = vec.reset()
+        self.assertEqual(obs.shape, (3, OBS_SIZE))
+        first = obs.copy()
+        sims = [env.sim for env in vec.envs]
+
+        actions = np.array([ACTION_NONE, ACTION_RIGHT, ACTION_RIGHT], dtype=np.uint8)
+        for _ in range(4):
+            obs, rewards, dones = vec.step(actions)
+            self.assertFalse(dones.any())
+        self.assertGreater(rewards[1], 0)
+        np.testing.assert_array_equal(obs[1], obs[2])
+
+        # Every episode ends on the 5th step and is reset in place
+        obs, _, dones = vec.step(actions)
+        self.assertTrue(dones.all())
+        np.testing.assert_array_equal(obs, first)
+        self.assertEqual([env.sim for env in vec.envs], sims)
+
+        vec.close()
+        self.assertEqual([env.sim for env in vec.envs], [None] * 3)
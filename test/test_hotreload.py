@@ -0,0 +1,92 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from jackit2.core.hotreload import LevelWatcher
+from jackit2.core.loader import LevelLoader, level_module_name
+from jackit2.core.simulation import Simulation
+from jackit2.entities import Crate
+
+LEVEL_SOURCE = '''
+from jackit2.core.level import Level
+
+
+class TestLevel(Level):
+    def __init__(self):
+        super().__init__(1, {level_map!r}, "Watched")
+
+
+__Level__ = TestLevel
+'''
+
+LEVEL_MAP = [
+    "W    W",
+    "WS   W",
+    "WFFFFW",
+]
+
+EDITED_MAP = [
+    "W  C W",
+    "WS   W",
+    "WFFFFW",
+]
+
+
+class TestLevelWatcher(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "watched.py")
+        self.write(LEVEL_MAP)
+
+        self.levels = LevelLoader()
+        self.levels.add_search_path(self.root)
+        self.sim = Simulation(self.levels.get_by_num(1))
+        self.watcher = LevelWatcher(self.levels, interval=0)
+
+    def tearDown(self):
+        for name in list(sys.modules):
+            if name.startswith(level_module_name(self.root, self.root)):
+                del sys.modules[name]
+        shutil.rmtree(self.root)
+
+    def write(self, level_map, mtime=1000000):
+        with open(self.path, 'w') as level_file:
+            level_file.write(LEVEL_SOURCE.format(level_map=level_map))
+        # Set the mtime so edits are seen even on file systems with a coarse clock
+        os.utime(self.path, (mtime, mtime))
+
+    def crates(self):
+        arch = self.sim.entity_mgr.get_archetype(Crate)
+        return arch.count if arch is not None else 0
+
+    def test_reload_on_change(self):
+        self.assertFalse(self.watcher.poll(self.sim))  # Starts watching the file
+
+        self.write(EDITED_MAP, mtime=1000010)
+        self.assertTrue(self.watcher.poll(self.sim))
+        self.assertEqual(self.crates(), 1)
+        self.assertEqual(self.sim.level.level_map, EDITED_MAP)
+
+    def test_no_reload_when_unchanged(self):
+        with mock.patch.object(self.levels, "reload_file", wraps=self.levels.reload_file) as reload_file:
+            self.assertFalse(self.watcher.poll(self.sim))
+            self.assertFalse(self.watcher.poll(self.sim))
+        reload_file.assert_not_called()
+
+    def test_poll_interval(self):
+        watcher = LevelWatcher(self.levels, interval=60)
+        self.assertFalse(watcher.poll(self.sim))
+
+        # Not checked again until the interval has passed
+        self.write(EDITED_MAP, mtime=1000010)
+        self.assertFalse(watcher.poll(self.sim))
+        self.assertEqual(self.crates(), 0)
+
+    def test_missing_file(self):
+        self.assertFalse(self.watcher.poll(self.sim))
+        os.remove(self.path)
+        self.assertFalse(self.watcher.poll(self.sim))
+        self.assertEqual(self.sim.level.level_map, LEVEL_MAP)
@@ -0,0 +1,79 @@
+from unittest import TestCase
+
+from jackit2.core.input import InputDispatcher, InputEventType, Key, KeyEvent, KeyState
+from jackit2.core.level import Level
+from jackit2.core.simulation import Simulation
+
+
+class RepeatEvent(KeyEvent):
+    __slots__ = ()
+
+    def isAutoRepeat(self):
+        return True
+
+
+class TestKeyState(TestCase):
+
+    def test_press_release(self):
+        keys = KeyState()
+        self.assertTrue(keys.press(Key.A))
+        self.assertFalse(keys.press(Key.A))
+        self.assertTrue(keys.is_down(Key.A))
+        self.assertFalse(keys.is_down(Key.D))
+        self.assertTrue(keys.release(Key.A))
+        self.assertFalse(keys.release(Key.A))
+        self.assertEqual(keys.down, 0)
+
+
+class TestInputDispatcher(TestCase):
+
+    def setUp(self):
+        self.input = InputDispatcher()
+        self.calls = []
+        self.input.register(lambda event: self.calls.append(("a", event.text())) or True,
+                            InputEventType.KEY_PRESS, Key.A)
+        self.input.register(lambda event: self.calls.append(("any", event.text())) or True,
+                            InputEventType.KEY_PRESS)
+
+    def test_events_wait_for_process(self):
+        self.input.queue(KeyEvent("a"), InputEventType.KEY_PRESS)
+        self.assertEqual(self.calls, [])
+        self.input.process()
+        self.assertEqual(self.calls, [("a", "a"), ("any", "a")])
+        self.assertTrue(self.input.keys.is_down(Key.A))
+
+    def test_handlers_keyed_on_key(self):
+        self.input.queue(KeyEvent("d"), InputEventType.KEY_PRESS)
+        self.input.process()
+        self.assertEqual(self.calls, [("any", "d")])
+
+    def test_repeats_and_held_keys_dispatch_once(self):
+        self.input.queue(KeyEvent("a"), InputEventType.KEY_PRESS)
+        self.input.queue(RepeatEvent("a"), InputEventType.KEY_PRESS)
+        self.input.queue(KeyEvent("a"), InputEventType.KEY_PRESS)
+        self.input.process()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_step_handlers_see_key_state(self):
+        held = []
+        self.input.register_step(lambda keys: held.append(keys.is_down(Key.D)))
+        self.input.queue(KeyEvent("d"), InputEventType.KEY_PRESS)
+        self.input.process()
+        self.input.process()
+        self.input.queue(KeyEvent("d"), InputEventType.KEY_RELEASE)
+        self.input.process()
+        self.assertEqual(held, [True, True, False])
+
+
+class TestPlayerInput(TestCase):
+
+    def test_held_key_moves_every_step(self):
+        sim = Simulation(Level(1, ["W      W", "WS     W", "WFFFFFFW"]))
+        start = sim.player.x_pos
+        sim.handle_input_event(KeyEvent("d"), InputEventType.KEY_PRESS)
+        speeds = []
+        for _ in range(10):
+            sim.step()
+            speeds.append(sim.player.body.velocity.x)
+        self.assertGreater(sim.player.x_pos, start)
+        self.assertTrue(all(later > earlier for earlier, later in zip(speeds, speeds[1:])))
@@ -0,0 +1,70 @@
+import gc
+import weakref
+import tracemalloc
+from unittest import TestCase
+
+from jackit2.core.input import InputDispatcher, InputEventType, KeyEvent
+from jackit2.core.level import Level
+from jackit2.core.simulation import Simulation
+
+LEVEL_MAP = [
+    "W  C  C  W",
+    "W  C  C  W",
+    "WS       W",
+    "WFFFFFFFFW",
+]
+
+
+def play_level(num_steps=5):
+    sim = Simulation(Level(1, LEVEL_MAP))
+    sim.handle_input_event(KeyEvent("d"), InputEventType.KEY_PRESS)
+    for _ in range(num_steps):
+        sim.step()
+    sim.close()
+    return sim
+
+
+class TestLevelLifecycle(TestCase):
+
+    def test_closed_level_is_collected(self):
+        sim = Simulation(Level(1, LEVEL_MAP))
+        player = weakref.ref(sim.player)
+        space = weakref.ref(sim.space)
+        dispatcher = sim.input
+
+        sim.close()
+        del sim
+        gc.collect()
+        self.assertIsNone(player())
+        self.assertIsNone(space())
+        self.assertEqual(dispatcher.handlers, {})
+
+    def test_handlers_dont_keep_player_alive(self):
+        dispatcher = InputDispatcher()
+        with dispatcher.current():
+            sim = Simulation(Level(1, LEVEL_MAP))
+        player = weakref.ref(sim.player)
+        self.assertIsNot(InputDispatcher.get(), sim.input)
+
+        # Without close() the level still goes away once nothing else references it
+        del sim
+        gc.collect()
+        self.assertIsNone(player())
+
+    def test_memory_flat_over_many_loads(self):
+        # Warm up caches (entity types, textures, numpy) before measuring
+        for _ in range(5):
+            play_level()
+        gc.collect()
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(50):
+                play_level()
+            gc.collect()
+            growth = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(growth, 64 * 1024, "memory grew {} bytes over 50 level loads".format(growth))
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pymunk
+
+from jackit2.core.entity import EntityManager
+from jackit2.core.level import Level, LevelGeneratorError, parse_level_map
+from jackit2.core.levelfile import BinaryLevel, LevelFile, file_to_map, write_level_file
+from jackit2.core.stress import StressLevel, generate_map
+
+LEVEL_MAP = [
+    "WWWW",
+    "WS C",
+    "WFFFF",
+]
+
+
+class TestParseLevelMap(TestCase):
+
+    def test_bottom_row_first_and_padded(self):
+        grid = parse_level_map(LEVEL_MAP)
+        self.assertEqual(grid.shape, (3, 5))
+        self.assertEqual("".join(grid[0]), "WFFFF")
+        self.assertEqual("".join(grid[2]), "WWWW ")
+
+    def test_map_not_modified(self):
+        level_map = list(LEVEL_MAP)
+        parse_level_map(level_map)
+        self.assertEqual(level_map, LEVEL_MAP)
+
+
+class TestBuildLevel(TestCase):
+
+    def load(self, level):
+        return level.load(EntityManager(pymunk.Space(), None, None, None))
+
+    def test_load_twice(self):
+        level = Level(1, LEVEL_MAP)
+        first = self.load(level)
+        second = self.load(level)
+        self.assertEqual(first[:2], second[:2])
+        self.assertEqual(first[2].get_state(), second[2].get_state())
+        self.assertEqual((first[2].x_pos, first[2].y_pos), (64, 64))
+
+    def test_unknown_character(self):
+        with self.assertRaises(LevelGeneratorError):
+            self.load(Level(1, ["WXW"]))
+
+    def test_apply_map_changes_only_edited_tiles(self):
+        level = Level(1, LEVEL_MAP)
+        entity_mgr = EntityManager(pymunk.Space(), None, None, None)
+        level.load(entity_mgr)
+        wall = entity_mgr.query_point(0, 0)[0]
+
+        changed = level.apply_map(entity_mgr, ["WWWW", "WSCC", "WFFFF"])
+        entity_mgr.flush()
+
+        self.assertEqual(changed, 1)
+        self.assertEqual(len(entity_mgr.space.shapes), 13)
+        self.assertIs(entity_mgr.query_point(0, 0)[0], wall)
+
+
+class TestStressLevel(TestCase):
+
+    def test_generate_map(self):
+        level_map = generate_map(64, 32, crate_density=0.3, stack_height=3, static_ratio=0.5)
+        self.assertEqual(len(level_map), 32)
+        self.assertTrue(all(len(row) == 64 for row in level_map))
+        self.assertEqual(level_map[-2][1], "S")
+        self.assertEqual(generate_map(64, 32, seed=3), generate_map(64, 32, seed=3))
+
+    def test_loads(self):
+        level = StressLevel(48, 24, seed=1)
+        _, _, player = level.load(EntityManager(pymunk.Space(), None, None, None))
+        self.assertIsNotNone(player)
+
+
+class TestLevelFile(TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".jkl")
+        os.close(handle)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_round_trip(self):
+        level_map = generate_map(40, 20, seed=2)
+        for chunked in (False, True):
+            write_level_file(self.path, level_map, 7, "Name", "Description", chunked=chunked)
+            level_file = LevelFile(self.path)
+            self.assertEqual((level_file.width, level_file.height, level_file.level_num), (40, 20, 7))
+            self.assertEqual(level_file.chunked, chunked)
+            self.assertEqual(file_to_map(self.path), level_map)
+
+    def test_binary_level_builds_like_text_level(self):
+        write_level_file(self.path, LEVEL_MAP, 1)
+        text = Level(1, LEVEL_MAP).load(EntityManager(pymunk.Space(), None, None, None))
+        binary = BinaryLevel(self.path).load(EntityManager(pymunk.Space(), None, None, None))
+        self.assertEqual(text[:2], binary[:2])
+        self.assertEqual(text[2].get_state(), binary[2].get_state())
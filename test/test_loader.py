@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from jackit2.core.levelfile import LEVEL_FILE_EXT, BinaryLevel, write_level_file
+from jackit2.core import loader as loader_module
+from jackit2.core.loader import LevelLoader, level_module_name
+
+LEVEL_SOURCE = '''
+from jackit2.core.level import Level
+
+
+class TestLevel(Level):
+    def __init__(self):
+        super().__init__({num}, ["WSW", "FFF"], "{name}")
+
+
+__Level__ = TestLevel
+'''
+
+
+class TestLevelLoader(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.levels = os.path.join(self.root, "levels")
+        os.mkdir(self.levels)
+        self.manifest = os.path.join(self.root, "manifest.json")
+        self.write("b_level.py", LEVEL_SOURCE.format(num=2, name="Second"))
+        self.write("a_level.py", LEVEL_SOURCE.format(num=1, name="First"))
+        self.write("helpers.py", "VALUE = 1\n")
+
+    def tearDown(self):
+        for name in list(sys.modules):
+            if name.startswith(level_module_name(self.levels, self.levels)):
+                del sys.modules[name]
+        shutil.rmtree(self.root)
+
+    def write(self, filename, source):
+        with open(os.path.join(self.levels, filename), 'w') as level_file:
+            level_file.write(source)
+
+    def search(self):
+        loader = LevelLoader()
+        loader.manifest_path = self.manifest
+        loader.add_search_path(self.levels)
+        return loader
+
+    def test_discovers_levels_in_order(self):
+        loader = self.search()
+        self.assertEqual([stub.name for stub in loader], ["First", "Second"])
+        self.assertEqual(loader.get_by_num(2).name, "Second")
+        self.assertIsNone(loader.get_by_num(3))
+
+    def test_cached_levels_are_imported_lazily(self):
+        self.search()
+        module_name = level_module_name(self.levels, os.path.join(self.levels, "a_level.py"))
+        del sys.modules[module_name]
+
+        loader = self.search()
+        self.assertEqual(len(loader), 2)
+        self.assertNotIn(module_name, sys.modules)
+        self.assertEqual(loader[0].level_num, 1)
+        self.assertIn(module_name, sys.modules)
+
+    def test_changed_file_is_rescanned(self):
+        self.search()
+        self.write("a_level.py", LEVEL_SOURCE.format(num=5, name="Changed"))
+        os.utime(os.path.join(self.levels, "a_level.py"), (0, 0))
+
+        with mock.patch.object(loader_module, "file_hash", wraps=loader_module.file_hash) as file_hash:
+            loader = self.search()
+        self.assertEqual(loader.get_by_num(5).name, "Changed")
+        self.assertIsNone(loader.get_by_num(1))
+        file_hash.assert_called_once_with(os.path.join(self.levels, "a_level.py"))
+
+    def test_discovers_binary_levels(self):
+        write_level_file(os.path.join(self.levels, "c_level" + LEVEL_FILE_EXT), ["WSW", "FFF"], 3, "Binary")
+
+        loader = self.search()
+        stub = loader.get_stub(3)
+        self.assertIsNone(stub.module_name)
+        level = loader.get_by_num(3)
+        self.assertIsInstance(level, BinaryLevel)
+        self.assertEqual(level.name, "Binary")
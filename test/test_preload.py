@@ -0,0 +1,66 @@
+import threading
+from unittest import TestCase
+
+from jackit2.core.input import InputDispatcher
+from jackit2.core.level import Level
+from jackit2.core.preload import LevelPreloader
+from jackit2.core.simulation import Simulation
+
+LEVEL_MAP = [
+    "W  C  W",
+    "WS    W",
+    "WFFFFFW",
+]
+
+
+class TestLevelPreloader(TestCase):
+
+    def setUp(self):
+        self.threads = []
+        self.preloader = LevelPreloader(30, substeps=2)
+        self.addCleanup(self.preloader.shutdown)
+
+    def make_level(self, level_num):
+        def build():
+            self.threads.append(threading.current_thread())
+            return Level(level_num, LEVEL_MAP)
+        return build
+
+    def test_take(self):
+        # The worker thread's dispatcher, which was current while the level was built
+        worker_input = self.preloader._executor.submit(InputDispatcher.get).result()
+        self.preloader.start([self.make_level(1), self.make_level(2)], 1)
+        self.assertEqual(self.preloader.index, 1)
+
+        sim = self.preloader.take(10)
+        self.assertIsInstance(sim, Simulation)
+        self.assertEqual(sim.level.level_num, 2)
+        self.assertEqual((sim.step_size, sim.substeps), (1.0 / 30, 2))
+        self.assertIsNone(self.preloader.index)
+        self.assertIsNot(self.threads[0], threading.current_thread())
+
+        # The player's handlers are only registered with the level's own dispatcher
+        self.assertTrue(sim.input.handlers)
+        self.assertTrue(sim.input.step_handlers)
+        self.assertIsNot(worker_input, sim.input)
+        self.assertEqual((worker_input.handlers, worker_input.step_handlers), ({}, []))
+        sim.step()
+
+        with self.assertRaises(RuntimeError):
+            self.preloader.take()  # Nothing being preloaded any more
+
+    def test_build_error(self):
+        def broken():
+            raise ValueError("bad level")
+
+        self.preloader.start([broken], 0)
+        with self.assertRaises(ValueError):
+            self.preloader.take(10)
+
+    def test_shutdown(self):
+        self.preloader.start([self.make_level(1)], 0)
+        self.preloader.shutdown()
+        self.assertIsNone(self.preloader.index)
+        self.assertFalse(self.preloader.ready())
+        with self.assertRaises(RuntimeError):
+            self.preloader.start([self.make_level(1)], 0)
@@ -0,0 +1,58 @@
+from unittest import TestCase
+
+from jackit2.core.input import InputEventType
+from jackit2.core.replay import (
+    Recording, ReplayError, read_varint, write_varint
+)
+
+
+class TestVarint(TestCase):
+
+    def test_roundtrip(self):
+        for value in (0, 1, 127, 128, 300, 2 ** 32 - 1, 2 ** 40):
+            out = bytearray()
+            write_varint(out, value)
+            self.assertEqual(read_varint(out, 0), (value, len(out)))
+
+    def test_small_values_one_byte(self):
+        out = bytearray()
+        write_varint(out, 127)
+        self.assertEqual(len(out), 1)
+
+    def test_negative(self):
+        with self.assertRaises(ValueError):
+            write_varint(bytearray(), -1)
+
+    def test_truncated(self):
+        with self.assertRaises(ReplayError):
+            read_varint(bytearray([0x80]), 0)
+
+
+class TestRecording(TestCase):
+
+    def setUp(self):
+        self.recording = Recording(1, 60, hash_interval=30)
+        self.recording.steps = 90
+        self.recording.events = [
+            (0, InputEventType.KEY_PRESS, 0x44, "d"),
+            (0, InputEventType.KEY_PRESS, 0x20, " "),
+            (75, InputEventType.KEY_RELEASE, 0x44, "d"),
+        ]
+        self.recording.hashes = [1, 2 ** 32 - 1, 12345]
+
+    def test_roundtrip(self):
+        loaded = Recording.from_bytes(self.recording.to_bytes())
+        self.assertEqual(loaded.level_num, 1)
+        self.assertEqual(loaded.framerate, 60)
+        self.assertEqual(loaded.hash_interval, 30)
+        self.assertEqual(loaded.steps, 90)
+        self.assertEqual(loaded.events, self.recording.events)
+        self.assertEqual(loaded.hashes, self.recording.hashes)
+
+    def test_bad_magic(self):
+        with self.assertRaises(ReplayError):
+            Recording.from_bytes(b'NOPE' + self.recording.to_bytes()[4:])
+
+    def test_corrupt(self):
+        with self.assertRaises(ReplayError):
+            Recording.from_bytes(self.recording.to_bytes()[:8])
@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+from jackit2.core.level import Level
+from jackit2.core.rewind import RewindBuffer
+from jackit2.core.simulation import Simulation
+from jackit2.entities import Crate
+
+LEVEL_MAP = [
+    "W  C  C  W",
+    "W  C  C  W",
+    "WS       W",
+    "WFFFFFFFFW",
+]
+
+
+class TestRewindBuffer(TestCase):
+
+    def setUp(self):
+        self.sim = Simulation(Level(1, LEVEL_MAP))
+        self.sim.rewind = RewindBuffer(seconds=1, framerate=10)
+
+    def states(self):
+        return [entity.get_state() for entity in self.sim.entity_mgr.dynamic_entities()]
+
+    def test_round_trip(self):
+        for _ in range(5):
+            self.sim.step()
+        self.sim.player.body.velocity = (123.456, -78.9)
+        self.sim.rewind.record(self.sim)
+        expected, steps = self.states(), self.sim.steps
+
+        for _ in range(3):
+            self.sim.step()
+        self.assertTrue(self.sim.rewind.restore(self.sim, 3))
+        self.assertEqual(self.sim.steps, steps)
+
+        # Positions and angles are float32, velocities float16
+        for state, want in zip(self.states(), expected):
+            for value, target in zip(state[:3], want[:3]):
+                self.assertAlmostEqual(value, target, delta=abs(target) * 1e-6 + 1e-4)
+            for value, target in zip(state[3:], want[3:]):
+                self.assertAlmostEqual(value, target, delta=abs(target) * 1e-3 + 1e-3)
+
+    def test_capacity(self):
+        rewind = self.sim.rewind
+        self.assertEqual(rewind.capacity, 10)
+        for _ in range(25):
+            self.sim.step()
+        self.assertEqual(len(rewind), 10)
+
+        # Only the last 10 frames are kept
+        self.assertFalse(rewind.restore(self.sim, 10))
+        self.assertTrue(rewind.restore(self.sim, 9))
+        self.assertEqual(self.sim.steps, 16)
+        self.assertEqual(len(rewind), 1)
+
+        rewind.clear()
+        self.assertEqual(len(rewind), 0)
+        self.assertFalse(rewind.restore(self.sim, 0))
+
+    def test_reused_entity_is_skipped(self):
+        mgr = self.sim.entity_mgr
+        for _ in range(3):
+            self.sim.step()
+        crate = mgr.get_archetype(Crate).entities[0]
+
+        # The crate goes back to the pool and is spawned again somewhere else
+        # with the same body. Older frames belong to its earlier life
+        mgr.release(crate)
+        self.assertIs(mgr.spawn(Crate, 288, 191), crate)
+        self.sim.step()
+
+        self.assertTrue(self.sim.rewind.restore(self.sim, 1))
+        self.assertGreaterEqual(crate.get_index(), 0)
+        self.assertAlmostEqual(crate.x_pos, 288, delta=1)
+        self.assertAlmostEqual(crate.y_pos, 191, delta=1)
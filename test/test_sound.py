@@ -0,0 +1,144 @@
+from unittest import TestCase
+
+from jackit2.core.entity import Entity, EntityType, create_box
+from jackit2.core.level import Level
+from jackit2.core.simulation import Simulation
+from jackit2.core.sound import SoundBank, SoundEvents
+
+
+class FakeChannel:
+
+    def __init__(self, idx):
+        self.idx = idx
+        self.sound = None
+
+    def get_busy(self):
+        return self.sound is not None
+
+    def stop(self):
+        self.sound = None
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def play(self, sound):
+        self.sound = sound
+
+
+class FakeMixer:
+    Channel = FakeChannel
+
+    def __init__(self):
+        self.num_channels = None
+
+    def set_num_channels(self, num_channels):
+        self.num_channels = num_channels
+
+    def Sound(self, file):
+        return file.read()
+
+
+class FakeAssets:
+
+    def open(self, name):
+        import io
+        return io.BytesIO(name.encode('utf-8'))
+
+
+EFFECTS = {
+    "impact": ("impact.wav", 1, 0.5),
+    "collect": ("collect.wav", 3, 1.0),
+}
+
+
+class Coin(Entity):
+    __slots__ = ()
+    entity_type = EntityType("coin", collectable=True, value=5)
+
+    def __init__(self, x_pos, y_pos):
+        super().__init__(create_box(x_pos, y_pos, 32, 32, 1, 0.3))
+
+
+class Pot(Entity):
+    __slots__ = ()
+    entity_type = EntityType("pot", breakable=True, contains=Coin)
+
+    def __init__(self, x_pos, y_pos):
+        super().__init__(create_box(x_pos, y_pos, 64, 64, 10, 0.3))
+
+
+class TestSoundBank(TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.bank = SoundBank(FakeMixer(), num_channels=2, window=0.05, clock=lambda: self.now)
+        self.bank.load(FakeAssets(), EFFECTS)
+
+    def test_coalesces_repeats(self):
+        self.assertTrue(self.bank.play("impact"))
+        self.now += 0.01
+        self.assertFalse(self.bank.play("impact"))
+        self.now += 0.1
+        self.assertTrue(self.bank.play("impact"))
+        self.assertEqual((self.bank.started, self.bank.coalesced), (2, 1))
+
+    def test_priority_steals_and_drops(self):
+        self.bank.play("impact")
+        self.now += 1
+        self.bank.play("impact")
+        self.now += 1
+        self.assertTrue(self.bank.play("collect"))  # Takes the oldest impact's channel
+        self.assertEqual(self.bank.stolen, 1)
+        self.assertEqual([channel.sound for channel in self.bank.channels], [b"collect.wav", b"impact.wav"])
+
+        self.now += 1
+        self.assertTrue(self.bank.play("collect"))
+        self.now += 1
+        self.assertFalse(self.bank.play("impact"))  # Every channel is playing something more important
+        self.assertEqual(self.bank.dropped, 1)
+
+    def test_unknown_effect(self):
+        self.assertFalse(self.bank.play("break"))
+
+
+class TestSoundEvents(TestCase):
+
+    def test_one_event_per_effect(self):
+        events = SoundEvents()
+        events.emit("impact", 0.2)
+        events.emit("impact", 0.7)
+        events.emit("impact", 0.3)
+        self.assertEqual(events.drain(), [("impact", 0.7)])
+        self.assertEqual(len(events), 0)
+
+    def test_falling_crates_make_impacts(self):
+        level_map = ["WC C W"] + ["W    W"] * 6 + ["WS   W", "WFFFFW"]
+        sim = Simulation(Level(1, level_map))
+        events = sim.enable_sounds()
+        heard = []
+        for _ in range(120):
+            sim.step()
+            heard.extend(events.drain())
+        self.assertIn("impact", [name for name, _ in heard])
+        self.assertTrue(all(0 < volume <= 1 for _, volume in heard))
+
+    def test_break_and_collect(self):
+        sim = Simulation(Level(1, ["WS  W", "WFFFW"]))
+        events = sim.enable_sounds()
+        pots = sim.entity_mgr.spawn_many(Pot, [(100 + idx * 70, 300) for idx in range(3)])
+
+        # Breaking and collecting many things in a step is one event of each
+        coins = [sim.entity_mgr.break_entity(pot) for pot in pots]
+        self.assertEqual(events.drain(), [("break", 1.0)])
+        self.assertEqual(sum(sim.entity_mgr.collect(coin) for coin in coins), 15)
+        self.assertEqual(events.drain(), [("collect", 1.0)])
+
+        # And the bank doesn't restart an effect within its window
+        now = [0.0]
+        bank = SoundBank(FakeMixer(), num_channels=4, clock=lambda: now[0])
+        bank.load(FakeAssets(), {"break": ("break.wav", 2, 1.0)})
+        for pot in sim.entity_mgr.spawn_many(Pot, [(100, 300), (170, 300)]):
+            sim.entity_mgr.break_entity(pot)
+            bank.play_events(events.drain())
+            now[0] += 0.01
+        self.assertEqual((bank.started, bank.coalesced), (1, 1))
@@ -0,0 +1,110 @@
+import random
+from unittest import TestCase
+
+import pymunk
+
+from jackit2.core.entity import Entity, EntityManager, EntityType, create_static_box
+from jackit2.core.spatial import SpatialGrid, segment_hits_rect
+from jackit2.entities import Crate, Floor
+
+
+class Marker(Entity):
+    '''
+    Entity that isn't in the pymunk space
+    '''
+
+    __slots__ = ()
+
+    entity_type = EntityType("marker", static=True, physical=False)
+
+    def __init__(self, x_pos, y_pos):
+        super().__init__(create_static_box(x_pos, y_pos, self.entity_type.width, self.entity_type.height, 0))
+
+
+class TestSpatialGrid(TestCase):
+
+    def setUp(self):
+        self.grid = SpatialGrid(cell_size=10)
+
+    def test_insert_move_remove(self):
+        self.grid.insert("a", (0, 0, 5, 5))
+        self.grid.insert("b", (25, 25, 35, 35))
+        self.assertEqual(len(self.grid), 2)
+        self.assertEqual(self.grid.query_point(2, 2), ["a"])
+        self.assertEqual(sorted(self.grid.query_rect(-100, -100, 100, 100)), ["a", "b"])
+        self.assertEqual(self.grid.query_radius(40, 40, 8), ["b"])
+        self.assertEqual(self.grid.query_radius(40, 40, 6), [])
+
+        self.grid.move("a", (50, 50, 55, 55))
+        self.assertEqual(self.grid.query_point(2, 2), [])
+        self.assertEqual(self.grid.query_point(52, 52), ["a"])
+
+        self.grid.remove("a")
+        self.assertNotIn("a", self.grid)
+        self.assertEqual(self.grid.query_rect(-100, -100, 100, 100), ["b"])
+
+    def test_segment_matches_brute_force(self):
+        rng = random.Random(1)
+        bounds = {}
+        for idx in range(300):
+            x_pos, y_pos = rng.uniform(-200, 200), rng.uniform(-200, 200)
+            bounds[idx] = (x_pos, y_pos, x_pos + rng.uniform(0, 15), y_pos + rng.uniform(0, 15))
+            self.grid.insert(idx, bounds[idx])
+
+        segments = [((rng.uniform(-250, 250), rng.uniform(-250, 250)),
+                     (rng.uniform(-250, 250), rng.uniform(-250, 250))) for _ in range(200)]
+        # Along cell boundaries and through cell corners
+        segments += [((0, -200), (0, 200)), ((-200, 30), (200, 30)), ((-200, -200), (200, 200)), ((5, 5), (5, 5))]
+        for start, end in segments:
+            expected = {}
+            for entity, rect in bounds.items():
+                alpha = segment_hits_rect(start, end, rect)
+                if alpha is not None:
+                    expected[entity] = alpha
+            self.assertEqual(dict(self.grid.query_segment(start, end)), expected)
+
+    def test_segment_walks_crossed_cells(self):
+        # A diagonal across 1000 cells each way crosses ~2000 cells, its bounding box has 1000000
+        cells = list(self.grid._cells_along((0.5, 0.3), (10000.7, 9000.1)))
+        self.assertEqual(cells[0], (0, 0))
+        self.assertEqual(cells[-1], (1000, 900))
+        self.assertLessEqual(len(cells), 1000 + 900 + 1)
+        for prev, cell in zip(cells, cells[1:]):
+            self.assertEqual(abs(cell[0] - prev[0]) + abs(cell[1] - prev[1]), 1)
+
+        cells = list(self.grid._cells_along((5, 5), (-25, 5)))
+        self.assertEqual(cells, [(0, 0), (-1, 0), (-2, 0), (-3, 0)])
+
+
+class TestEntityQueries(TestCase):
+
+    def setUp(self):
+        self.mgr = EntityManager(pymunk.Space(), None, None, None)
+        self.crate = self.mgr.spawn(Crate, 0, 0)
+        self.floor = self.mgr.spawn(Floor, 200, 0)
+        self.marker = self.mgr.spawn(Marker, 400, 0)
+        self.mgr.space.step(0.001)  # Index the shapes
+
+    def test_query_point(self):
+        self.assertEqual(self.mgr.query_point(0, 0), [self.crate])
+        self.assertEqual(self.mgr.query_point(200, 0), [self.floor])
+        self.assertEqual(self.mgr.query_point(400, 0), [self.marker])
+        self.assertEqual(self.mgr.query_point(300, 0), [])
+
+    def test_query_rect(self):
+        self.assertEqual(set(self.mgr.query_rect(-50, -50, 450, 50)), {self.crate, self.floor, self.marker})
+        self.assertEqual(self.mgr.query_rect(150, -50, 250, 50), [self.floor])
+        self.assertEqual(self.mgr.query_radius(300, 0, 10), [])
+
+    def test_raycast(self):
+        hits = self.mgr.raycast((-100, 0), (500, 0))
+        self.assertEqual([hit.entity for hit in hits], [self.crate, self.floor, self.marker])
+        self.assertEqual(hits, sorted(hits, key=lambda hit: hit.alpha))
+        self.assertEqual(self.mgr.raycast((-100, 100), (500, 100)), [])
+
+    def test_removed_not_found(self):
+        self.mgr.remove(self.marker)
+        self.mgr.remove(self.crate)
+        self.mgr.flush()
+        self.assertEqual(self.mgr.query_point(400, 0), [])
+        self.assertEqual([hit.entity for hit in self.mgr.raycast((-100, 0), (500, 0))], [self.floor])
@@ -0,0 +1,52 @@
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from jackit2.core.startup import StartupProfiler
+
+
+class TestStartupProfiler(TestCase):
+
+    def setUp(self):
+        self.profiler = StartupProfiler()
+
+    def test_nested_phases(self):
+        with self.profiler.phase("outer"):
+            with self.profiler.phase("inner"):
+                pass
+        with self.profiler.phase("next"):
+            pass
+
+        self.assertEqual([(name, depth) for name, depth, _ in self.profiler.phases],
+                         [("outer", 0), ("inner", 1), ("next", 0)])
+        outer, inner, _ = self.profiler.phases
+        self.assertGreaterEqual(outer[2], inner[2])
+
+    def test_phase_timed_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.profiler.phase("failing"):
+                raise ValueError()
+
+        with self.profiler.phase("after"):
+            pass
+        self.assertEqual(self.profiler.phases[1][1], 0)
+        self.assertGreater(self.profiler.phases[0][2], 0.0)
+
+    def test_finish_reports_once(self):
+        with self.profiler.phase("config"):
+            pass
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.profiler.finish()
+        self.assertEqual(out.getvalue(), "")  # Not enabled
+        self.assertEqual([name for name, _ in self.profiler.marks], ["first frame"])
+
+        self.profiler = StartupProfiler()
+        self.profiler.enabled = True
+        with redirect_stdout(out):
+            self.profiler.finish()
+            self.profiler.finish()
+        self.assertEqual(out.getvalue().count("Startup phases:"), 1)
+        self.assertIn("first frame", out.getvalue())
+        self.assertEqual(len(self.profiler.marks), 1)
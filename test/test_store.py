@@ -0,0 +1,95 @@
+from unittest import TestCase
+
+import pymunk
+
+from jackit2.core.entity import EntityManager
+from jackit2.core.store import Archetype, DEFAULT_TINT, FLAG_STATIC
+from jackit2.entities import Crate, Floor
+
+
+def add_crates(arch, positions):
+    crates = [Crate(x_pos, y_pos) for x_pos, y_pos in positions]
+    for crate in crates:
+        crate.set_index(arch.add(crate, crate.body), arch)
+    return crates
+
+
+class TestArchetype(TestCase):
+
+    def assert_consistent(self, arch):
+        self.assertEqual(len(arch.entities), arch.count)
+        self.assertEqual(len(arch.bodies), arch.count)
+        for idx, entity in enumerate(arch.entities):
+            self.assertEqual(entity.get_index(), idx)
+            self.assertIs(arch.bodies[idx], entity.body)
+            self.assertEqual(tuple(arch.positions[idx]), (entity.x_pos, entity.y_pos))
+
+    def test_grow(self):
+        arch = Archetype(Crate.entity_type, capacity=2)
+        add_crates(arch, [(idx, idx * 2) for idx in range(5)])
+        self.assertEqual(arch.count, 5)
+        self.assertGreaterEqual(arch.capacity, 5)
+        self.assertEqual(len(arch.tints), arch.capacity)
+        self.assertEqual(tuple(arch.tints[4]), DEFAULT_TINT)
+        self.assert_consistent(arch)
+
+        crates = [Crate(idx, 0) for idx in range(20)]
+        start = arch.add_many(crates, [crate.body for crate in crates])
+        for idx, crate in enumerate(crates, start):
+            crate.set_index(idx, arch)
+        self.assertEqual((start, arch.count), (5, 25))
+        self.assertGreaterEqual(arch.capacity, 25)
+        self.assert_consistent(arch)
+
+    def test_swap_remove(self):
+        arch = Archetype(Crate.entity_type)
+        crates = add_crates(arch, [(idx, 0) for idx in range(4)])
+
+        arch.remove(crates[1].get_index())  # The last crate takes row 1
+        crates[1].clear_index()
+        self.assertEqual(crates[3].get_index(), 1)
+        self.assert_consistent(arch)
+
+        arch.remove(crates[3].get_index())
+        arch.remove(crates[2].get_index())  # Last row, nothing moves
+        self.assertEqual(arch.entities, [crates[0]])
+        self.assert_consistent(arch)
+
+        with self.assertRaises(IndexError):
+            arch.remove(-1)
+        with self.assertRaises(IndexError):
+            arch.remove(1)
+        self.assert_consistent(arch)
+
+    def test_sync(self):
+        arch = Archetype(Crate.entity_type)
+        crates = add_crates(arch, [(0, 0), (10, 10)])
+        crates[1].body.position = pymunk.Vec2d(55, 66)
+        crates[1].body.angle = 0.5
+
+        arch.instance_data()
+        arch.sync()
+        self.assertEqual(tuple(arch.positions[1]), (55, 66))
+        self.assertAlmostEqual(float(arch.angles[1]), 0.5)
+        self.assertEqual(tuple(arch.instance_data()[1, 0:2]), (55, 66))  # Rebuilt after the sync
+
+    def test_manager_update(self):
+        mgr = EntityManager(pymunk.Space(), None, None, None)
+        crate = mgr.spawn(Crate, 0, 100)
+        crate.body.velocity = (0, -100)
+        mgr.space.step(0.1)
+        self.assertEqual(tuple(mgr.get_archetype(Crate).positions[0]), (0, 100))  # Not synced yet
+
+        mgr.update()
+        self.assertEqual(tuple(mgr.get_archetype(Crate).positions[0]), (crate.x_pos, crate.y_pos))
+        self.assertLess(crate.y_pos, 100)
+
+    def test_static_not_synced(self):
+        arch = Archetype(Floor.entity_type)
+        floor = Floor(0, 0)
+        floor.set_index(arch.add(floor, floor.body), arch)
+        self.assertEqual(arch.flags[0], FLAG_STATIC)
+
+        floor.body.position = pymunk.Vec2d(5, 5)
+        arch.sync()
+        self.assertEqual(tuple(arch.positions[0]), (0, 0))
@@ -0,0 +1,74 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from jackit2.core import verify
+from jackit2.core.level import Level
+
+GOOD_MAP = [
+    "W    W",
+    "WS C W",
+    "WFFFFW",
+]
+
+#: The crate falls through the gap in the floor
+FALLING_MAP = [
+    "W   CW",
+    "W    W",
+    "WS   W",
+    "WFFF W",
+]
+
+
+class BrokenLevel(Level):
+
+    def __init__(self):
+        raise ValueError("bad map")
+
+
+class FakeLoader:
+
+    def __init__(self, factories):
+        self.factories = factories
+
+    def __len__(self):
+        return len(self.factories)
+
+    def __getitem__(self, index):
+        return self.factories[index]()
+
+
+class TestVerifyLevels(TestCase):
+
+    def setUp(self):
+        loader = FakeLoader([
+            lambda: Level(1, GOOD_MAP, "good"),
+            lambda: Level(2, FALLING_MAP, "falling"),
+            BrokenLevel,
+        ])
+        patcher = patch.object(verify, "get_level_loader", return_value=loader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_report(self):
+        reports = json.loads(json.dumps(verify.verify_levels(240, workers=1)))
+        good, falling, broken = reports
+
+        self.assertEqual((good["index"], good["name"], good["level_num"]), (0, "good", 1))
+        self.assertTrue(good["ok"])
+        self.assertTrue(good["settled"])
+        self.assertEqual(good["escaped"], [])
+        self.assertIsNone(good["player_escaped_step"])
+        self.assertGreater(good["step_ms_mean"], 0.0)
+
+        self.assertFalse(falling["ok"])
+        self.assertEqual([item["type"] for item in falling["escaped"]], ["Crate"])
+
+        self.assertFalse(broken["ok"])
+        self.assertEqual(broken["error"], "ValueError: bad map")
+
+    def test_pool(self):
+        # The worker processes are forked so they see the same levels
+        reports = verify.verify_levels(60, workers=2)
+        self.assertEqual([report["index"] for report in reports], [0, 1, 2])
+        self.assertEqual([report["ok"] for report in reports], [True, False, False])